@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""Benchmark the OpenLST codec primitives and a framer/deframer loopback
+
+Each benchmark reports packets/s and bits/s (of raw message data). Results
+can be saved as a JSON baseline and later runs compared against it:
+
+    openlst_benchmark.py --save baseline.json
+    openlst_benchmark.py --compare baseline.json
+
+With --compare, the exit status is 1 if any benchmark got slower than
+the baseline by more than --tolerance.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from gnuradio.openlst.crc import crc16, crc16_table, crc16_check_batch
+from gnuradio.openlst.whitening import whiten
+from gnuradio.openlst.fec import encode_fec, decode_fec, decode_fec_chunk, decode_fec_soft
+from gnuradio.openlst.framer import Framer
+from gnuradio.openlst.deframer import Deframer
+
+PACKET_SIZES = (16, 64, 200)
+ERROR_RATES = (0.0, 0.001, 0.01)
+MODES = ((True, True), (True, False), (False, True), (False, False))
+
+
+def _messages(size, count, rng):
+    return [rng.integers(0, 256, size, dtype=np.uint8).tobytes() for _ in range(count)]
+
+
+def _decode_fec_legacy(data):
+    decoder = decode_fec_chunk()
+    decoder.send(None)
+    return b''.join(decoder.send(data[i:i + 4]) for i in range(0, len(data), 4))
+
+
+def primitive_benchmarks(rng, quick):
+    """Yield (name, function, packets per call, bits per call)"""
+    sizes = PACKET_SIZES[:1] if quick else PACKET_SIZES
+    for size in sizes:
+        msg = _messages(size, 1, rng)[0]
+        bits = 8 * size
+        yield f'crc16_reference/{size}', lambda m=msg: crc16(m), 1, bits
+        yield f'crc16_table/{size}', lambda m=msg: crc16_table(m), 1, bits
+        frames = np.frombuffer(b''.join(_messages(size, 256, rng)), np.uint8).reshape(256, size)
+        yield f'crc16_check_batch/{size}', lambda f=frames: crc16_check_batch(f), 256, 256 * bits
+        yield f'whiten/{size}', lambda m=msg: whiten(m), 1, bits
+        yield f'encode_fec/{size}', lambda m=msg: encode_fec(m), 1, bits
+        encoded = encode_fec(msg)
+        yield f'decode_fec/{size}', lambda e=encoded: decode_fec(e), 1, bits
+        if size <= 64:
+            # The original per-symbol decoder, kept for comparison
+            yield f'decode_fec_chunk/{size}', lambda e=encoded: _decode_fec_legacy(e), 1, bits
+        soft = np.unpackbits(np.frombuffer(encoded, np.uint8)).astype(np.float32) * 2 - 1
+        yield f'decode_fec_soft/{size}', lambda s=soft: decode_fec_soft(s), 1, bits
+
+
+def _loopback_stream(framer, msgs, error_rate, rng):
+    parts = []
+    for msg in msgs:
+        parts.append(np.zeros(64, np.uint8))
+        parts.append(np.unpackbits(framer.encode(msg)))
+    parts.append(np.zeros(512, np.uint8))
+    bits = np.concatenate(parts)
+    if error_rate:
+        bits ^= (rng.random(len(bits)) < error_rate).astype(np.uint8)
+    return bits
+
+
+def loopback_benchmarks(rng, quick, count=50):
+    """Yield (name, function, packets per call, bits per call)
+
+    Each call deframes a stream of count frames encoded by a Framer, with
+    random bit errors at the given rate, in 4096 bit pieces like a
+    flowgraph would deliver them, and returns the number of packets
+    decoded.
+    """
+    sizes = PACKET_SIZES[1:2] if quick else PACKET_SIZES
+    rates = ERROR_RATES[:1] if quick else ERROR_RATES
+    for fec, whitening in MODES:
+        framer = Framer(flags=0x40, fec=fec, whitening=whitening)
+        for size in sizes:
+            msgs = _messages(size, count, rng)
+            for rate in rates:
+                stream = _loopback_stream(framer, msgs, rate, rng)
+
+                def run(stream=stream, fec=fec, whitening=whitening):
+                    deframer = Deframer(fec=fec, whitening=whitening)
+                    decoded = 0
+                    for i in range(0, len(stream), 4096):
+                        decoded += len(deframer.push(stream[i:i + 4096]))
+                    return decoded
+                name = 'loopback/fec=%d,whitening=%d/%d/%g' % (fec, whitening, size, rate)
+                yield name, run, count, count * size * 8
+
+
+def measure(function, repeat, min_time):
+    """Return the best time per call over repeat runs of at least min_time"""
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        calls *= 2
+    best = elapsed / calls
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+def run(args):
+    rng = np.random.default_rng(args.seed)
+    results = {}
+    benchmarks = list(primitive_benchmarks(rng, args.quick)) + list(loopback_benchmarks(rng, args.quick))
+    for name, function, packets, bits in benchmarks:
+        if args.filter and args.filter not in name:
+            continue
+        seconds = measure(function, args.repeat, args.min_time)
+        results[name] = {
+            'seconds': seconds,
+            'packets_per_s': packets / seconds,
+            'bits_per_s': bits / seconds,
+        }
+        line = '%-48s %12.1f packets/s %14.0f bits/s' % (name, packets / seconds, bits / seconds)
+        decoded = function()
+        if decoded is not None and name.startswith('loopback/'):
+            results[name]['decoded'] = decoded / packets
+            line += '  %5.1f%% decoded' % (100 * decoded / packets)
+        print(line)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print the change from baseline, returning the names that regressed"""
+    regressions = []
+    print()
+    print('%-48s %12s %12s %8s' % ('benchmark', 'baseline', 'now', 'change'))
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['packets_per_s']
+        now = result['packets_per_s']
+        change = now / before - 1
+        flag = ''
+        if change < -tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        elif result.get('decoded', 0) < baseline[name].get('decoded', 0):
+            # Decoding fewer packets is a regression however fast it is
+            regressions.append(name)
+            flag = '  FEWER DECODED'
+        print('%-48s %12.1f %12.1f %+7.1f%%%s' % (name, before, now, 100 * change, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help='run a smaller set of cases')
+    parser.add_argument('--filter', help='only run benchmarks with this in their name')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per benchmark, the best is kept')
+    parser.add_argument('--min-time', type=float, default=0.2, help='minimum seconds per run')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save', metavar='FILE', help='save the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare against a JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='slowdown (as a fraction) flagged as a regression')
+    args = parser.parse_args()
+
+    results = run(args)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'meta': {
+                    'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'python': platform.python_version(),
+                    'numpy': np.__version__,
+                    'machine': platform.machine(),
+                    'processor': platform.processor(),
+                },
+                'results': results,
+            }, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('\n%d benchmark(s) regressed by more than %d%%' % (len(regressions), 100 * args.tolerance))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,18 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""Decode OpenLST packets from a recorded bitstream
+
+See gnuradio.openlst.offline, or run with --help.
+"""
+
+import sys
+
+from gnuradio.openlst.offline import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+/* -*- c++ -*- */
+/*
+ * Copyright 2023 Robert Zimmerman.
+ *
+ * SPDX-License-Identifier: GPL-3.0-or-later
+ */
+
+#ifndef INCLUDED_OPENLST_OPENLST_DEMOD_H
+#define INCLUDED_OPENLST_OPENLST_DEMOD_H
+
+#include <gnuradio/openlst/api.h>
+#include <gnuradio/sync_block.h>
+
+namespace gr {
+namespace openlst {
+
+/*!
+ * \brief OpenLST Decoder/Deframer
+ * \ingroup openlst
+ *
+ * \details
+ * Native implementation of the Python openlst_demod block. It decodes
+ * demodulated bits in CC1110 RF format:
+ *
+ *     | Preamble | Sync Word(s) | Data Section |
+ *
+ * Where "Data Section" contains:
+ *
+ *     | Length (1 byte) | Flags (1 byte) | Seqnum (2 bytes) | Data (N bytes) | HWID (2
+ * bytes) | CRC (2 bytes)
+ *
+ * Into a message on the "message" port in the form:
+ *
+ *     | HWID (2 bytes) | Seqnum (2 bytes) | Data (N bytes) |
+ *
+ * The Data Section may be 2:1 FEC encoded and/or PN9 whitened. Messages
+ * whose flags do not match flags under flags_mask are dropped.
+ *
+ * With packed set, each input byte holds 8 bits, MSB first (as from
+ * unpacked_to_packed_bb), instead of one bit per byte. Frames can still
+ * start at any bit.
+ */
+class OPENLST_API openlst_demod : virtual public gr::sync_block
+{
+public:
+    typedef std::shared_ptr<openlst_demod> sptr;
+
+    /*!
+     * \brief Return a shared_ptr to a new instance of openlst::openlst_demod.
+     *
+     * \param preamble_bytes Number of preamble bytes
+     * \param preamble_quality Minimum number of matching preamble bits
+     * \param sync_byte1 Sync word byte 1
+     * \param sync_byte0 Sync word byte 0
+     * \param sync_words Number of sync words
+     * \param flags_mask Mask applied to the flags byte before filtering
+     * \param flags Expected flags (after masking)
+     * \param fec Enable FEC decoding
+     * \param whitening Enable PN9 dewhitening
+     * \param soft Take float soft decisions instead of hard bits
+     * \param max_hypotheses Number of candidate packets decoded at once
+     * \param packed Take bytes of 8 packed bits (MSB first) instead of one bit per byte
+     */
+    static sptr make(int preamble_bytes = 4,
+                     int preamble_quality = 30,
+                     int sync_byte1 = 0xd3,
+                     int sync_byte0 = 0x91,
+                     int sync_words = 2,
+                     int flags_mask = 0x80,
+                     int flags = 0,
+                     bool fec = true,
+                     bool whitening = true,
+                     bool soft = false,
+                     int max_hypotheses = 1,
+                     bool packed = false);
+};
+
+} // namespace openlst
+} // namespace gr
+
+#endif /* INCLUDED_OPENLST_OPENLST_DEMOD_H */
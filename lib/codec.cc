@@ -0,0 +1,239 @@
+/* -*- c++ -*- */
+/*
+ * Copyright 2023 Robert Zimmerman.
+ *
+ * SPDX-License-Identifier: GPL-3.0-or-later
+ */
+
+#include "codec.h"
+#include <algorithm>
+#include <cmath>
+
+namespace gr {
+namespace openlst {
+
+namespace {
+
+// Trellis tables from CC1110 DN504 (A), shared with fec.py
+const int trellis_source_state[8][2] = { { 0, 4 }, { 0, 4 }, { 1, 5 }, { 1, 5 },
+                                         { 2, 6 }, { 2, 6 }, { 3, 7 }, { 3, 7 } };
+const int trellis_transition_output[8][2] = { { 0, 3 }, { 3, 0 }, { 1, 2 }, { 2, 1 },
+                                              { 3, 0 }, { 0, 3 }, { 2, 1 }, { 1, 2 } };
+const uint32_t trellis_transition_input[8] = { 0, 1, 0, 1, 0, 1, 0, 1 };
+
+std::array<uint16_t, 256> make_crc_table()
+{
+    std::array<uint16_t, 256> table;
+    for (int byte = 0; byte < 256; byte++) {
+        uint16_t crc = byte << 8;
+        for (int i = 0; i < 8; i++) {
+            crc = (crc & 0x8000) ? (crc << 1) ^ 0x8005 : crc << 1;
+        }
+        table[byte] = crc;
+    }
+    return table;
+}
+
+std::array<uint8_t, 511> make_pn9_table()
+{
+    std::array<uint8_t, 511> table;
+    uint16_t state = 0x1ff;
+    for (auto& value : table) {
+        value = state & 0xff;
+        for (int i = 0; i < 8; i++) {
+            uint16_t new_bit = ((state & 0x20) >> 5) ^ (state & 0x01);
+            state = (state >> 1) | (new_bit << 8);
+        }
+    }
+    return table;
+}
+
+// Interleaving is a fixed permutation of the 32 bits of a chunk, so it is
+// applied one byte lane at a time and the results ORed together
+std::array<std::array<uint32_t, 256>, 4> make_interleave_table()
+{
+    std::array<std::array<uint32_t, 256>, 4> table;
+    for (int lane = 0; lane < 4; lane++) {
+        for (int byte = 0; byte < 256; byte++) {
+            // Same as fec.interleave: read the little-endian chunk as a 4x4
+            // grid of 2-bit symbols and transpose it
+            uint32_t chunk = static_cast<uint32_t>(byte) << (8 * lane);
+            uint32_t grid[4][4];
+            for (int y = 0; y < 4; y++) {
+                for (int x = 0; x < 4; x++) {
+                    grid[y][x] = (chunk >> 30) & 3;
+                    chunk <<= 2;
+                }
+            }
+            uint32_t flipped = 0;
+            for (int x = 0; x < 4; x++) {
+                for (int y = 0; y < 4; y++) {
+                    flipped = (flipped << 2) | grid[y][x];
+                }
+            }
+            // The Python version returns the flipped value as little-endian
+            // bytes; consume them as a big-endian word
+            uint32_t word = ((flipped & 0xff) << 24) | ((flipped & 0xff00) << 8) |
+                            ((flipped >> 8) & 0xff00) | (flipped >> 24);
+            table[lane][byte] = word;
+        }
+    }
+    return table;
+}
+
+const std::array<uint16_t, 256> crc_table = make_crc_table();
+const std::array<uint8_t, 511> pn9 = make_pn9_table();
+const std::array<std::array<uint32_t, 256>, 4> interleave_table =
+    make_interleave_table();
+
+const int symbol_distance[4] = { 0, 1, 1, 2 };
+
+} // namespace
+
+uint16_t crc16(const uint8_t* data, size_t len, uint16_t crc)
+{
+    for (size_t i = 0; i < len; i++) {
+        crc = (crc << 8) ^ crc_table[((crc >> 8) ^ data[i]) & 0xff];
+    }
+    return crc;
+}
+
+const std::array<uint8_t, 511>& pn9_table() { return pn9; }
+
+uint8_t pn9_cursor::next()
+{
+    uint8_t value = pn9[d_offset];
+    d_offset = (d_offset + 1) % pn9.size();
+    return value;
+}
+
+void pn9_cursor::whiten(uint8_t* data, size_t len)
+{
+    for (size_t i = 0; i < len; i++) {
+        data[i] ^= next();
+    }
+}
+
+uint32_t deinterleave(const uint8_t* chunk)
+{
+    return interleave_table[0][chunk[0]] | interleave_table[1][chunk[1]] |
+           interleave_table[2][chunk[2]] | interleave_table[3][chunk[3]];
+}
+
+void viterbi_decoder::reset()
+{
+    d_cost.fill(0);
+    d_path.fill(0);
+    d_path_bits = 0;
+}
+
+void viterbi_decoder::decode(const uint8_t* chunk, std::vector<uint8_t>& out)
+{
+    uint32_t symbols = deinterleave(chunk);
+    for (int shift = 30; shift >= 0; shift -= 2) {
+        int symbol = (symbols >> shift) & 3;
+        std::array<int, 8> cost;
+        std::array<uint32_t, 8> path;
+        for (int dest = 0; dest < 8; dest++) {
+            int src0 = trellis_source_state[dest][0];
+            int src1 = trellis_source_state[dest][1];
+            int cost0 =
+                d_cost[src0] + symbol_distance[symbol ^ trellis_transition_output[dest][0]];
+            int cost1 =
+                d_cost[src1] + symbol_distance[symbol ^ trellis_transition_output[dest][1]];
+            // Ties go to the second source, as in the Python decoder
+            int src = cost0 < cost1 ? src0 : src1;
+            cost[dest] = std::min(cost0, cost1);
+            path[dest] = (d_path[src] << 1) | trellis_transition_input[dest];
+        }
+        int min_cost = *std::min_element(cost.begin(), cost.end());
+        for (int i = 0; i < 8; i++) {
+            d_cost[i] = cost[i] - min_cost;
+        }
+        d_path = path;
+        if (++d_path_bits >= 32) {
+            out.push_back((d_path[0] >> 24) & 0xff);
+            d_path_bits -= 8;
+        }
+    }
+}
+
+void soft_viterbi_decoder::reset()
+{
+    d_cost.fill(0.0);
+    d_path.fill(0);
+    d_path_bits = 0;
+}
+
+void soft_viterbi_decoder::decode(const float* chunk, std::vector<uint8_t>& out)
+{
+    // Deinterleave by running each received bit position through the
+    // interleaving permutation
+    float soft[32];
+    for (int lane = 0; lane < 4; lane++) {
+        for (int bit = 0; bit < 8; bit++) {
+            uint32_t word = interleave_table[lane][0x80 >> bit];
+            soft[__builtin_clz(word)] = chunk[lane * 8 + bit];
+        }
+    }
+    for (int i = 0; i < 16; i++) {
+        float hi = soft[2 * i];
+        float lo = soft[2 * i + 1];
+        // Cost of each possible symbol: the confidence of each received bit
+        // that disagrees with it
+        double branch[4];
+        for (int symbol = 0; symbol < 4; symbol++) {
+            float cost_hi = ((hi > 0) != bool(symbol & 2)) ? std::fabs(hi) : 0.0f;
+            float cost_lo = ((lo > 0) != bool(symbol & 1)) ? std::fabs(lo) : 0.0f;
+            branch[symbol] = cost_hi + cost_lo;
+        }
+        std::array<double, 8> cost;
+        std::array<uint32_t, 8> path;
+        for (int dest = 0; dest < 8; dest++) {
+            int src0 = trellis_source_state[dest][0];
+            int src1 = trellis_source_state[dest][1];
+            double cost0 = d_cost[src0] + branch[trellis_transition_output[dest][0]];
+            double cost1 = d_cost[src1] + branch[trellis_transition_output[dest][1]];
+            int src = cost0 < cost1 ? src0 : src1;
+            cost[dest] = cost0 < cost1 ? cost0 : cost1;
+            path[dest] = (d_path[src] << 1) | trellis_transition_input[dest];
+        }
+        double min_cost = *std::min_element(cost.begin(), cost.end());
+        for (int j = 0; j < 8; j++) {
+            d_cost[j] = cost[j] - min_cost;
+        }
+        d_path = path;
+        if (++d_path_bits >= 32) {
+            out.push_back((d_path[0] >> 24) & 0xff);
+            d_path_bits -= 8;
+        }
+    }
+}
+
+bool reformat_from_rf(const std::vector<uint8_t>& raw,
+                      std::vector<uint8_t>& msg,
+                      uint8_t& flags)
+{
+    // flags + seqnum + HWID + CRC
+    if (raw.size() < 7) {
+        return false;
+    }
+    size_t len = raw.size();
+    uint8_t length_byte = len;
+    uint16_t expected = crc16(&length_byte, 1);
+    expected = crc16(raw.data(), len - 2, expected);
+    uint16_t checksum = raw[len - 2] | (raw[len - 1] << 8);
+    if (checksum != expected) {
+        return false;
+    }
+    flags = raw[0];
+    msg.clear();
+    // HWID + seqnum + data
+    msg.insert(msg.end(), raw.end() - 4, raw.end() - 2);
+    msg.insert(msg.end(), raw.begin() + 1, raw.begin() + 3);
+    msg.insert(msg.end(), raw.begin() + 3, raw.end() - 4);
+    return true;
+}
+
+} // namespace openlst
+} // namespace gr
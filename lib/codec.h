@@ -0,0 +1,103 @@
+/* -*- c++ -*- */
+/*
+ * Copyright 2023 Robert Zimmerman.
+ *
+ * SPDX-License-Identifier: GPL-3.0-or-later
+ */
+
+#ifndef INCLUDED_OPENLST_CODEC_H
+#define INCLUDED_OPENLST_CODEC_H
+
+#include <array>
+#include <cstddef>
+#include <cstdint>
+#include <vector>
+
+namespace gr {
+namespace openlst {
+
+/*!
+ * \brief CRC-16 (in the manner of the CC1110), continuing from crc
+ */
+uint16_t crc16(const uint8_t* data, size_t len, uint16_t crc = 0xFFFF);
+
+/*!
+ * \brief One period (511 bytes) of the CC1110 PN9 whitening sequence
+ */
+const std::array<uint8_t, 511>& pn9_table();
+
+/*!
+ * \brief Position in the PN9 sequence used to whiten/dewhiten a stream
+ */
+class pn9_cursor
+{
+public:
+    pn9_cursor() : d_offset(0) {}
+    void reset() { d_offset = 0; }
+    uint8_t next();
+    void whiten(uint8_t* data, size_t len);
+
+private:
+    size_t d_offset;
+};
+
+/*!
+ * \brief Deinterleave a 4 byte FEC chunk into a word of 16 2-bit symbols
+ *
+ * The first symbol is in the top two bits of the result.
+ */
+uint32_t deinterleave(const uint8_t* chunk);
+
+/*!
+ * \brief Hard-decision Viterbi decoder for CC1110 FEC (DN504)
+ *
+ * This matches fec.decode_fec_chunk in the Python package: decode is fed 4
+ * byte chunks and returns the bytes that were decoded so far.
+ */
+class viterbi_decoder
+{
+public:
+    viterbi_decoder() { reset(); }
+    void reset();
+    void decode(const uint8_t* chunk, std::vector<uint8_t>& out);
+
+private:
+    std::array<int, 8> d_cost;
+    std::array<uint32_t, 8> d_path;
+    int d_path_bits;
+};
+
+/*!
+ * \brief Soft-decision variant of viterbi_decoder
+ *
+ * Each chunk is 32 floats, one per received bit, positive for a 1 bit.
+ * This matches fec.SoftViterbiDecoder in the Python package.
+ */
+class soft_viterbi_decoder
+{
+public:
+    soft_viterbi_decoder() { reset(); }
+    void reset();
+    void decode(const float* chunk, std::vector<uint8_t>& out);
+
+private:
+    std::array<double, 8> d_cost;
+    std::array<uint32_t, 8> d_path;
+    int d_path_bits;
+};
+
+/*!
+ * \brief Reframe a packet from RF format to serial format
+ *
+ * raw is the data section after the length byte. On success, msg holds
+ * HWID + seqnum + data, flags holds the flags byte and true is returned.
+ * Returns false if the packet is too short or the CRC does not match.
+ */
+bool reformat_from_rf(const std::vector<uint8_t>& raw,
+                      std::vector<uint8_t>& msg,
+                      uint8_t& flags);
+
+} // namespace openlst
+} // namespace gr
+
+#endif /* INCLUDED_OPENLST_CODEC_H */
@@ -0,0 +1,360 @@
+/* -*- c++ -*- */
+/*
+ * Copyright 2023 Robert Zimmerman.
+ *
+ * SPDX-License-Identifier: GPL-3.0-or-later
+ */
+
+#include "deframer.h"
+#include <algorithm>
+
+namespace gr {
+namespace openlst {
+
+namespace {
+
+uint8_t pack_byte(const uint8_t* bits)
+{
+    uint8_t value = 0;
+    for (size_t i = 0; i < 8; i++) {
+        value = (value << 1) | bits[i];
+    }
+    return value;
+}
+
+} // namespace
+
+frame_decoder::frame_decoder(bool fec, bool whitening, bool soft)
+    : d_whitening(whitening),
+      d_soft(soft),
+      d_state(fec ? state::lengthfec : state::length),
+      d_length(0),
+      d_fec_bits_left(0)
+{
+}
+
+bool frame_decoder::step(const uint8_t* bits, const float* soft, size_t n, size_t& used)
+{
+    switch (d_state) {
+    // Wait for the length byte (potentially whitened)
+    case state::length: {
+        if (n < 8) {
+            return false;
+        }
+        uint8_t length_byte = pack_byte(bits);
+        if (d_whitening) {
+            d_pn9.reset();
+            length_byte ^= d_pn9.next();
+        }
+        d_length = length_byte;
+        d_state = state::data;
+        used = 8;
+        return true;
+    }
+
+    // Wait for two chunks of FECed content to decode the length byte
+    case state::lengthfec: {
+        if (n < 64) {
+            return false;
+        }
+        std::vector<uint8_t> decoded;
+        if (d_soft) {
+            d_soft_decoder.reset();
+            d_soft_decoder.decode(soft, decoded);
+            d_soft_decoder.decode(soft + 32, decoded);
+        } else {
+            uint8_t chunks[8];
+            for (int i = 0; i < 8; i++) {
+                chunks[i] = pack_byte(bits + 8 * i);
+            }
+            d_decoder.reset();
+            d_decoder.decode(chunks, decoded);
+            d_decoder.decode(chunks + 4, decoded);
+        }
+        // FEC is done on the whitened data per the CC1110 datasheet
+        if (d_whitening) {
+            d_pn9.reset();
+            d_pn9.whiten(decoded.data(), decoded.size());
+        }
+        d_length = decoded[0];
+        d_fecbuff.assign(decoded.begin() + 1, decoded.end());
+        // The encoded data section is the length byte, the data and two
+        // terminator bytes, padded to a whole number of FEC chunks
+        d_fec_bits_left = 32 * ((d_length + 4) / 2) - 64;
+        d_state = state::datafec;
+        if (d_fecbuff.size() >= d_length) {
+            d_fecbuff.resize(d_length);
+            d_state = state::done;
+        }
+        used = 64;
+        return true;
+    }
+
+    // In non-FEC mode the whole data section is read at once
+    case state::data:
+        if (n < d_length * 8) {
+            return false;
+        }
+        d_fecbuff.resize(d_length);
+        for (size_t i = 0; i < d_length; i++) {
+            d_fecbuff[i] = pack_byte(bits + 8 * i);
+        }
+        if (d_whitening) {
+            d_pn9.whiten(d_fecbuff.data(), d_fecbuff.size());
+        }
+        d_state = state::done;
+        used = d_length * 8;
+        return true;
+
+    // In FEC mode we decode FEC chunks (4 bytes) as they arrive until we
+    // have enough bytes
+    case state::datafec: {
+        if (n < 32) {
+            return false;
+        }
+        used = 0;
+        for (size_t offset = 0; n >= offset + 32 && d_fecbuff.size() < d_length;
+             offset += 32) {
+            std::vector<uint8_t> decoded;
+            if (d_soft) {
+                d_soft_decoder.decode(soft + offset, decoded);
+            } else {
+                uint8_t chunk[4];
+                for (int i = 0; i < 4; i++) {
+                    chunk[i] = pack_byte(bits + offset + 8 * i);
+                }
+                d_decoder.decode(chunk, decoded);
+            }
+            // When the data section fills its last chunk, the decoder delay
+            // needs one chunk past the end of the packet to output the last
+            // byte. Those bits are only peeked at, since they may be the
+            // preamble of a back-to-back packet.
+            if (d_fec_bits_left >= 32) {
+                d_fec_bits_left -= 32;
+                used += 32;
+            }
+            if (d_whitening) {
+                d_pn9.whiten(decoded.data(), decoded.size());
+            }
+            d_fecbuff.insert(d_fecbuff.end(), decoded.begin(), decoded.end());
+        }
+        if (d_fecbuff.size() >= d_length) {
+            d_fecbuff.resize(d_length);
+            d_state = state::done;
+        }
+        return true;
+    }
+
+    case state::done:
+        break;
+    }
+    return false;
+}
+
+deframer::deframer(int preamble_bytes,
+                   int preamble_quality,
+                   uint8_t sync_byte1,
+                   uint8_t sync_byte0,
+                   int sync_words,
+                   int flags_mask,
+                   int flags,
+                   bool fec,
+                   bool whitening,
+                   bool soft,
+                   int max_hypotheses)
+    : d_preamble_quality(preamble_quality),
+      d_flags_mask(flags_mask),
+      d_flags(flags),
+      d_fec(fec),
+      d_whitening(whitening),
+      d_soft(soft),
+      d_max_hypotheses(std::max(max_hypotheses, 1)),
+      d_read(0),
+      d_in_frame(false),
+      d_frame(fec, whitening, soft),
+      d_base(0),
+      d_search(0)
+{
+    for (int i = 0; i < preamble_bytes * 8; i++) {
+        d_preamble.push_back((i + 1) % 2);
+    }
+    for (int i = 0; i < sync_words; i++) {
+        d_sync_word.push_back(sync_byte1);
+        d_sync_word.push_back(sync_byte0);
+    }
+    d_window = d_preamble.size() + 8 * d_sync_word.size();
+}
+
+void deframer::push(const uint8_t* bits,
+                    const float* soft,
+                    size_t n,
+                    std::vector<std::vector<uint8_t>>& packets)
+{
+    d_bits.insert(d_bits.end(), bits, bits + n);
+    if (d_soft) {
+        d_soft_bits.insert(d_soft_bits.end(), soft, soft + n);
+    }
+    if (d_max_hypotheses > 1) {
+        while (step_hypotheses(packets)) {
+        }
+    } else {
+        while (step(packets)) {
+        }
+    }
+    // Drop consumed bits once they make up most of the buffer
+    if (d_read > 4096 && d_read * 2 > d_bits.size()) {
+        d_bits.erase(d_bits.begin(), d_bits.begin() + d_read);
+        if (d_soft) {
+            d_soft_bits.erase(d_soft_bits.begin(), d_soft_bits.begin() + d_read);
+        }
+        d_read = 0;
+    }
+}
+
+void deframer::consume(size_t bits)
+{
+    d_read += bits;
+    d_base += bits;
+}
+
+const float* deframer::soft_at(size_t offset) const
+{
+    return d_soft ? d_soft_bits.data() + d_read + offset : nullptr;
+}
+
+// Check for a preamble with enough matching bits followed by an exact
+// sync word match. There must be d_window bits available after offset.
+bool deframer::sync_at(size_t offset) const
+{
+    const uint8_t* window = d_bits.data() + d_read + offset;
+    if (window[0] != 1) {
+        return false;
+    }
+    int matched = 0;
+    for (size_t i = 0; i < d_preamble.size(); i++) {
+        matched += window[i] == d_preamble[i];
+    }
+    if (matched < d_preamble_quality) {
+        return false;
+    }
+    window += d_preamble.size();
+    for (size_t i = 0; i < d_sync_word.size(); i++) {
+        if (pack_byte(window + 8 * i) != d_sync_word[i]) {
+            return false;
+        }
+    }
+    return true;
+}
+
+// Check a complete data section, adding it to packets if it passes the
+// flags filter. Returns true if it was a valid frame.
+bool deframer::check(const std::vector<uint8_t>& raw,
+                     std::vector<std::vector<uint8_t>>& packets) const
+{
+    std::vector<uint8_t> msg;
+    uint8_t flags;
+    if (!reformat_from_rf(raw, msg, flags)) {
+        return false;
+    }
+    if ((flags & d_flags_mask) == d_flags) {
+        packets.push_back(std::move(msg));
+    }
+    return true;
+}
+
+bool deframer::step(std::vector<std::vector<uint8_t>>& packets)
+{
+    // Waiting for preamble and sync word(s)
+    if (!d_in_frame) {
+        while (available() >= d_window) {
+            if (sync_at(0)) {
+                consume(d_window);
+                d_frame = frame_decoder(d_fec, d_whitening, d_soft);
+                d_in_frame = true;
+                return true;
+            }
+            consume(1);
+        }
+        return false;
+    }
+
+    size_t used;
+    if (!d_frame.step(d_bits.data() + d_read, soft_at(0), available(), used)) {
+        return false;
+    }
+    consume(used);
+    if (d_frame.done()) {
+        // Start looking for the next packet whether or not this one was valid
+        check(d_frame.data(), packets);
+        d_in_frame = false;
+    }
+    return true;
+}
+
+bool deframer::open_hypotheses()
+{
+    size_t offset = d_search - d_base;
+    bool opened = false;
+    while (available() >= offset + d_window) {
+        if (sync_at(offset)) {
+            if (d_hypotheses.size() >= d_max_hypotheses) {
+                // Resume from here once a candidate resolves
+                break;
+            }
+            size_t start = d_base + offset;
+            d_hypotheses.push_back(
+                { start, start + d_window, frame_decoder(d_fec, d_whitening, d_soft) });
+            opened = true;
+        }
+        offset++;
+    }
+    d_search = d_base + offset;
+    return opened;
+}
+
+bool deframer::step_hypotheses(std::vector<std::vector<uint8_t>>& packets)
+{
+    bool progress = open_hypotheses();
+
+    for (auto& hyp : d_hypotheses) {
+        size_t offset = hyp.pos - d_base;
+        size_t used;
+        while (!hyp.frame.done() &&
+               hyp.frame.step(d_bits.data() + d_read + offset,
+                              soft_at(offset),
+                              available() - offset,
+                              used)) {
+            hyp.pos += used;
+            offset += used;
+        }
+    }
+
+    // Candidates are only resolved once all earlier ones are, so packets
+    // come out in order
+    while (!d_hypotheses.empty() && d_hypotheses.front().frame.done()) {
+        const size_t end = d_hypotheses.front().pos;
+        const bool valid = check(d_hypotheses.front().frame.data(), packets);
+        d_hypotheses.erase(d_hypotheses.begin());
+        if (valid) {
+            d_hypotheses.erase(std::remove_if(d_hypotheses.begin(),
+                                              d_hypotheses.end(),
+                                              [end](const hypothesis& h) {
+                                                  return h.start < end;
+                                              }),
+                               d_hypotheses.end());
+            d_search = std::max(d_search, end);
+        }
+        progress = true;
+    }
+
+    // Drop the bits no candidate or search needs any more
+    size_t keep = d_search;
+    for (const auto& hyp : d_hypotheses) {
+        keep = std::min(keep, hyp.pos);
+    }
+    consume(keep - d_base);
+    return progress;
+}
+
+} // namespace openlst
+} // namespace gr
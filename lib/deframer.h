@@ -0,0 +1,136 @@
+/* -*- c++ -*- */
+/*
+ * Copyright 2023 Robert Zimmerman.
+ *
+ * SPDX-License-Identifier: GPL-3.0-or-later
+ */
+
+#ifndef INCLUDED_OPENLST_DEFRAMER_H
+#define INCLUDED_OPENLST_DEFRAMER_H
+
+#include "codec.h"
+#include <cstddef>
+#include <cstdint>
+#include <vector>
+
+namespace gr {
+namespace openlst {
+
+/*!
+ * \brief Decoding state for the data section of one frame
+ *
+ * This matches deframer._Frame in the Python package. Input is read from
+ * a pointer to the first bit the frame hasn't used yet, so several frames
+ * can be decoded from the same buffer.
+ */
+class frame_decoder
+{
+public:
+    frame_decoder(bool fec, bool whitening, bool soft);
+
+    /*!
+     * \brief Run one state with the n available bits (and soft values)
+     *
+     * Returns false if more input is needed. Otherwise used is set to the
+     * number of bits that were used up.
+     */
+    bool step(const uint8_t* bits, const float* soft, size_t n, size_t& used);
+
+    bool done() const { return d_state == state::done; }
+    const std::vector<uint8_t>& data() const { return d_fecbuff; }
+
+private:
+    enum class state { length, lengthfec, data, datafec, done };
+
+    bool d_whitening;
+    bool d_soft;
+    state d_state;
+    size_t d_length;
+    size_t d_fec_bits_left;
+    pn9_cursor d_pn9;
+    viterbi_decoder d_decoder;
+    soft_viterbi_decoder d_soft_decoder;
+    std::vector<uint8_t> d_fecbuff;
+};
+
+/*!
+ * \brief CC1110 deframer state machine, independent of GNU Radio
+ *
+ * This follows the same states as the Python Deframer:
+ * preamble -> length/lengthfec -> data/datafec, including the
+ * multi-hypothesis mode when max_hypotheses > 1.
+ */
+class deframer
+{
+public:
+    deframer(int preamble_bytes,
+             int preamble_quality,
+             uint8_t sync_byte1,
+             uint8_t sync_byte0,
+             int sync_words,
+             int flags_mask,
+             int flags,
+             bool fec,
+             bool whitening,
+             bool soft,
+             int max_hypotheses = 1);
+
+    /*!
+     * \brief Add bits and decode as many packets as possible
+     *
+     * bits are hard bits (0 or 1). If the deframer is in soft mode, soft
+     * holds the matching soft values and bits their signs. Decoded packets
+     * that pass the flags filter are appended to packets.
+     */
+    void push(const uint8_t* bits,
+              const float* soft,
+              size_t n,
+              std::vector<std::vector<uint8_t>>& packets);
+
+private:
+    struct hypothesis {
+        size_t start;
+        size_t pos;
+        frame_decoder frame;
+    };
+
+    bool step(std::vector<std::vector<uint8_t>>& packets);
+    bool step_hypotheses(std::vector<std::vector<uint8_t>>& packets);
+    bool open_hypotheses();
+    void consume(size_t bits);
+    size_t available() const { return d_bits.size() - d_read; }
+    bool sync_at(size_t offset) const;
+    bool check(const std::vector<uint8_t>& raw,
+               std::vector<std::vector<uint8_t>>& packets) const;
+    const float* soft_at(size_t offset) const;
+
+    std::vector<uint8_t> d_preamble;
+    int d_preamble_quality;
+    std::vector<uint8_t> d_sync_word;
+    size_t d_window;
+    int d_flags_mask;
+    int d_flags;
+    bool d_fec;
+    bool d_whitening;
+    bool d_soft;
+    size_t d_max_hypotheses;
+
+    std::vector<uint8_t> d_bits;
+    std::vector<float> d_soft_bits;
+    size_t d_read;
+
+    // Single hypothesis mode
+    bool d_in_frame;
+    frame_decoder d_frame;
+
+    // Multi-hypothesis mode: the absolute bit position of d_read, the next
+    // position to search for a preamble and the open candidates
+    size_t d_base;
+    size_t d_search;
+    std::vector<hypothesis> d_hypotheses;
+};
+
+} // namespace openlst
+} // namespace gr
+
+#endif /* INCLUDED_OPENLST_DEFRAMER_H */
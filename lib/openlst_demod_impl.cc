@@ -0,0 +1,117 @@
+/* -*- c++ -*- */
+/*
+ * Copyright 2023 Robert Zimmerman.
+ *
+ * SPDX-License-Identifier: GPL-3.0-or-later
+ */
+
+#include "openlst_demod_impl.h"
+#include <gnuradio/io_signature.h>
+#include <stdexcept>
+
+namespace gr {
+namespace openlst {
+
+openlst_demod::sptr openlst_demod::make(int preamble_bytes,
+                                        int preamble_quality,
+                                        int sync_byte1,
+                                        int sync_byte0,
+                                        int sync_words,
+                                        int flags_mask,
+                                        int flags,
+                                        bool fec,
+                                        bool whitening,
+                                        bool soft,
+                                        int max_hypotheses,
+                                        bool packed)
+{
+    return gnuradio::make_block_sptr<openlst_demod_impl>(preamble_bytes,
+                                                         preamble_quality,
+                                                         sync_byte1,
+                                                         sync_byte0,
+                                                         sync_words,
+                                                         flags_mask,
+                                                         flags,
+                                                         fec,
+                                                         whitening,
+                                                         soft,
+                                                         max_hypotheses,
+                                                         packed);
+}
+
+openlst_demod_impl::openlst_demod_impl(int preamble_bytes,
+                                       int preamble_quality,
+                                       int sync_byte1,
+                                       int sync_byte0,
+                                       int sync_words,
+                                       int flags_mask,
+                                       int flags,
+                                       bool fec,
+                                       bool whitening,
+                                       bool soft,
+                                       int max_hypotheses,
+                                       bool packed)
+    : gr::sync_block("CC1110 Decode and Deframe",
+                     gr::io_signature::make(
+                         1, 1, soft ? sizeof(float) : sizeof(uint8_t)),
+                     gr::io_signature::make(0, 0, 0)),
+      d_soft(soft),
+      d_packed(packed),
+      d_deframer(preamble_bytes,
+                 preamble_quality,
+                 sync_byte1,
+                 sync_byte0,
+                 sync_words,
+                 flags_mask,
+                 flags,
+                 fec,
+                 whitening,
+                 soft,
+                 max_hypotheses)
+{
+    // Messages are sent in raw form without a length or CRC
+    // generally this goes to a ZMQ socket
+    message_port_register_out(pmt::mp("message"));
+    if (soft && packed) {
+        throw std::invalid_argument("packed input can't be used with soft input");
+    }
+}
+
+openlst_demod_impl::~openlst_demod_impl() {}
+
+int openlst_demod_impl::work(int noutput_items,
+                             gr_vector_const_void_star& input_items,
+                             gr_vector_void_star& output_items)
+{
+    d_packets.clear();
+    if (d_soft) {
+        auto in = static_cast<const float*>(input_items[0]);
+        d_hard.resize(noutput_items);
+        for (int i = 0; i < noutput_items; i++) {
+            d_hard[i] = in[i] > 0;
+        }
+        d_deframer.push(d_hard.data(), in, noutput_items, d_packets);
+    } else if (d_packed) {
+        // Unpack MSB first, the deframer keeps its own bit position so
+        // frames don't need to be byte aligned
+        auto in = static_cast<const uint8_t*>(input_items[0]);
+        d_hard.resize(8 * noutput_items);
+        for (int i = 0; i < noutput_items; i++) {
+            for (int bit = 0; bit < 8; bit++) {
+                d_hard[8 * i + bit] = (in[i] >> (7 - bit)) & 1;
+            }
+        }
+        d_deframer.push(d_hard.data(), nullptr, 8 * noutput_items, d_packets);
+    } else {
+        auto in = static_cast<const uint8_t*>(input_items[0]);
+        d_deframer.push(in, nullptr, noutput_items, d_packets);
+    }
+
+    for (const auto& pkt : d_packets) {
+        message_port_pub(pmt::mp("message"), pmt::init_u8vector(pkt.size(), pkt));
+    }
+    return noutput_items;
+}
+
+} // namespace openlst
+} // namespace gr
@@ -0,0 +1,49 @@
+/* -*- c++ -*- */
+/*
+ * Copyright 2023 Robert Zimmerman.
+ *
+ * SPDX-License-Identifier: GPL-3.0-or-later
+ */
+
+#ifndef INCLUDED_OPENLST_OPENLST_DEMOD_IMPL_H
+#define INCLUDED_OPENLST_OPENLST_DEMOD_IMPL_H
+
+#include "deframer.h"
+#include <gnuradio/openlst/openlst_demod.h>
+
+namespace gr {
+namespace openlst {
+
+class openlst_demod_impl : public openlst_demod
+{
+private:
+    const bool d_soft;
+    const bool d_packed;
+    deframer d_deframer;
+    std::vector<uint8_t> d_hard;
+    std::vector<std::vector<uint8_t>> d_packets;
+
+public:
+    openlst_demod_impl(int preamble_bytes,
+                       int preamble_quality,
+                       int sync_byte1,
+                       int sync_byte0,
+                       int sync_words,
+                       int flags_mask,
+                       int flags,
+                       bool fec,
+                       bool whitening,
+                       bool soft,
+                       int max_hypotheses,
+                       bool packed);
+    ~openlst_demod_impl() override;
+
+    int work(int noutput_items,
+             gr_vector_const_void_star& input_items,
+             gr_vector_void_star& output_items) override;
+};
+
+} // namespace openlst
+} // namespace gr
+
+#endif /* INCLUDED_OPENLST_OPENLST_DEMOD_IMPL_H */
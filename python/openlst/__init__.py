@@ -10,18 +10,71 @@
 This is the GNU Radio OpenLST module. Place your Python package
 description here (python/__init__.py).
 '''
-import os
-
-# import pybind11 generated symbols into the openlst namespace
-try:
-    # this might fail if the module is python-only
-    from .openlst_python import *
-except ModuleNotFoundError:
-    pass
-
-# import any pure python here
-from .openlst_mod import openlst_mod
-from .openlst_demod import openlst_demod
-from .raw_zmq_source import raw_zmq_source
-from .raw_zmq_sink import raw_zmq_sink
-#
+import importlib
+import sys
+import types
+
+# The Python blocks, each defined in the module of the same name. They are
+# imported on first use rather than here, so the pure Python modules (like
+# codec) can be used without loading GNU Radio, PMT or ZMQ.
+_BLOCKS = (
+    'openlst_mod',
+    'openlst_demod',
+    'openlst_multi_demod',
+    'packet_dedup',
+    'raw_zmq_source',
+    'raw_zmq_sink',
+)
+
+# Other names for Python blocks, by the module that defines them. The Python
+# deframer has worker processes and statistics, which the C++ one (which
+# openlst_demod refers to when it is built) doesn't.
+_ALIASES = {
+    'openlst_demod_py': 'openlst_demod',
+}
+
+
+def _native():
+    # pybind11 generated symbols. This might fail if the module is python-only
+    try:
+        return importlib.import_module('.openlst_python', __name__)
+    except ModuleNotFoundError:
+        return None
+
+
+def __getattr__(name):
+    native = _native()
+    if name == 'openlst_demod' and native is not None and hasattr(native, name):
+        # Prefer the native deframer when the C++ library was built
+        value = native.openlst_demod
+    elif name in _BLOCKS:
+        value = getattr(importlib.import_module('.' + name, __name__), name)
+    elif name in _ALIASES:
+        module = _ALIASES[name]
+        value = getattr(importlib.import_module('.' + module, __name__), module)
+    elif native is not None and not name.startswith('__') and hasattr(native, name):
+        value = getattr(native, name)
+    else:
+        raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    names = set(globals()) | set(_BLOCKS) | set(_ALIASES)
+    native = _native()
+    if native is not None:
+        names.update(n for n in dir(native) if not n.startswith('_'))
+    return sorted(names)
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name, value):
+        # Importing a block's module sets it as an attribute of the package,
+        # which would hide the block of the same name
+        if name in _BLOCKS and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
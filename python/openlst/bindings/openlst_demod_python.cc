@@ -0,0 +1,59 @@
+/*
+ * Copyright 2023 Free Software Foundation, Inc.
+ *
+ * This file is part of GNU Radio
+ *
+ * SPDX-License-Identifier: GPL-3.0-or-later
+ *
+ */
+
+/***********************************************************************************/
+/* This file is automatically generated using bindtool and can be manually edited  */
+/* The following lines can be configured to regenerate this file during cmake      */
+/* If manual edits are made, the following tags should be modified accordingly.    */
+/* BINDTOOL_GEN_AUTOMATIC(0)                                                       */
+/* BINDTOOL_USE_PYGCCXML(0)                                                        */
+/* BINDTOOL_HEADER_FILE(openlst_demod.h)                                           */
+/* BINDTOOL_HEADER_FILE_HASH(0be12d720fe70c5a6b3484685b7101e7)                     */
+/***********************************************************************************/
+
+#include <pybind11/complex.h>
+#include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
+
+namespace py = pybind11;
+
+#include <gnuradio/openlst/openlst_demod.h>
+// pydoc.h is automatically generated in the build directory
+#include <openlst_demod_pydoc.h>
+
+void bind_openlst_demod(py::module& m)
+{
+
+    using openlst_demod = ::gr::openlst::openlst_demod;
+
+
+    py::class_<openlst_demod,
+               gr::sync_block,
+               gr::block,
+               gr::basic_block,
+               std::shared_ptr<openlst_demod>>(m, "openlst_demod", D(openlst_demod))
+
+        .def(py::init(&openlst_demod::make),
+             py::arg("preamble_bytes") = 4,
+             py::arg("preamble_quality") = 30,
+             py::arg("sync_byte1") = 0xd3,
+             py::arg("sync_byte0") = 0x91,
+             py::arg("sync_words") = 2,
+             py::arg("flags_mask") = 0x80,
+             py::arg("flags") = 0,
+             py::arg("fec") = true,
+             py::arg("whitening") = true,
+             py::arg("soft") = false,
+             py::arg("max_hypotheses") = 1,
+             py::arg("packed") = false,
+             D(openlst_demod, make))
+
+
+        ;
+}
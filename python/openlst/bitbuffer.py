@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import numpy as np
+
+
+class BitBuffer:
+    """Circular buffer of bits (or soft values) in a preallocated array
+
+    Every item is written twice, at position i and i + capacity, so any
+    run of up to capacity items can be returned as a contiguous, zero-copy
+    view even when it wraps around the end of the ring. Storage only grows
+    (by doubling) if more items are queued than fit, so memory use stays
+    flat for a long running flowgraph.
+
+    Views are only valid until the next call to extend, which may
+    overwrite the items they point to.
+    """
+    def __init__(self, capacity=1 << 15, dtype=np.uint8):
+        self._capacity = capacity
+        self._storage = np.zeros(2 * capacity, dtype=dtype)
+        self._head = 0
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def clear(self):
+        self._head = 0
+        self._length = 0
+
+    def _grow(self, needed):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        storage = np.zeros(2 * capacity, dtype=self._storage.dtype)
+        storage[:self._length] = self.view()
+        storage[capacity:capacity + self._length] = storage[:self._length]
+        self._storage = storage
+        self._capacity = capacity
+        self._head = 0
+
+    def extend(self, items):
+        """Append items to the end of the buffer"""
+        items = np.asarray(items)
+        count = len(items)
+        if self._length + count > self._capacity:
+            self._grow(self._length + count)
+        capacity = self._capacity
+        tail = (self._head + self._length) % capacity
+        # Up to two segments: to the end of the ring, then from the start
+        first = min(count, capacity - tail)
+        for start, end, src in ((tail, tail + first, items[:first]),
+                                (0, count - first, items[first:])):
+            if end > start:
+                self._storage[start:end] = src
+                self._storage[start + capacity:end + capacity] = src
+        self._length += count
+
+    def consume(self, count):
+        """Drop count items from the front of the buffer"""
+        count = min(count, self._length)
+        self._head = (self._head + count) % self._capacity
+        self._length -= count
+
+    def view(self, start=0, stop=None) -> np.ndarray:
+        """Return a zero-copy view of items start to stop"""
+        if stop is None or stop > self._length:
+            stop = self._length
+        start = min(start, stop)
+        begin = (self._head + start) % self._capacity
+        return self._storage[begin:begin + stop - start]
+
+    def pack(self, start, count) -> bytes:
+        """Pack count bits (MSB first) starting at start into bytes
+
+        count should be a multiple of 8. Soft values are packed by their
+        sign, with positive values as 1 bits.
+        """
+        bits = self.view(start, start + count)
+        if bits.dtype != np.uint8:
+            bits = bits > 0
+        return np.packbits(bits).tobytes()
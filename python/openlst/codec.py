@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""Batch encoding and decoding of OpenLST frames without GNU Radio
+
+encode_frames turns a list of raw messages into RF frames and
+decode_frames finds and decodes every frame in a bitstream, both with
+the same framing options as the blocks. Results are NumPy structured
+arrays, so thousands of frames can be built or checked in one call.
+
+This module only needs NumPy, so scripts and test harnesses can use it
+without loading GNU Radio, PMT or ZMQ:
+
+    >>> from gnuradio.openlst import codec
+    >>> frames = codec.encode_frames([b'\\x01\\x00\\x02\\x00hello'], flags=0x40)
+    >>> packets = codec.decode_frames(codec.frames_to_bits(frames))
+    >>> packets['packet'][0, :packets['packet_len'][0]].tobytes()
+    b'\\x01\\x00\\x02\\x00hello'
+
+encode_frames sets the flags the blocks send by default (0xC0, with the
+ground bit set), and decode_frames checks the flags the blocks expect by
+default (the ground bit clear), so frames for a loopback need flags
+with the ground bit clear, like 0x40 here.
+"""
+
+import numpy as np
+
+from .bitbuffer import BitBuffer
+from .deframer import MIN_LENGTH, CRCError, _Frame, reformat_from_rf
+from .framer import Framer
+from .sync import SyncDetector
+
+# Longest data section (length 255) in bits: FEC encodes the length byte,
+# the data and 2 terminator bytes at 16 bits per byte, and the decoder
+# peeks at one more chunk
+MAX_DATA_BITS = 16 * (255 + 4) + 32
+
+# Zero bits added where the stream ends, so the FEC decoder can output
+# the last byte of a frame that ends there (it needs one chunk more)
+FLUSH_BITS = 32
+
+# Longest packet in serial format: the length byte counts the flags and
+# CRC, and the HWID and seqnum move to the front
+MAX_PACKET = 255 - 3
+
+PACKET_DTYPE = np.dtype([
+    ('offset', np.int64),  # bit offset of the preamble
+    ('end', np.int64),  # bit offset after the data section
+    ('length', np.uint8),  # length byte
+    ('flags', np.uint8),
+    ('hwid', np.uint16),
+    ('seqnum', np.uint16),
+    ('crc_ok', np.bool_),
+    ('filtered', np.bool_),  # valid, but dropped by the flags check
+    ('corrected', np.uint16),  # bit errors corrected by FEC
+    ('packet_len', np.uint16),
+    ('packet', np.uint8, (MAX_PACKET,)),  # serial format, zero padded
+])
+
+
+def encode_frames(
+    msgs,
+    preamble_bytes=4,
+    sync_byte1=0xd3,
+    sync_byte0=0x91,
+    sync_words=2,
+    flags=0xC0,
+    fec=True,
+    whitening=True,
+) -> np.ndarray:
+    """Encode raw messages (in serial format) into RF frames
+
+    Returns a structured array with a row per message: the frame length in
+    bytes (length) and the frame, zero padded to the longest one (frame).
+    """
+    framer = Framer(
+        preamble_bytes=preamble_bytes,
+        sync_byte1=sync_byte1,
+        sync_byte0=sync_byte0,
+        sync_words=sync_words,
+        flags=flags,
+        fec=fec,
+        whitening=whitening,
+    )
+    encoded = [framer.encode(msg) for msg in msgs]
+    width = max((len(frame) for frame in encoded), default=0)
+    frames = np.zeros(len(encoded), dtype=[('length', np.uint16), ('frame', np.uint8, (width,))])
+    for i, frame in enumerate(encoded):
+        frames['length'][i] = len(frame)
+        frames['frame'][i, :len(frame)] = frame
+    return frames
+
+
+def frames_to_bits(frames, gap=0) -> np.ndarray:
+    """Join frames from encode_frames into one bitstream (a byte per bit)
+
+    gap zero bits are added before each frame and at the end.
+    """
+    spacer = np.zeros(gap, dtype=np.uint8)
+    parts = [spacer]
+    for length, frame in zip(frames['length'], frames['frame']):
+        parts.append(np.unpackbits(frame[:length]))
+        parts.append(spacer)
+    return np.concatenate(parts)
+
+
+def decode_candidate(bits, soft=None, fec=True, whitening=True):
+    """Decode the data section of a frame
+
+    bits (and soft, the matching soft values or None) are the bitstream
+    from the start of the data section, after the sync word(s). If they
+    are shorter than the longest data section, the stream is taken to
+    end there and FLUSH_BITS zero bits are added. Returns the _Frame and
+    the number of bits it used up, or None if the stream ends first.
+    """
+    buff = BitBuffer(capacity=MAX_DATA_BITS + FLUSH_BITS)
+    buff.extend(bits[:MAX_DATA_BITS])
+    flush = len(buff) < MAX_DATA_BITS
+    if flush:
+        buff.extend(np.zeros(FLUSH_BITS, dtype=np.uint8))
+    soft_buff = None
+    if soft is not None:
+        soft_buff = BitBuffer(capacity=MAX_DATA_BITS + FLUSH_BITS, dtype=np.float32)
+        soft_buff.extend(soft[:MAX_DATA_BITS])
+        if flush:
+            soft_buff.extend(np.zeros(FLUSH_BITS, dtype=np.float32))
+    frame = _Frame(fec, whitening, soft is not None)
+    pos = 0
+    while frame.data is None:
+        bits_used = frame.step(buff, soft_buff, pos)
+        if bits_used is None:
+            return None
+        pos += bits_used
+    return frame, pos
+
+
+def _record(frame, offset, end, flags_mask, flags):
+    """Describe a decoded frame, or return None if it is too short"""
+    data = frame.data
+    if len(data) < MIN_LENGTH:
+        return None
+    try:
+        packet, pkt_flags = reformat_from_rf(data)
+        crc_ok = True
+    except CRCError:
+        # Report what the fields would be anyway
+        packet = data[-4:-2] + data[1:3] + data[3:-4]
+        pkt_flags = data[0]
+        crc_ok = False
+    return {
+        'offset': offset,
+        'end': end,
+        'length': frame.length,
+        'flags': pkt_flags,
+        'hwid': int.from_bytes(packet[0:2], byteorder='little'),
+        'seqnum': int.from_bytes(packet[2:4], byteorder='little'),
+        'crc_ok': crc_ok,
+        'filtered': crc_ok and pkt_flags & flags_mask != flags,
+        'corrected': frame.corrected_bits(),
+        'packet': packet,
+    }
+
+
+def decode_candidates(
+    bits,
+    soft=None,
+    stop=None,
+    preamble_bytes=4,
+    preamble_quality=30,
+    sync_byte1=0xd3,
+    sync_byte0=0x91,
+    sync_words=2,
+    flags_mask=0x80,
+    flags=0,
+    fec=True,
+    whitening=True,
+):
+    """Decode every frame candidate in a bitstream
+
+    Every sync word match starting before bit stop (default the whole
+    stream) is decoded on its own, and a record (a dictionary with the
+    fields of PACKET_DTYPE) is returned for each one, in order, whatever
+    its CRC. bits ends where the stream ends (see decode_candidate), and
+    candidates that run past it are left out.
+    """
+    detector = SyncDetector(
+        preamble_bytes, preamble_quality, bytes([sync_byte1, sync_byte0] * sync_words))
+    window = detector.window
+    if stop is None:
+        stop = len(bits)
+    records = []
+    for offset in detector.find(bits[:stop + window - 1]):
+        offset = int(offset)
+        data = offset + window
+        decoded = decode_candidate(
+            bits[data:], soft[data:] if soft is not None else None, fec, whitening)
+        if decoded is None:
+            continue
+        frame, used = decoded
+        record = _record(frame, offset, data + used, flags_mask, flags)
+        if record is not None:
+            records.append(record)
+    return records
+
+
+def resolve(records):
+    """Drop candidates that start inside an earlier valid frame
+
+    These are false sync word matches on its data. records can be any
+    iterable of records in order, and is consumed lazily.
+    """
+    last_end = 0
+    for record in records:
+        if record['offset'] < last_end:
+            continue
+        if record['crc_ok']:
+            last_end = record['end']
+        yield record
+
+
+def to_array(records) -> np.ndarray:
+    """Convert records to a PACKET_DTYPE structured array"""
+    records = list(records)
+    packets = np.zeros(len(records), dtype=PACKET_DTYPE)
+    for i, record in enumerate(records):
+        row = packets[i]
+        for field in ('offset', 'end', 'length', 'flags', 'hwid', 'seqnum',
+                      'crc_ok', 'filtered', 'corrected'):
+            row[field] = record[field]
+        packet = record['packet']
+        row['packet_len'] = len(packet)
+        row['packet'][:len(packet)] = np.frombuffer(packet, dtype=np.uint8)
+    return packets
+
+
+def decode_frames(bitstream, packed=False, soft=False, include_bad=False, **kwargs) -> np.ndarray:
+    """Find and decode every frame in a bitstream
+
+    bitstream is one byte per bit, bytes of 8 bits (MSB first) if packed
+    is set, or soft values (positive for 1 bits) if soft is set. The other
+    keyword arguments are the deframer options (see decode_candidates).
+
+    Returns a PACKET_DTYPE structured array of the packets that passed the
+    CRC and flags checks, in order. With include_bad, frames that failed
+    either check are included too (see the crc_ok and filtered fields).
+    """
+    soft_values = None
+    if soft:
+        soft_values = np.asarray(bitstream, dtype=np.float32)
+        bits = (soft_values > 0).astype(np.uint8)
+    elif packed:
+        bits = np.unpackbits(np.frombuffer(bitstream, dtype=np.uint8))
+    else:
+        bits = np.asarray(bitstream, dtype=np.uint8)
+    records = resolve(decode_candidates(bits, soft_values, **kwargs))
+    if not include_bad:
+        records = (r for r in records if r['crc_ok'] and not r['filtered'])
+    return to_array(records)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import time
+from collections import OrderedDict
+
+EVICT_LRU = 'lru'
+EVICT_FIFO = 'fifo'
+EVICTION_POLICIES = (EVICT_LRU, EVICT_FIFO)
+
+
+def packet_key(packet: bytes):
+    """Return the cache key for a packet in serial format
+
+    The key is the HWID, the seqnum and a hash of the data, so a reused
+    seqnum with different data isn't mistaken for a duplicate.
+    """
+    return bytes(packet[:4]), hash(bytes(packet[4:]))
+
+
+class DuplicateCache:
+    """Bounded cache of recently seen packets
+
+    seen() records a key and reports whether it was already in the cache.
+    At most capacity keys are kept, and if window is set (in seconds) a
+    key is forgotten window seconds after it was last refreshed. The
+    eviction policy decides what refreshes a key:
+
+    - lru: every duplicate moves the key to the back and restarts its
+      window, so a packet repeated continuously stays suppressed
+    - fifo: only the first sighting counts, so the packet is passed again
+      window seconds (or capacity new packets) after it was first seen
+
+    When the cache is full, the least recently refreshed key is evicted.
+    Keys are kept in refresh order, so expiring and evicting only ever
+    look at the front and each call is O(1) amortized.
+    """
+    def __init__(self, capacity=1024, window=0, policy=EVICT_LRU, clock=time.monotonic):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(
+                "unknown eviction policy '%s' - expected one of %s" %
+                (policy, ", ".join(EVICTION_POLICIES)))
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.window = window
+        self.policy = policy
+        self._clock = clock
+        # Key -> time it was last refreshed, oldest first
+        self._entries = OrderedDict()
+
+        self.lookups = 0
+        self.hits = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expire(self, now):
+        if not self.window:
+            return
+        entries = self._entries
+        while entries:
+            key, refreshed = next(iter(entries.items()))
+            if now - refreshed < self.window:
+                break
+            del entries[key]
+            self.expired += 1
+
+    def seen(self, key) -> bool:
+        """Record key, returning True if it is a duplicate"""
+        now = self._clock()
+        self._expire(now)
+        self.lookups += 1
+        entries = self._entries
+        if key in entries:
+            self.hits += 1
+            if self.policy == EVICT_LRU:
+                entries[key] = now
+                entries.move_to_end(key)
+            return True
+        if len(entries) >= self.capacity:
+            entries.popitem(last=False)
+            self.evicted += 1
+        entries[key] = now
+        return False
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._entries),
+            'capacity': self.capacity,
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'evicted': self.evicted,
+            'expired': self.expired,
+        }
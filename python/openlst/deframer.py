@@ -0,0 +1,551 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+from time import perf_counter_ns
+
+import numpy as np
+
+from .fec import ViterbiDecoder, SoftViterbiDecoder, corrected_bits
+from .whitening import PN9, whiten
+from .crc import crc16_table
+from .sync import SyncDetector
+from .bitbuffer import BitBuffer
+from .stats import DecoderStats
+
+# Flags (1 byte) + Seqnum (2 bytes) + HWID (2 bytes) + CRC (2 bytes)
+MIN_LENGTH = 7
+
+
+class CRCError(Exception):
+    def __init__(self, expected, actual):
+        self.expected = expected
+        self.actual = actual
+
+    def __str__(self):
+        return f"CRCError: Expected {self.expected:04x} got {self.actual:04x}"
+
+
+def reformat_from_rf(raw):
+    """reframe the packet from RF format to serial format"""
+    flags = raw[0]
+    seqnum = raw[1:3]
+    packet = raw[3:len(raw) - 4]
+    hwid = raw[len(raw) - 4:len(raw) - 2]
+    msg = hwid + seqnum + packet
+    checksum = int.from_bytes(raw[len(raw) - 2:], byteorder='little')
+    expected = crc16_table(bytes([len(raw)]) + raw[:-2])
+    if checksum != expected:
+        raise CRCError(expected, checksum)
+    return msg, flags
+
+
+def check_frame(data, flags_mask, flags):
+    """Check a complete data section
+
+    Returns the packet in serial format (or None if it is filtered out
+    by the flags) and whether it was a valid frame.
+    """
+    if len(data) < MIN_LENGTH:
+        return None, False
+    try:
+        pkt, pkt_flags = reformat_from_rf(data)
+    except CRCError:
+        return None, False
+    if pkt_flags & flags_mask != flags:
+        return None, True
+    return pkt, True
+
+
+class _Frame:
+    """Decoding state for the data section of one frame
+
+    The frame reads its input from a bit offset into the deframer buffers,
+    so several frames (at different alignments) can be decoded from the
+    same input. step runs one state (length/lengthfec/data/datafec) and
+    returns the number of bits used up, or None if it needs more input.
+    Once the whole data section is decoded it is stored in data, and for
+    FEC frames corrected_bits returns the number of bit errors corrected.
+    """
+    def __init__(self, fec, whitening, soft):
+        self.mode = 'lengthfec' if fec else 'length'
+        self.whitening = whitening
+        self.soft = soft
+        self.length = 0
+        self.data = None
+        self._decoder = None
+        # Hard bits of the encoded data section used up so far (FEC only)
+        self._received = b""
+        self._handlers = {
+            'length': self._handle_length,
+            'lengthfec': self._handle_lengthfec,
+            'data': self._handle_data,
+            'datafec': self._handle_datafec,
+        }
+
+    def step(self, buff, soft, offset):
+        return self._handlers[self.mode](buff, soft, offset)
+
+    def _handle_length(self, buff, soft, offset):
+        # Wait for the length byte (potentially whitened)
+        if len(buff) < offset + 8:
+            return None
+        length_byte = buff.pack(offset, 8)[0]
+        if self.whitening:
+            self._pngen = PN9()
+            length_byte = length_byte ^ next(self._pngen)
+        self.length = length_byte
+        self.mode = 'data'
+        return 8
+
+    def _handle_lengthfec(self, buff, soft, offset):
+        # Wait for two chunks of FECed content to decode the length byte
+        if len(buff) < offset + 64:
+            return None
+        # Variable length mode + FEC is techincally not supported by
+        # the CC1110. The OpenLST uses it anyway and it does work with
+        # potential caveats around very short messages, probably less than
+        # two FEC chunks (8 bytes). These don't come up given that the
+        # OpenLST minimum message length is
+        # HWID + seqnum + subsys + command + CRC, which is 9 bytes
+        self._received = buff.pack(offset, 64)
+        if self.soft:
+            chunks = soft.view(offset, offset + 64)
+            self._decoder = SoftViterbiDecoder()
+        else:
+            chunks = self._received
+            self._decoder = ViterbiDecoder()
+        b = self._decoder.decode(chunks)
+
+        # Per the CC1110 datasheet, FEC is done on the whitened data, even
+        # though that seems counterintuitive
+        if self.whitening:
+            self._pngen = PN9()
+            b = whiten(b, self._pngen)
+
+        # Read the length and keep the rest of the decoded bytes
+        self.length = b[0]
+        self._fecbuff = b[1:]
+        # The encoded data section is the length byte, the data and two
+        # terminator bytes, padded to a whole number of FEC chunks
+        self._fec_bits_left = 32 * ((self.length + 4) // 2) - 64
+        self.mode = 'datafec'
+        if len(self._fecbuff) >= self.length:
+            self.data = self._fecbuff[:self.length]
+        return 64
+
+    def corrected_bits(self):
+        """Return the number of bit errors FEC corrected in the frame
+
+        The decoded data section is encoded again and compared with the
+        hard bits the frame used up (not the peeked chunk). This is 0
+        for frames without FEC.
+        """
+        if self._decoder is None:
+            return 0
+        raw = bytes([self.length]) + bytes(self.data)
+        if self.whitening:
+            raw = whiten(raw)
+        return corrected_bits(raw, self._received)
+
+    def fec_bits(self):
+        """Return the encoded size of the data section in bits
+
+        This is valid once the length is decoded, as (bits the frame uses
+        up, bits needed to decode it), which can include the peeked chunk.
+        """
+        chunks = max((self.length - len(self._fecbuff) + 1) // 2, 0)
+        return 64 + self._fec_bits_left, 64 + 32 * chunks
+
+    def _handle_data(self, buff, soft, offset):
+        # In non-FEC mode the whole data section is read at once
+        if len(buff) < offset + self.length * 8:
+            return None
+        data = buff.pack(offset, self.length * 8)
+        if self.whitening:
+            data = whiten(data, self._pngen)
+        self.data = data
+        return self.length * 8
+
+    def _handle_datafec(self, buff, soft, offset):
+        # In FEC mode, decode as many of the remaining FEC chunks (4 bytes)
+        # as have arrived. Each chunk decodes to 2 bytes.
+        remaining = self.length - len(self._fecbuff)
+        chunks = min((remaining + 1) // 2, (len(buff) - offset) // 32)
+        if chunks <= 0:
+            return None
+        hard = buff.pack(offset, 32 * chunks)
+        if self.soft:
+            decoded = self._decoder.decode(soft.view(offset, offset + 32 * chunks))
+        else:
+            decoded = self._decoder.decode(hard)
+        if self.whitening:
+            decoded = whiten(decoded, self._pngen)
+        self._fecbuff += decoded
+        if len(self._fecbuff) >= self.length:
+            self.data = self._fecbuff[:self.length]
+        # When the data section fills its last chunk, the decoder delay
+        # needs one chunk past the end of the packet to output the last
+        # byte. Those bits are only peeked at, since they may be the
+        # preamble of a back-to-back packet.
+        bits = min(32 * chunks, self._fec_bits_left)
+        self._fec_bits_left -= bits
+        self._received += hard[:bits // 8]
+        return bits
+
+
+class _Hypothesis:
+    """A candidate frame alignment in multi-hypothesis mode
+
+    start is the absolute bit position of the preamble and pos the
+    absolute position of the next bit the frame will read.
+    """
+    def __init__(self, start, pos, frame):
+        self.start = start
+        self.pos = pos
+        self.frame = frame
+
+
+class Deframer:
+    """CC1110 deframer state machine
+
+    This holds the decoding logic of the openlst_demod block without any
+    GNU Radio dependencies. Bits (or soft values) are added with push,
+    which runs the state machine
+
+        preamble -> length/lengthfec -> data/datafec -> preamble ...
+
+    until it runs out of input, and returns every complete packet (in
+    serial format) that passed the CRC and flags checks.
+
+    bits_consumed counts how many input bits were used up in each state.
+    Bits skipped while searching for a preamble count towards 'preamble'.
+
+    By default a sync word match commits the deframer to that alignment,
+    so if it was a false match, a real frame starting inside the bits it
+    claimed is lost. With max_hypotheses > 1, up to that many candidate
+    alignments are decoded side by side, each with its own FEC decoder and
+    PN9 state. Candidates are resolved in the order they start: the first
+    one to pass the CRC wins and every candidate overlapping it is dropped,
+    while candidates that fail are dropped without using up any input. In
+    this mode bits_consumed counts bits towards the state of the oldest
+    open candidate when they are no longer needed.
+
+    If executor (a concurrent.futures executor, normally a process pool)
+    is given, FEC frames are decoded there instead: once the length is
+    known and the whole frame has arrived, it is copied into shared memory
+    (see offload.FrameOffload) and the worker decodes, dewhitens and
+    checks it. push returns the packets from frames that are done, in
+    order, and close waits for the rest. This only applies to FEC with
+    max_hypotheses = 1, otherwise frames are still decoded in push. The
+    executor can also be set (or changed) later with set_executor.
+
+    With packed set, push takes bytes of 8 bits (MSB first) instead of a
+    byte per bit. They are unpacked into the bit buffer, so frames can
+    still start at any bit.
+
+    stats is a stats.DecoderStats with event counters and the time spent
+    in each state (plus 'check', the CRC and flags checks). With an
+    executor, the time spent decoding and checking in the workers isn't
+    included.
+    """
+    MODES = ('preamble', 'length', 'lengthfec', 'data', 'datafec')
+
+    def __init__(
+        self,
+        preamble_bytes=4,
+        preamble_quality=30,
+        sync_byte1=0xd3,
+        sync_byte0=0x91,
+        sync_words=2,
+        flags_mask=0x80,
+        flags=0,
+        fec=True,
+        whitening=True,
+        soft=False,
+        max_hypotheses=1,
+        executor=None,
+        packed=False,
+    ):
+        if max_hypotheses < 1:
+            raise ValueError("max_hypotheses must be at least 1")
+        if soft and packed:
+            raise ValueError("packed input can't be used with soft input")
+        self.preamble_quality = preamble_quality
+        self.sync_word = bytes([sync_byte1, sync_byte0] * sync_words)
+        self.flags_mask = flags_mask
+        self.flags = flags
+        self.fec = fec
+        self.whitening = whitening
+        self.soft = soft
+        self.packed = packed
+        self.max_hypotheses = max_hypotheses
+        self._detector = SyncDetector(preamble_bytes, preamble_quality, self.sync_word)
+
+        # Hard bits, plus the matching soft values in soft mode
+        self._buff = BitBuffer()
+        self._soft = BitBuffer(dtype=np.float32) if soft else None
+        self._mode = 'preamble'
+        self._frame = None
+        # Multi-hypothesis state: the absolute bit position of the start of
+        # the buffers, the next position to search for a preamble and the
+        # open candidates (in order of their start)
+        self._base = 0
+        self._search = 0
+        self._hypotheses = []
+        self.bits_consumed = dict.fromkeys(self.MODES, 0)
+        self.stats = DecoderStats(self.MODES + ('check',))
+        self._offload = None
+        self.set_executor(executor)
+
+    @property
+    def mode(self):
+        if self._hypotheses:
+            return self._hypotheses[0].frame.mode
+        return self._mode
+
+    @property
+    def hypotheses(self):
+        """Number of candidate frames currently open"""
+        return len(self._hypotheses)
+
+    def push(self, samples):
+        """Add input and return the packets that could be completed"""
+        if self.soft:
+            # Keep the soft values for FEC and slice them for everything else
+            self._soft.extend(samples)
+            self._buff.extend(np.asarray(samples) > 0)
+        elif self.packed:
+            self._buff.extend(np.unpackbits(np.asarray(samples, dtype=np.uint8)))
+        else:
+            self._buff.extend(samples)
+        packets = []
+        if self.max_hypotheses > 1:
+            while self._step_hypotheses(packets):
+                pass
+        else:
+            while self._step(packets):
+                pass
+        if self._offload is not None:
+            packets = self._collect(self._offload.collect())
+        return packets
+
+    def set_executor(self, executor):
+        """Decode FEC frames on executor from now on (None for push)
+
+        An executor already in use should be closed first.
+        """
+        self._offload = None
+        if executor is not None and self.fec and self.max_hypotheses == 1:
+            # Imported here so the deframer doesn't load multiprocessing
+            # unless it is used
+            from .offload import FrameOffload
+            self._offload = FrameOffload(
+                executor, self.soft, self.whitening, self.flags_mask, self.flags)
+
+    def close(self):
+        """Return the packets still being decoded and release resources
+
+        Only needed with an executor, where it waits for the outstanding
+        frames. Afterwards, frames are decoded in push until set_executor
+        is called again.
+        """
+        if self._offload is None:
+            return []
+        packets = self._collect(self._offload.close())
+        self._offload = None
+        if self._mode != 'preamble':
+            # A frame that hadn't all arrived yet is still in the buffer
+            # from its length chunk on. Start it over, to be decoded in
+            # push (its length has only been peeked at).
+            self._frame = _Frame(self.fec, self.whitening, self.soft)
+            self._mode = self._frame.mode
+        return packets
+
+    def _collect(self, results):
+        """Count the results of offloaded frames and return the packets"""
+        packets = []
+        for pkt, valid, corrected in results:
+            self._count(pkt, valid, corrected)
+            if pkt is not None:
+                packets.append(pkt)
+        return packets
+
+    def _consume(self, bits: int):
+        """Drop bits from the front of the input buffer(s)"""
+        self._buff.consume(bits)
+        if self.soft:
+            self._soft.consume(bits)
+        self._base += bits
+        self.bits_consumed[self.mode] += bits
+
+    def _check(self, frame):
+        """Check a decoded frame, counting the result"""
+        start = perf_counter_ns()
+        data = frame.data
+        if len(data) < MIN_LENGTH:
+            self.stats.counters['short_frames'] += 1
+            return None, False
+        pkt, valid = check_frame(data, self.flags_mask, self.flags)
+        self._count(pkt, valid, frame.corrected_bits() if valid else 0)
+        self.stats.timing['check'].add(perf_counter_ns() - start)
+        return pkt, valid
+
+    def _count(self, pkt, valid, corrected):
+        counters = self.stats.counters
+        if not valid:
+            # Most frames that fail the CRC are false sync word matches on
+            # noise, which "correct" as many bits as the noise has
+            counters['crc_failures'] += 1
+            return
+        counters['fec_corrected_bits'] += corrected
+        if pkt is None:
+            counters['filtered'] += 1
+        else:
+            counters['packets'] += 1
+
+    def _step(self, packets):
+        """Advance the state machine, returning True if it made progress"""
+        if self._mode == 'preamble':
+            return self._find_frame()
+        if self._offload is not None:
+            return self._offload_frame()
+        start = perf_counter_ns()
+        bits = self._frame.step(self._buff, self._soft, 0)
+        if bits is None:
+            return False
+        self.stats.timing[self._mode].add(perf_counter_ns() - start)
+        self._consume(bits)
+        self._mode = self._frame.mode
+        if self._frame.data is not None:
+            # Start looking for the next packet whether or not this one
+            # was valid
+            pkt, _ = self._check(self._frame)
+            if pkt is not None:
+                packets.append(pkt)
+            self._mode = 'preamble'
+        return True
+
+    def _offload_frame(self):
+        """Hand a whole FEC frame to the executor once it has arrived"""
+        frame = self._frame
+        if frame.mode == 'lengthfec':
+            # The length is decoded here, but the bits are kept for the
+            # worker, which decodes the frame from the start
+            start = perf_counter_ns()
+            if frame.step(self._buff, self._soft, 0) is None:
+                return False
+            self.stats.timing['lengthfec'].add(perf_counter_ns() - start)
+            if frame.length < MIN_LENGTH:
+                # Not worth sending anywhere
+                self.stats.counters['short_frames'] += 1
+                self._consume(64)
+                self._mode = 'preamble'
+                return True
+        consumed, needed = frame.fec_bits()
+        if len(self._buff) < needed:
+            return False
+        if self.soft:
+            self._offload.submit(self._soft.view(0, needed), frame.length)
+        else:
+            self._offload.submit(self._buff.pack(0, needed), frame.length)
+        self._consume(64)
+        self._mode = 'datafec'
+        self._consume(consumed - 64)
+        self._mode = 'preamble'
+        return True
+
+    def _find_frame(self):
+        # Waiting for preamble and sync word(s) - search the whole buffer
+        # for a preamble with enough matching bits followed by an exact
+        # sync word match
+        window = self._detector.window
+        if len(self._buff) < window:
+            return False
+        start = perf_counter_ns()
+        offsets, preambles = self._detector.find_all(self._buff.view())
+        self.stats.timing['preamble'].add(perf_counter_ns() - start)
+        if len(offsets) == 0:
+            self._count_sync(len(preambles), 0)
+            # Keep enough bits to finish checking the last offsets
+            self._consume(len(self._buff) - window + 1)
+            return False
+        # Count the hits up to the end of the sync word(s), which are used
+        # up with it. Hits after the frame start only overlap its preamble
+        # and sync word, so they count as misses even if they match.
+        self._count_sync(np.searchsorted(preambles, offsets[0] + window), 1)
+        self._consume(int(offsets[0]) + window)
+        self._frame = _Frame(self.fec, self.whitening, self.soft)
+        self._mode = self._frame.mode
+        return True
+
+    def _step_hypotheses(self, packets):
+        """Open, advance and resolve candidates in multi-hypothesis mode
+
+        Returns True if it made progress that may allow more.
+        """
+        progress = self._open_hypotheses()
+
+        timing = self.stats.timing
+        for hyp in self._hypotheses:
+            while hyp.frame.data is None:
+                mode = hyp.frame.mode
+                start = perf_counter_ns()
+                bits = hyp.frame.step(self._buff, self._soft, hyp.pos - self._base)
+                if bits is None:
+                    break
+                timing[mode].add(perf_counter_ns() - start)
+                hyp.pos += bits
+
+        # Candidates are only resolved once all earlier ones are, so
+        # packets come out in order
+        while self._hypotheses and self._hypotheses[0].frame.data is not None:
+            hyp = self._hypotheses.pop(0)
+            pkt, valid = self._check(hyp.frame)
+            if valid:
+                if pkt is not None:
+                    packets.append(pkt)
+                self._hypotheses = [h for h in self._hypotheses if h.start >= hyp.pos]
+                self._search = max(self._search, hyp.pos)
+            progress = True
+
+        # Drop the bits no candidate or search needs any more
+        keep = min([self._search] + [h.pos for h in self._hypotheses])
+        if keep > self._base:
+            self._consume(keep - self._base)
+        return progress
+
+    def _count_sync(self, preambles, matches):
+        counters = self.stats.counters
+        counters['preamble_hits'] += int(preambles)
+        counters['sync_matches'] += matches
+        counters['sync_misses'] += int(preambles) - matches
+
+    def _open_hypotheses(self):
+        """Open a candidate for each new sync word match, up to the limit"""
+        window = self._detector.window
+        offset = self._search - self._base
+        room = self.max_hypotheses - len(self._hypotheses)
+        if room <= 0 or len(self._buff) - offset < window:
+            return False
+        start = perf_counter_ns()
+        offsets, preambles = self._detector.find_all(self._buff.view(offset))
+        self.stats.timing['preamble'].add(perf_counter_ns() - start)
+        if len(offsets) > room:
+            self._count_sync(np.searchsorted(preambles, offsets[room]), room)
+        else:
+            self._count_sync(len(preambles), len(offsets))
+        for start in offsets[:room]:
+            start = self._search + int(start)
+            frame = _Frame(self.fec, self.whitening, self.soft)
+            self._hypotheses.append(_Hypothesis(start, start + window, frame))
+        if len(offsets) > room:
+            # Resume from the first match that didn't fit once one resolves
+            self._search += int(offsets[room])
+        else:
+            self._search = self._base + len(self._buff) - window + 1
+        return len(offsets) > 0
@@ -6,6 +6,8 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 #
 
+import numpy as np
+
 aTrellisSourceStateLut = (
     (0, 4), (0, 4), (1, 5), (1, 5), (2, 6), (2, 6), (3, 7), (3, 7),
 )
@@ -20,10 +22,12 @@ def hamming_weight(byte: int) -> int:
     return sum(int(b) for b in f"{byte:b}")
 
 
-def interleave(chunk: bytes) -> bytes:
-    """Interleave or deinterleave a 4 byte chunk"""
-    if len(chunk) != 4:
-        raise ValueError("interleaving only works on 4 byte chunks")
+def _interleave_grid(chunk: bytes) -> bytes:
+    """Interleave or deinterleave a 4 byte chunk as a 4x4 grid of symbols
+
+    This is the reference implementation that the lookup tables used by
+    interleave are built from.
+    """
     chunk_int = int.from_bytes(chunk, byteorder='little')
     grid = []
     for _ in range(4):
@@ -41,6 +45,33 @@ def interleave(chunk: bytes) -> bytes:
             flipped |= grid[y][x]
     return flipped.to_bytes(4, byteorder='little')
 
+
+def interleave(chunk: bytes) -> bytes:
+    """Interleave or deinterleave a 4 byte chunk"""
+    if len(chunk) != 4:
+        raise ValueError("interleaving only works on 4 byte chunks")
+    word = 0
+    for lane, byte in enumerate(chunk):
+        word |= _INTERLEAVE_LUT[lane][byte]
+    return word.to_bytes(4, byteorder='big')
+
+
+def interleave_chunks(data) -> np.ndarray:
+    """Interleave or deinterleave any number of 4 byte chunks at once
+
+    data may be bytes or a uint8 array, with a length that is a multiple
+    of 4. Returns a uint8 array of the same length.
+    """
+    data = np.frombuffer(data, dtype=np.uint8) if not isinstance(data, np.ndarray) else data
+    if len(data) % 4 != 0:
+        raise ValueError("interleaving only works on 4 byte chunks")
+    chunks = data.reshape(-1, 4)
+    words = _INTERLEAVE_NP_LUT[0][chunks[:, 0]]
+    for lane in range(1, 4):
+        words |= _INTERLEAVE_NP_LUT[lane][chunks[:, lane]]
+    return words.astype('>u4').view(np.uint8)
+
+
 def decode_fec_chunk():
     """decode_fec_chunk returns a generator for FEC decode/correction
     
@@ -99,6 +130,338 @@ def decode_fec_chunk():
                 cost[last_buf][i] -= min_cost
 
 
+def _interleave_lut():
+    """Precompute interleave() for each byte lane
+
+    Interleaving is a fixed permutation of the 32 bits in a chunk, so it
+    can be applied one byte lane at a time and the results ORed together.
+    Entries are the interleaved chunk as a big-endian integer, which puts
+    the 2-bit symbols in the order the decoder consumes them.
+    """
+    lut = []
+    for lane in range(4):
+        row = []
+        for byte in range(256):
+            chunk = bytearray(4)
+            chunk[lane] = byte
+            row.append(int.from_bytes(_interleave_grid(bytes(chunk)), byteorder='big'))
+        lut.append(tuple(row))
+    return tuple(lut)
+
+
+_INTERLEAVE_LUT = _interleave_lut()
+_INTERLEAVE_NP_LUT = np.array(_INTERLEAVE_LUT, dtype=np.uint32)
+
+# Hamming distance between two 2-bit symbols, indexed by their XOR
+_SYMBOL_DISTANCE = (0, 1, 1, 2)
+
+
+def _acs_step(cost, symbol):
+    """Run one add-compare-select step over the 8 trellis states
+
+    Returns the normalized costs, a bitmask with bit n set when state n
+    chose its second source state, and the amount the costs were
+    normalized by. Ties go to the second source, matching decode_fec_chunk.
+    """
+    new_cost = []
+    decisions = 0
+    for dest_state in range(8):
+        src_state0, src_state1 = aTrellisSourceStateLut[dest_state]
+        out0, out1 = aTrellisTransitionOutput[dest_state]
+        cost0 = cost[src_state0] + _SYMBOL_DISTANCE[symbol ^ out0]
+        cost1 = cost[src_state1] + _SYMBOL_DISTANCE[symbol ^ out1]
+        if cost0 < cost1:
+            new_cost.append(cost0)
+        else:
+            new_cost.append(cost1)
+            decisions |= 1 << dest_state
+    min_cost = min(new_cost)
+    return tuple(c - min_cost for c in new_cost), decisions, min_cost
+
+
+class _ACSTables:
+    """Lookup tables for the table-driven Viterbi decoder
+
+    With hard decisions and the per-step normalization used by
+    decode_fec_chunk, only a few hundred distinct cost vectors can occur.
+    Each one gets an index, which turns add-compare-select into a table
+    lookup. Transitions are looked up a whole byte (4 symbols) at a time
+    and are built on first use, since only a fraction of the
+    (cost vector, byte) pairs show up in practice.
+    """
+    def __init__(self):
+        start = (0,) * 8
+        self.costs = [start]
+        index = {start: 0}
+        steps = []
+        pending = [start]
+        while pending:
+            cost = pending.pop()
+            for symbol in range(4):
+                new_cost, _, _ = _acs_step(cost, symbol)
+                if new_cost not in index:
+                    index[new_cost] = len(self.costs)
+                    self.costs.append(new_cost)
+                    pending.append(new_cost)
+        for cost in self.costs:
+            for symbol in range(4):
+                new_cost, decisions, min_cost = _acs_step(cost, symbol)
+                steps.append((index[new_cost], decisions, min_cost))
+        self.steps = steps
+        self.blocks = [None] * (len(self.costs) * 256)
+
+    def block(self, key):
+        """Build the entry for cost vector key >> 8 and symbol byte key & 0xff
+
+        The entry is (next cost vector, metric increase, traceback), where
+        traceback maps the trellis state at the end of the byte to the
+        state at its start, with the one input bit only revealed inside
+        the block stored in bit 3.
+        """
+        state = key >> 8
+        byte = key & 0xff
+        metric = 0
+        masks = []
+        for shift in (6, 4, 2, 0):
+            state, decisions, min_cost = self.steps[state * 4 + ((byte >> shift) & 3)]
+            masks.append(decisions)
+            metric += min_cost
+        traceback = []
+        for end_state in range(8):
+            # The trellis state is a shift register of the last 3 input
+            # bits, newest in bit 0. Stepping back shifts in the bit chosen
+            # by that step's decision.
+            trellis = end_state
+            revealed = None
+            for decisions in reversed(masks):
+                bit = (decisions >> trellis) & 1
+                if revealed is None:
+                    revealed = bit
+                trellis = (trellis >> 1) | (bit << 2)
+            traceback.append(trellis | (revealed << 3))
+        entry = (state, metric, tuple(traceback))
+        self.blocks[key] = entry
+        return entry
+
+
+_acs_tables = None
+
+
+def _get_acs_tables():
+    global _acs_tables
+    if _acs_tables is None:
+        _acs_tables = _ACSTables()
+    return _acs_tables
+
+
+class ViterbiDecoder:
+    """Table-driven FEC decoder
+
+    This decodes FEC + interleaved data per CC1110 DN504 (A) and is
+    bit-identical to decode_fec_chunk, but runs add-compare-select as
+    table lookups and traces back 4 symbols at a time.
+
+    Data is passed to decode in multiples of 4 byte chunks. Decoded bytes
+    are returned as soon as they are known; like decode_fec_chunk there is
+    a 32 symbol (2 chunk) decoding delay.
+
+    metric is the accumulated cost of the best path, which is the number
+    of received bits that the decoder had to correct.
+    """
+    def __init__(self):
+        self._tables = _get_acs_tables()
+        self.reset()
+
+    def reset(self):
+        self.metric = 0
+        self._state = 0
+        self._symbols = 0
+        self._history = []
+
+    def decode(self, data: bytes) -> bytes:
+        if len(data) % 4 != 0:
+            raise ValueError("FEC data must be a multiple of 4 bytes")
+        tables = self._tables
+        blocks = tables.blocks
+        lut0, lut1, lut2, lut3 = _INTERLEAVE_LUT
+        history = self._history
+        state = self._state
+        symbols = self._symbols
+        metric = self.metric
+        out = bytearray()
+        for i in range(0, len(data), 4):
+            word = lut0[data[i]] | lut1[data[i + 1]] | lut2[data[i + 2]] | lut3[data[i + 3]]
+            for byte in (word >> 24, (word >> 16) & 0xff, (word >> 8) & 0xff, word & 0xff):
+                key = (state << 8) | byte
+                entry = blocks[key] or tables.block(key)
+                state = entry[0]
+                metric += entry[1]
+                history.append(entry[2])
+                symbols += 4
+                if symbols >= 32 and symbols % 8 == 0:
+                    # Trace back from state 0 to recover the input bits
+                    # from 24 to 31 symbols ago
+                    trellis = 0
+                    for traceback in history[-1:-7:-1]:
+                        trellis = traceback[trellis] & 7
+                    value = history[-7][trellis]
+                    low = trellis
+                    trellis = value & 7
+                    out.append(low | (value & 8) | (trellis << 4) | ((history[-8][trellis] & 8) << 4))
+            if len(history) > 64:
+                del history[:-8]
+        self._state = state
+        self._symbols = symbols
+        self.metric = metric
+        return bytes(out)
+
+
+def decode_fec_stream():
+    """decode_fec_stream returns a generator for FEC decode/correction
+
+    This is a drop-in replacement for decode_fec_chunk backed by
+    ViterbiDecoder. The caller passes in 4 byte chunks using the `send`
+    function and the generator yields decoded chunks.
+    """
+    decoder = ViterbiDecoder()
+    out = b""
+    while True:
+        chunk = yield out
+        out = decoder.decode(chunk)
+
+
+def decode_fec(data: bytes) -> bytes:
+    """Decode a whole FEC + interleaved packet at once
+
+    This is equivalent to passing each 4 byte chunk of data to
+    decode_fec_stream and joining the results.
+    """
+    return ViterbiDecoder().decode(data)
+
+
+def _interleave_permutation():
+    """Find where each received bit of a chunk ends up after deinterleaving
+
+    Bits are numbered in the order they are received (MSB first within
+    each byte). Entry n is the received bit that becomes bit n of the
+    deinterleaved chunk.
+    """
+    perm = [0] * 32
+    for lane in range(4):
+        for bit in range(8):
+            word = _INTERLEAVE_LUT[lane][0x80 >> bit]
+            perm[31 - word.bit_length() + 1] = lane * 8 + bit
+    return np.array(perm, dtype=np.intp)
+
+
+_INTERLEAVE_PERM = _interleave_permutation()
+
+
+class SoftViterbiDecoder:
+    """Soft-decision FEC decoder
+
+    This is the soft-input counterpart of ViterbiDecoder. It uses the same
+    trellis tables, tie-breaking and output timing, but takes one float per
+    received bit instead of packed bytes. Positive values are a 1 bit and
+    negative values are a 0 bit, with the magnitude as the confidence (as
+    from a quadrature demodulator or an LLR of log(P1/P0)).
+
+    The branch metric is the sum of the magnitudes of the received bits
+    that disagree with the expected symbol. With inputs of +/-1 this is the
+    Hamming distance, and the output matches the hard decoder.
+
+    Data is passed to decode in multiples of 32 values (one 4 byte chunk).
+    metric is the accumulated cost of the best path.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.metric = 0.0
+        self._cost = [0.0] * 8
+        self._symbols = 0
+        self._history = []
+
+    def branch_metrics(self, soft) -> np.ndarray:
+        """Deinterleave soft values and compute the cost of each symbol
+
+        Returns an array with a row per 2-bit symbol and a column per
+        possible transmitted symbol.
+        """
+        soft = np.asarray(soft, dtype=np.float32)
+        if len(soft) % 32 != 0:
+            raise ValueError("soft FEC data must be a multiple of 32 values")
+        soft = soft.reshape(-1, 32)[:, _INTERLEAVE_PERM].reshape(-1, 2)
+        magnitude = np.abs(soft)
+        ones = soft > 0
+        metrics = np.empty((len(soft), 4), dtype=np.float32)
+        for symbol in range(4):
+            metrics[:, symbol] = (
+                magnitude[:, 0] * (ones[:, 0] != bool(symbol & 2)) +
+                magnitude[:, 1] * (ones[:, 1] != bool(symbol & 1)))
+        return metrics
+
+    def decode(self, soft) -> bytes:
+        cost = self._cost
+        history = self._history
+        symbols = self._symbols
+        metric = self.metric
+        out = bytearray()
+        for branch in self.branch_metrics(soft).tolist():
+            new_cost = []
+            decisions = 0
+            for dest_state in range(8):
+                src_state0, src_state1 = aTrellisSourceStateLut[dest_state]
+                out0, out1 = aTrellisTransitionOutput[dest_state]
+                cost0 = cost[src_state0] + branch[out0]
+                cost1 = cost[src_state1] + branch[out1]
+                if cost0 < cost1:
+                    new_cost.append(cost0)
+                else:
+                    new_cost.append(cost1)
+                    decisions |= 1 << dest_state
+            min_cost = min(new_cost)
+            cost = [c - min_cost for c in new_cost]
+            metric += min_cost
+            history.append(decisions)
+            symbols += 1
+            if symbols >= 32 and symbols % 8 == 0:
+                # Trace back from state 0 to recover the input bits from
+                # 24 to 31 symbols ago. The trellis state is a shift
+                # register of the last 3 input bits, newest in bit 0.
+                trellis = 0
+                byte = 0
+                for age in range(1, 32):
+                    trellis = (trellis >> 1) | (((history[-age] >> trellis) & 1) << 2)
+                    if age >= 24:
+                        byte |= (trellis & 1) << (age - 24)
+                out.append(byte)
+        if len(history) > 256:
+            del history[:-32]
+        self._cost = cost
+        self._symbols = symbols
+        self.metric = metric
+        return bytes(out)
+
+
+def decode_fec_soft_stream():
+    """decode_fec_soft_stream returns a generator for soft FEC decoding
+
+    This follows the same send() contract as decode_fec_stream, but each
+    chunk is 32 soft values (see SoftViterbiDecoder) instead of 4 bytes.
+    """
+    decoder = SoftViterbiDecoder()
+    out = b""
+    while True:
+        chunk = yield out
+        out = decoder.decode(chunk)
+
+
+def decode_fec_soft(soft) -> bytes:
+    """Decode a whole packet of soft values at once"""
+    return SoftViterbiDecoder().decode(soft)
+
+
 # From CC1110 DN504 (A)
 FEC_ENCODE_TABLE = [
     0, 3, 1, 2,
@@ -108,10 +471,12 @@ FEC_ENCODE_TABLE = [
 ]
 
 
-def encode_fec(raw: bytes):
+def _encode_fec_reference(raw: bytes):
     """Encode bytes with the CC1110 FEC + interleaving mechanism
     
     Poorly copied and half-heartedly translated to Python from CC1110 DN504 (A)
+
+    This is the reference implementation for encode_fec.
     """
     rv = b""
     terminated = raw + b"\x0b\x0b"
@@ -134,3 +499,81 @@ def encode_fec(raw: bytes):
     else:
         raise Exception(f"unexpected chunk length {len(chunk)}")
     return rv
+
+
+def _fec_encode_lut():
+    """Precompute the encoder output for each (state, byte)
+
+    The encoder state going into a byte is the low 3 bits of the previous
+    byte. Entry (state << 8) | byte is the 16 bit (8 symbol) output.
+    """
+    lut = np.zeros(8 * 256, dtype=np.uint16)
+    for state in range(8):
+        for byte in range(256):
+            fec_reg = (state << 8) | byte
+            fec_output = 0
+            for _ in range(8):
+                fec_output = (fec_output << 2) | FEC_ENCODE_TABLE[fec_reg >> 7]
+                fec_reg = (fec_reg << 1) & 0x07ff
+            lut[(state << 8) | byte] = fec_output
+    return lut
+
+
+_FEC_ENCODE_LUT = _fec_encode_lut()
+FEC_TERMINATOR = b"\x0b\x0b"
+
+
+def fec_encoded_length(length: int) -> int:
+    """Return the encoded size of length bytes (plus the terminator)"""
+    return 4 * ((length + len(FEC_TERMINATOR) + 1) // 2)
+
+
+def encode_fec_into(raw: bytes, out, offset: int = 0) -> int:
+    """Encode bytes with the CC1110 FEC + interleaving mechanism into out
+
+    out is a writable buffer (bytearray, memoryview or uint8 array) with
+    at least fec_encoded_length(len(raw)) bytes free after offset. Returns
+    the number of bytes written.
+    """
+    length = len(raw)
+    data = np.empty(length + len(FEC_TERMINATOR), dtype=np.intp)
+    data[:length] = np.frombuffer(raw, dtype=np.uint8)
+    data[length:] = tuple(FEC_TERMINATOR)
+    # Each byte is encoded with the state left by the byte before it
+    index = data.copy()
+    index[1:] |= (data[:-1] & 7) << 8
+    encoded_length = fec_encoded_length(length)
+    dest = np.frombuffer(out, dtype=np.uint8) if not isinstance(out, np.ndarray) else out
+    dest = dest[offset:offset + encoded_length]
+    if len(dest) < encoded_length:
+        raise ValueError("output buffer is too small")
+    # A trailing half chunk is padded with zeros
+    symbols = np.zeros(encoded_length // 2, dtype='>u2')
+    symbols[:len(data)] = _FEC_ENCODE_LUT[index]
+    dest[:] = interleave_chunks(symbols.view(np.uint8))
+    return encoded_length
+
+
+def encode_fec(raw: bytes) -> bytes:
+    """Encode bytes with the CC1110 FEC + interleaving mechanism
+
+    The encoder is table driven: each byte is looked up with the 3 bits of
+    state left by the previous one, and the whole packet is interleaved at
+    once. See _encode_fec_reference for the bit by bit version.
+    """
+    out = bytearray(fec_encoded_length(len(raw)))
+    encode_fec_into(raw, out)
+    return bytes(out)
+
+
+def corrected_bits(raw: bytes, received: bytes) -> int:
+    """Return how many received bits differ from the encoding of raw
+
+    raw is a decoded (still whitened) data section and received the hard
+    bits it was decoded from, packed. This is the number of bit errors
+    FEC corrected. Only the bits covered by both are compared.
+    """
+    encoded = np.frombuffer(encode_fec(raw), dtype=np.uint8)
+    received = np.frombuffer(received, dtype=np.uint8)
+    count = min(len(encoded), len(received))
+    return int(np.unpackbits(encoded[:count] ^ received[:count]).sum())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+from functools import lru_cache
+
+import numpy as np
+
+from .fec import encode_fec_into, fec_encoded_length
+from .whitening import pn9_bytes
+from .crc import crc16_table
+
+# Flags (1 byte) + CRC (2 bytes), counted in the length byte along with
+# the raw message
+LENGTH_OVERHEAD = 3
+
+
+@lru_cache(maxsize=None)
+def frame_header(preamble_bytes=4, sync_byte1=0xd3, sync_byte0=0x91, sync_words=2) -> bytes:
+    """Return the preamble and sync word(s) that start every frame"""
+    return bytes(
+        [0xaa] * preamble_bytes +  # preamble
+        [sync_byte1, sync_byte0] * sync_words)  # sync word(s)
+
+
+class Framer:
+    """CC1110 framer
+
+    This holds the encoding logic of the openlst_mod block without any
+    GNU Radio dependencies. encode turns a raw message
+
+        | HWID (2 bytes) | Seqnum (2 bytes) | Data (N bytes) |
+
+    into a complete RF frame, written into a single preallocated array
+    behind the header (preamble and sync words), which is only built once
+    for each set of parameters.
+    """
+    def __init__(
+        self,
+        preamble_bytes=4,
+        sync_byte1=0xd3,
+        sync_byte0=0x91,
+        sync_words=2,
+        flags=0xC0,
+        fec=True,
+        whitening=True,
+    ):
+        self.flags = flags
+        self.fec = fec
+        self.whitening = whitening
+        self.header = frame_header(preamble_bytes, sync_byte1, sync_byte0, sync_words)
+        self._header = np.frombuffer(self.header, dtype=np.uint8)
+
+    def frame_length(self, raw_length: int) -> int:
+        """Return the length of the RF frame for a raw message"""
+        # The data section also has the length byte
+        section = raw_length + LENGTH_OVERHEAD + 1
+        if self.fec:
+            section = fec_encoded_length(section)
+        return len(self.header) + section
+
+    def encode(self, raw: bytes) -> np.ndarray:
+        """Encode a raw message into an RF frame"""
+        if isinstance(raw, (bytes, bytearray, memoryview)):
+            raw = np.frombuffer(raw, dtype=np.uint8)
+        else:
+            raw = np.asarray(raw, dtype=np.uint8)
+        if len(raw) < 2:
+            raise ValueError("messages must start with a 2 byte HWID")
+        frame = np.empty(self.frame_length(len(raw)), dtype=np.uint8)
+        frame[:len(self.header)] = self._header
+
+        # Length byte and flags, then the data (includes seqnum). The HWID
+        # goes at the end for RF transmission.
+        content = np.empty(len(raw) + LENGTH_OVERHEAD + 1, dtype=np.uint8)
+        content[0] = len(raw) + LENGTH_OVERHEAD
+        content[1] = self.flags
+        content[2:len(raw)] = raw[2:]
+        content[len(raw):len(raw) + 2] = raw[0:2]
+        checksum = crc16_table(content[:-2])
+        content[-2:] = (checksum & 0xff, checksum >> 8)
+
+        # Per the datasheet, whitening happens _before_ FEC
+        if self.whitening:
+            np.bitwise_xor(content, pn9_bytes(len(content)), out=content)
+        if self.fec:
+            encode_fec_into(content, frame, len(self.header))
+        else:
+            frame[len(self.header):] = content
+        return frame
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""Decode OpenLST packets from a recorded bitstream
+
+The recording is memory-mapped and split into segments that are searched
+for sync word candidates and decoded in a pool of worker processes. Every
+candidate is decoded on its own, like the multi-hypothesis mode of
+openlst_demod, and the main process keeps the first valid frame of any
+that overlap. Packets are written in the order they were recorded.
+
+Recordings can be:
+
+- bits: one byte per bit (0 or 1), as from a File Sink after the slicer
+- packed: 8 bits per byte, MSB first
+- soft: one float32 per bit, positive for 1 bits (see openlst_demod)
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
+
+import numpy as np
+
+from .codec import MAX_DATA_BITS, decode_candidates, resolve
+
+FORMATS = ('bits', 'packed', 'soft')
+
+# Bits per segment handed to a worker
+SEGMENT_BITS = 1 << 22
+
+
+def _bit_count(recording, kind):
+    return len(recording) * 8 if kind == 'packed' else len(recording)
+
+
+def _map(path, kind):
+    return np.memmap(path, dtype=np.float32 if kind == 'soft' else np.uint8, mode='r')
+
+
+def _read_bits(recording, kind, start, stop):
+    """Return bits start to stop of a recording as hard bits and soft values"""
+    if kind == 'packed':
+        data = np.unpackbits(recording[start // 8:(stop + 7) // 8])
+        offset = start % 8
+        return data[offset:offset + stop - start], None
+    data = np.asarray(recording[start:stop])
+    if kind == 'soft':
+        return (data > 0).astype(np.uint8), data
+    return data, None
+
+
+def decode_segment(path, kind, start, stop, params):
+    """Decode every frame candidate starting in bits start to stop of a file
+
+    params holds the deframer parameters (see decode_file). Returns a
+    record (see codec.decode_candidates) for each candidate, in order,
+    whatever its CRC.
+    """
+    recording = _map(path, kind)
+    window = (params['preamble_bytes'] + 2 * params['sync_words']) * 8
+    # Read enough past the end to finish any frame that starts in it. Only
+    # the last segment ends before that, where the codec flushes the FEC
+    # decoder for a frame at the very end of the recording.
+    end = min(stop + window + MAX_DATA_BITS, _bit_count(recording, kind))
+    bits, soft = _read_bits(recording, kind, start, end)
+    records = decode_candidates(bits, soft, stop - start, **params)
+    for record in records:
+        record['offset'] += start
+        record['end'] += start
+    return records
+
+
+def decode_file(
+    path,
+    kind='bits',
+    workers=None,
+    segment_bits=SEGMENT_BITS,
+    preamble_bytes=4,
+    preamble_quality=30,
+    sync_byte1=0xd3,
+    sync_byte0=0x91,
+    sync_words=2,
+    flags_mask=0x80,
+    flags=0,
+    fec=True,
+    whitening=True,
+):
+    """Decode a recording, yielding a record per frame in order
+
+    Records are dictionaries with the bit offset of the preamble
+    (offset) and of the end of the frame (end), length, flags, hwid,
+    seqnum, crc_ok, filtered (a valid frame the flags check would drop),
+    corrected (the number of bit errors FEC corrected) and the packet in
+    serial format.
+
+    Frames that fail the CRC are included, except where they overlap an
+    earlier valid frame. workers is the size of the process pool (None
+    for one per CPU, 0 to decode in this process).
+    """
+    if kind not in FORMATS:
+        raise ValueError("unknown recording format '%s' - expected one of %s" % (kind, ", ".join(FORMATS)))
+    params = dict(
+        preamble_bytes=preamble_bytes,
+        preamble_quality=preamble_quality,
+        sync_byte1=sync_byte1,
+        sync_byte0=sync_byte0,
+        sync_words=sync_words,
+        flags_mask=flags_mask,
+        flags=flags,
+        fec=fec,
+        whitening=whitening,
+    )
+    total = _bit_count(_map(path, kind), kind) if os.path.getsize(path) else 0
+    starts = range(0, total, segment_bits)
+    stops = [min(start + segment_bits, total) for start in starts]
+    args = (repeat(path), repeat(kind), starts, stops, repeat(params))
+    if workers == 0:
+        segments = map(decode_segment, *args)
+        yield from _resolve(segments)
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            yield from _resolve(executor.map(decode_segment, *args))
+
+
+def _resolve(segments):
+    return resolve(chain.from_iterable(segments))
+
+
+def _format_text(record):
+    return '%12d %04x %5d %-3s %s' % (
+        record['offset'], record['hwid'], record['seqnum'],
+        'ok' if record['crc_ok'] else 'BAD', record['packet'][4:].hex())
+
+
+def _format_json(record):
+    fields = {k: v for k, v in record.items() if k not in ('end', 'packet', 'filtered')}
+    fields['data'] = record['packet'][4:].hex()
+    return json.dumps(fields)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('recording', help='recorded bitstream file')
+    parser.add_argument('--input-format', choices=FORMATS, default='bits')
+    parser.add_argument('--output-format', choices=('text', 'jsonl'), default='text',
+                        help='format for packets written to stdout or --output')
+    parser.add_argument('--output', metavar='FILE', help='write packets to a file instead of stdout')
+    parser.add_argument('--zmq', metavar='ADDRESS',
+                        help='also send valid packets (in serial format) on a ZMQ socket bound to ADDRESS')
+    parser.add_argument('--zmq-type', choices=('PUSH', 'PUB'), default='PUSH')
+    parser.add_argument('--include-bad', action='store_true',
+                        help='also output frames that failed the CRC')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default one per CPU, 0 for none)')
+    parser.add_argument('--segment-bits', type=int, default=SEGMENT_BITS)
+    parser.add_argument('--preamble-bytes', type=int, default=4)
+    parser.add_argument('--preamble-quality', type=int, default=30)
+    parser.add_argument('--sync-byte1', type=lambda x: int(x, 0), default=0xd3)
+    parser.add_argument('--sync-byte0', type=lambda x: int(x, 0), default=0x91)
+    parser.add_argument('--sync-words', type=int, default=2)
+    parser.add_argument('--flags-mask', type=lambda x: int(x, 0), default=0x80)
+    parser.add_argument('--flags', type=lambda x: int(x, 0), default=0)
+    parser.add_argument('--no-fec', dest='fec', action='store_false')
+    parser.add_argument('--no-whitening', dest='whitening', action='store_false')
+    args = parser.parse_args(argv)
+
+    socket = None
+    if args.zmq:
+        import zmq
+        socket = zmq.Context.instance().socket(getattr(zmq, args.zmq_type))
+        socket.bind(args.zmq)
+    out = open(args.output, 'w') if args.output else sys.stdout
+    formatter = _format_json if args.output_format == 'jsonl' else _format_text
+
+    records = decode_file(
+        args.recording,
+        kind=args.input_format,
+        workers=args.workers,
+        segment_bits=args.segment_bits,
+        preamble_bytes=args.preamble_bytes,
+        preamble_quality=args.preamble_quality,
+        sync_byte1=args.sync_byte1,
+        sync_byte0=args.sync_byte0,
+        sync_words=args.sync_words,
+        flags_mask=args.flags_mask,
+        flags=args.flags,
+        fec=args.fec,
+        whitening=args.whitening,
+    )
+    try:
+        for record in records:
+            if record['filtered'] or not (record['crc_ok'] or args.include_bad):
+                continue
+            print(formatter(record), file=out)
+            if socket is not None and record['crc_ok']:
+                socket.send(record['packet'])
+    except BrokenPipeError:
+        # The reader (like head) went away, which isn't an error. Point
+        # stdout somewhere harmless so it can be flushed at exit.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if socket is not None:
+            socket.close(linger=-1)
+    return 0
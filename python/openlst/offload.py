@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+from collections import deque
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .fec import ViterbiDecoder, SoftViterbiDecoder, corrected_bits
+from .whitening import whiten
+
+# Default size of the shared memory each deframer uses to hand frames to
+# the worker processes. The largest soft decision frame is about 33KB.
+ARENA_SIZE = 1 << 20
+
+# Shared memory blocks the worker process has attached to, by name
+_attached = {}
+
+
+def _exists(name):
+    try:
+        shared_memory.SharedMemory(name=name).close()
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _attach(name):
+    """Return the worker's attachment to the shared memory block name
+
+    Attaching to a new arena also closes the attachments to arenas that
+    have been released (unlinked) since, so a long-lived pool serving
+    deframers that come and go doesn't keep their memory mapped.
+    """
+    shm = _attached.get(name)
+    if shm is None:
+        for old in [old for old in _attached if not _exists(old)]:
+            _attached.pop(old).close()
+        shm = _attached[name] = shared_memory.SharedMemory(name=name)
+    return shm
+
+
+def _decode_frame(name, offset, count, soft, whitening, length, flags_mask, flags):
+    """Decode, dewhiten and check one FEC frame in a worker process
+
+    The frame's encoded data section (packed bits, or float32 soft
+    values) is count items at offset into the shared memory block name.
+    Returns the packet in serial format (or None), whether it was a valid
+    frame (see deframer.check_frame) and, for valid frames, the number of
+    bit errors FEC corrected (see fec.corrected_bits).
+    """
+    # Imported here to avoid a circular import with .deframer
+    from .deframer import check_frame
+    shm = _attach(name)
+    if soft:
+        values = np.ndarray((count,), dtype=np.float32, buffer=shm.buf, offset=offset)
+        decoded = SoftViterbiDecoder().decode(values)
+        received = np.packbits(values > 0).tobytes()
+    else:
+        received = bytes(shm.buf[offset:offset + count])
+        decoded = ViterbiDecoder().decode(received)
+    # Skip the length byte, which the deframer already decoded
+    data = whiten(decoded) if whitening else decoded
+    pkt, valid = check_frame(data[1:length + 1], flags_mask, flags)
+    # Only the frame is compared, not the peeked chunk after it
+    corrected = corrected_bits(decoded[:length + 1], received) if valid else 0
+    return pkt, valid, corrected
+
+
+class FrameOffload:
+    """Decode FEC frames in a concurrent.futures process pool
+
+    submit copies a frame's encoded data section into a shared memory
+    arena and queues it for _decode_frame on executor. Results (as
+    returned by _decode_frame) come back from collect in the order frames
+    were submitted. The arena is used as
+    a ring, and submit only waits for a worker if the ring is full of
+    frames that haven't been decoded yet.
+    """
+    def __init__(self, executor, soft, whitening, flags_mask, flags, size=ARENA_SIZE):
+        self._executor = executor
+        self.soft = soft
+        self.whitening = whitening
+        self.flags_mask = flags_mask
+        self.flags = flags
+        self._size = size
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._head = 0
+        # (future, start, size) for each frame, in order
+        self._jobs = deque()
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def _in_use(self, start, size):
+        for future, job_start, job_size in self._jobs:
+            if not future.done() and start < job_start + job_size and job_start < start + size:
+                return future
+        return None
+
+    def _allocate(self, size):
+        if size > self._size:
+            raise ValueError("frame is larger than the shared memory arena")
+        start = self._head if self._head + size <= self._size else 0
+        future = self._in_use(start, size)
+        while future is not None:
+            future.result()
+            future = self._in_use(start, size)
+        self._head = start + size
+        return start
+
+    def submit(self, data, length):
+        """Queue the encoded data section of a frame with length data bytes
+
+        data is packed bits (bytes) or a float32 array of soft values.
+        """
+        src = np.frombuffer(data, dtype=np.uint8) if not self.soft else data
+        nbytes = src.nbytes
+        start = self._allocate(nbytes)
+        np.ndarray(src.shape, dtype=src.dtype, buffer=self._shm.buf, offset=start)[:] = src
+        future = self._executor.submit(
+            _decode_frame, self._shm.name, start, len(src), self.soft,
+            self.whitening, length, self.flags_mask, self.flags)
+        self._jobs.append((future, start, nbytes))
+
+    def collect(self, wait=False):
+        """Return the results of the oldest frames that are done
+
+        If wait is set, wait for every outstanding frame.
+        """
+        results = []
+        while self._jobs and (wait or self._jobs[0][0].done()):
+            future, _, _ = self._jobs.popleft()
+            results.append(future.result())
+        return results
+
+    def close(self):
+        """Wait for outstanding frames and release the arena"""
+        results = self.collect(wait=True)
+        self._shm.close()
+        self._shm.unlink()
+        return results
@@ -8,12 +8,13 @@
 
 import pmt
 import time
+import threading
 import numpy as np
 from gnuradio import gr
 
-from .fec import encode_fec
-from .whitening import whiten
-from .crc import crc16
+from .framer import Framer
+from .pacing import TokenBucket
+from .txqueue import TransmitQueue, DROP_NEWEST
 
 class openlst_mod(gr.sync_block):
     """
@@ -35,7 +36,26 @@ class openlst_mod(gr.sync_block):
     And may be encoded with whitening (PN-9 coding) and/or 2:1 Forward-Error Correction (FEC).
 
     It supports throttling of the output data rate for low bitrates. This avoids filling up the
-    (very large) buffer of the downstream blocks and inducing a lot of latency.
+    (very large) buffer of the downstream blocks and inducing a lot of latency. Fill is paced
+    with a token bucket that lets the output run at most max_latency seconds ahead of real time
+    and is produced in batches rather than a byte at a time.
+
+    If align is set (and bitrate is not 0), packets only start on multiples of align seconds
+    of output, with fill in between.
+
+    Encoded packets wait in a transmit queue of up to queue_depth packets (0 for no limit).
+    Packets from the HWIDs in priority_hwids go ahead of all others. When the queue is full,
+    overflow ('drop_newest' or 'drop_oldest') decides which packet is dropped, and True is
+    published on the backpressure port. False is published once the queue has drained to
+    half full. Connect this to a Raw ZMQ Source to stop reading from the socket while the
+    queue is full.
+
+    In burst mode, nothing is output between packets. Each packet is a tagged stream burst:
+    its first byte has tx_sob and length_tag_key (the length in bytes) tags and its last byte
+    a tx_eob tag, which SDR sinks use to only transmit while there is a packet. bitrate and
+    max_latency don't apply. If tx_time_delay is set, the first byte also has a tx_time tag
+    scheduling the burst tx_time_delay seconds after the packet started going out, by the
+    host clock (rounded up to a multiple of align seconds if align is set).
     """
     def __init__(
             self,
@@ -48,6 +68,13 @@ class openlst_mod(gr.sync_block):
             whitening=True,
             bitrate=7415.77,
             max_latency=0.1,
+            align=0,
+            queue_depth=0,
+            overflow=DROP_NEWEST,
+            priority_hwids=(),
+            burst=False,
+            length_tag_key='packet_len',
+            tx_time_delay=0,
         ):
         gr.sync_block.__init__(
             self,
@@ -59,6 +86,7 @@ class openlst_mod(gr.sync_block):
         # generally this comes from a ZMQ socket
         self.message_port_register_in(pmt.intern('message'))
         self.set_msg_handler(pmt.intern('message'), self.handle_msg)
+        self.message_port_register_out(pmt.intern('backpressure'))
 
         self.preamble_bytes = preamble_bytes
         self.sync_byte1 = sync_byte1
@@ -67,12 +95,36 @@ class openlst_mod(gr.sync_block):
         self.flags = flags
         self.fec = fec
         self.whitening = whitening
+        self._framer = Framer(
+            preamble_bytes=preamble_bytes,
+            sync_byte1=sync_byte1,
+            sync_byte0=sync_byte0,
+            sync_words=sync_words,
+            flags=flags,
+            fec=fec,
+            whitening=whitening,
+        )
 
-        self._msg_buffer = []
-        self._partial = False
+        # Encoded frames waiting to be sent. Urgent packets (from
+        # priority_hwids) are in class 0 and everything else in class 1.
+        self.priority_hwids = frozenset(priority_hwids)
+        self._msg_buffer = TransmitQueue(queue_depth, levels=2, policy=overflow)
+        self._backpressure = False
+        # The queue and backpressure state are shared by the message handler
+        # and work(), which run on different threads
+        self._lock = threading.Lock()
+        # The frame being sent and how much of it has already gone out
+        self._msg = None
+        self._msg_offset = 0
+
+        self.burst = burst
+        self.length_tag_key = pmt.intern(length_tag_key)
+        self.tx_time_delay = tx_time_delay
+        # Host time when the last scheduled burst ends
+        self._tx_free = 0.0
 
         self.bitrate = bitrate
-        if self.bitrate != 0:
+        if self.bitrate != 0 and not self.burst:
             # Attempt to set the output buffer to about 1 packet
             # this will be rounded to the nearest system page size, however,
             # which can be 4KB or 16KB and may produce a warning
@@ -80,83 +132,152 @@ class openlst_mod(gr.sync_block):
 
         self.max_latency = max_latency
         self._bytes_sent = 0
-        self._last_buff_check = None
+        self._bucket = None
+        self._fill_chunk = 1
+        if self.bitrate and not self.burst:
+            depth = max(self.bitrate * self.max_latency / 8, 1)
+            self._bucket = TokenBucket(self.bitrate / 8, depth)
+            # Wait for this much fill to be due before sending any, so the
+            # scheduler isn't woken up for every byte
+            self._fill_chunk = max(int(depth) // 4, 1)
+            # Longest the scheduler thread waits in one call: the time one
+            # fill chunk takes to go out. After a packet the bucket is in
+            # debt, and paying that back can take much longer than this.
+            self._max_wait = self._fill_chunk * 8 / self.bitrate
+        # Set to cut short a wait for tokens
+        self._wake = threading.Event()
+
+        self.align = align
+        self._align_bytes = 0
+        if self.align and self.bitrate:
+            self._align_bytes = max(round(self.align * self.bitrate / 8), 1)
 
     def handle_msg(self, msg):
-        raw = bytearray(pmt.to_python(msg))
-
-        # Insert the preamble and sync words
-        preamble = bytearray(
-            [0xaa] * self.preamble_bytes +  # preamble
-            [self.sync_byte1, self.sync_byte0] * self.sync_words)  # sync word(s)
-        
-        # Prefix with length byte and flags
-        content = bytes(
-            [len(raw) + 3] +  # length = raw + flags + checksum (2 bytes)
-            [self.flags]  # flags
-        )
-        content += raw[2:]  # data (includes seqnum)
-        # The HWID goes at the end for RF transmission
-        content += raw[0:2]
-        checksum = crc16(content)
+        raw = pmt.to_python(msg)
+        frame = self._framer.encode(raw)
+        # The HWID is the first two bytes (LSB first)
+        hwid = int(raw[0]) | (int(raw[1]) << 8)
+        priority = 0 if hwid in self.priority_hwids else 1
+        # Queue the encoded frame for transmission
+        with self._lock:
+            self._msg_buffer.put(frame, priority)
+            if self._msg_buffer.full:
+                self._set_backpressure(True)
+        self._wake.set()
 
-        # Append checksum
-        content += checksum.to_bytes(2, byteorder='little')
+    def _set_backpressure(self, full: bool):
+        # Called with the lock held, so the state changes and the messages
+        # published for them are in the same order
+        if full != self._backpressure:
+            self._backpressure = full
+            self.message_port_pub(pmt.intern('backpressure'), pmt.from_bool(full))
 
-        # Per the datasheet, whitening happens _before_ FEC
-        if self.whitening:
-            content = whiten(content)
-        if self.fec:
-            content = encode_fec(content)
+    def queue_stats(self):
+        """Return the transmit queue depth, drop counts and dwell times (s)"""
+        with self._lock:
+            return self._msg_buffer.stats()
 
-        # Queue these bytes for transmission
-        self._msg_buffer.append((time.time(), preamble + content))
+    def stop(self):
+        self._wake.set()
+        return True
 
+    def _align_gap(self) -> int:
+        """Return the number of fill bytes before the next packet can start"""
+        if not self._align_bytes or self._msg is not None:
+            return 0
+        return -self._bytes_sent % self._align_bytes
+
+    def _next_msg(self):
+        """Start sending the next queued frame, returning False if there is none"""
+        with self._lock:
+            self._msg = self._msg_buffer.get()
+            if self._msg is None:
+                return False
+            if self._backpressure and len(self._msg_buffer) <= self._msg_buffer.capacity // 2:
+                self._set_backpressure(False)
+        return True
+
+    def _send_msg(self, out) -> int:
+        """Copy as much of the current frame as fits into out"""
+        msg = self._msg
+        # Try to send the whole message, but send a chunk for now
+        # if the output buffer is too small (unlikely given our message size)
+        start = self._msg_offset
+        bytes_out = min(len(msg) - start, len(out))
+        # Write the bytes
+        out[:bytes_out] = msg[start:start + bytes_out]
+        if start + bytes_out < len(msg):
+            # Pick up from here next iteration
+            self._msg_offset = start + bytes_out
+        else:
+            # Message complete
+            self._msg = None
+            self._msg_offset = 0
+        return bytes_out
+
+    def _tx_time(self, length):
+        """Return a tx_time tag value for a burst of length bytes starting now"""
+        # Don't schedule a burst before the previous one has finished
+        tx_time = max(time.time() + self.tx_time_delay, self._tx_free)
+        if self.align:
+            tx_time = -(-tx_time // self.align) * self.align
+        if self.bitrate:
+            self._tx_free = tx_time + length * 8 / self.bitrate
+        secs = int(tx_time)
+        return pmt.make_tuple(pmt.from_uint64(secs), pmt.from_double(tx_time - secs))
+
+    def _work_burst(self, out):
+        if self._msg is None and not self._next_msg():
+            # Nothing to send - produce nothing rather than fill, and let
+            # the scheduler call again
+            return 0
+        if self._msg_offset == 0:
+            offset = self.nitems_written(0)
+            self.add_item_tag(0, offset, pmt.intern('tx_sob'), pmt.PMT_T)
+            self.add_item_tag(0, offset, self.length_tag_key, pmt.from_long(len(self._msg)))
+            if self.tx_time_delay:
+                self.add_item_tag(0, offset, pmt.intern('tx_time'), self._tx_time(len(self._msg)))
+        bytes_out = self._send_msg(out)
+        if self._msg is None:
+            self.add_item_tag(0, self.nitems_written(0) + bytes_out - 1, pmt.intern('tx_eob'), pmt.PMT_T)
+        self._bytes_sent += bytes_out
+        return bytes_out
 
     def work(self, input_items, output_items):
-        if self._last_buff_check is None:
-            self._bytes_sent = 0
-            self._last_buff_check = time.time()
-
-        if len(self._msg_buffer) > 0:
-            recv_time, msg = self._msg_buffer[0]
-            # Try to send the whole message, but send a chunk for now
-            # if the output buffer is too small (unlikely given our message size)
-            bytes_out = min(len(msg), len(output_items[0]))
-            # Write the bytes
-            output_items[0][:bytes_out] = msg[:bytes_out]
-            # Save the rest for next iteration
-            remaining = msg[bytes_out:]
-            if len(remaining) > 0:
-                self._partial = True
-                self._msg_buffer[0] = (recv_time, remaining)
-            else:
-                # Message complete
-                self._partial = False
-                self._msg_buffer.pop(0)
-
-            # Keep track of bytes sent so we can estimate bitrate
+        if self.burst:
+            return self._work_burst(output_items[0])
+        gap = self._align_gap()
+        if self._msg is None and len(self._msg_buffer) > 0 and gap == 0:
+            self._next_msg()
+        if self._msg is not None:
+            bytes_out = self._send_msg(output_items[0])
+
+            # Packets go out right away, but count against the fill budget
+            if self._bucket is not None:
+                self._bucket.spend(bytes_out)
             self._bytes_sent += bytes_out
             return bytes_out
-        elif self.bitrate:
-            # If the user has set a target bitrate, try not to exceed it
-            # by more than a little bit
-            dt = max(time.time() - self._last_buff_check, 0.001)
-
-            # Decide how much fill is missing to reach the target bitrate
-            expected_bytes = int(self.bitrate * dt // 8)
-            latency_buff_bytes = int(self.bitrate * self.max_latency // 8)
-            fill = expected_bytes + latency_buff_bytes - self._bytes_sent
-            if fill < 0:
-                # Try to fill the buffer to catch up
-                bytes_out = min(len(output_items[0]), fill)
-            else:
-                # Just send one byte, but wait a little and throttle the flow
-                # so we don't just fill the buffer one byte at a time
-                time.sleep(1.02 * 8.0 / self.bitrate)
-                bytes_out = 1
+        elif self._bucket is not None:
+            # If the user has set a target bitrate, only send the fill that
+            # is due to keep the output about max_latency ahead of real time
+            fill = self._bucket.available()
+            if fill < self._fill_chunk:
+                # Wait until a whole chunk is due (or a packet arrives)
+                # instead of sending a byte at a time
+                self._wake.wait(min(self._bucket.delay(self._fill_chunk), self._max_wait))
+                self._wake.clear()
+                fill = self._bucket.available()
+                if fill < self._fill_chunk and not self._msg_buffer:
+                    # Still paying back a packet - give the thread back to
+                    # the scheduler, which calls again
+                    return 0
+            bytes_out = min(len(output_items[0]), fill)
+            if self._msg_buffer:
+                # Only fill up to the next packet slot
+                bytes_out = min(bytes_out, gap)
 
             output_items[0][:bytes_out] = 0
+            self._bucket.spend(bytes_out)
             self._bytes_sent += bytes_out
             return bytes_out
         else:
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pmt
+import numpy as np
+from gnuradio import gr
+
+from .deframer import Deframer
+
+
+def _per_channel(value, channels, name):
+    """Expand a parameter to one value per channel
+
+    A list or tuple must have a value for each channel, anything else is
+    used for every channel.
+    """
+    if isinstance(value, (list, tuple)):
+        if len(value) != channels:
+            raise ValueError(
+                "%s has %d values, expected one per channel (%d)" %
+                (name, len(value), channels))
+        return list(value)
+    return [value] * channels
+
+
+class openlst_multi_demod(gr.sync_block):
+    """
+    OpenLST Multi-Channel Decoder/Deframer
+
+    This block decodes several independent bitstreams (for example from
+    different frequencies or modes) in one block, with an input per
+    channel. Each channel has its own decoder state and works like an
+    openlst_demod block.
+
+    Every parameter except channels, soft, packed, workers and
+    stats_interval can be a single value, used for all channels, or a
+    list with a value per channel.
+
+    Decoded messages are sent as PDUs: a pair of a metadata dictionary,
+    with the channel index under 'channel', and the message in the same
+    form as openlst_demod outputs.
+
+    With workers > 0, FEC frames from every channel are decoded in one
+    shared pool of that many worker processes (see openlst_demod).
+
+    stats(channel) returns a channel's decoder statistics, like
+    openlst_demod. With stats_interval set, they are sent on the stats
+    port every stats_interval seconds as a PDU per channel, with the same
+    metadata as messages.
+    """
+    def __init__(
+        self,
+        channels=2,
+        preamble_bytes=4,
+        preamble_quality=30,
+        sync_byte1=0xd3,
+        sync_byte0=0x91,
+        sync_words=2,
+        flags_mask=0x80,
+        flags=0,
+        fec=True,
+        whitening=True,
+        soft=False,
+        max_hypotheses=1,
+        workers=0,
+        stats_interval=0,
+        packed=False,
+    ):
+        gr.sync_block.__init__(
+            self,
+            name='CC1110 Multi-Channel Decode and Deframe',
+            in_sig=[np.float32 if soft else np.uint8] * channels,
+            out_sig=None,
+        )
+        self.message_port_register_out(pmt.intern('message'))
+        self.message_port_register_out(pmt.intern('stats'))
+        self.stats_interval = stats_interval
+        self._next_stats = time.monotonic() + stats_interval
+
+        self.channels = channels
+        self.soft = soft
+        params = dict(
+            preamble_bytes=preamble_bytes,
+            preamble_quality=preamble_quality,
+            sync_byte1=sync_byte1,
+            sync_byte0=sync_byte0,
+            sync_words=sync_words,
+            flags_mask=flags_mask,
+            flags=flags,
+            fec=fec,
+            whitening=whitening,
+            max_hypotheses=max_hypotheses,
+        )
+        per_channel = {
+            name: _per_channel(value, channels, name)
+            for name, value in params.items()
+        }
+        # The worker processes only run while the flowgraph does (see start)
+        self.workers = workers
+        self._executor = None
+        self._deframers = [
+            Deframer(soft=soft, packed=packed, **{name: values[i] for name, values in per_channel.items()})
+            for i in range(channels)
+        ]
+        self._channel_meta = [
+            pmt.dict_add(pmt.make_dict(), pmt.intern('channel'), pmt.from_long(i))
+            for i in range(channels)
+        ]
+
+    def work(self, input_items, output_items):
+        # Every channel gets the same number of items per call, so all of
+        # them are decoded in one pass
+        for channel, samples in enumerate(input_items):
+            for pkt in self._deframers[channel].push(samples):
+                self.send(channel, pkt)
+        if self.stats_interval > 0 and time.monotonic() >= self._next_stats:
+            self._next_stats += self.stats_interval
+            for channel in range(self.channels):
+                self.message_port_pub(
+                    pmt.intern('stats'),
+                    pmt.cons(self._channel_meta[channel], pmt.to_pmt(self.stats(channel))))
+        return len(input_items[0])
+
+    def start(self):
+        if self.workers > 0 and self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers)
+            for deframer in self._deframers:
+                deframer.set_executor(self._executor)
+        return True
+
+    def stop(self):
+        # Send the packets still being decoded in the worker processes
+        if self._executor is not None:
+            for channel, deframer in enumerate(self._deframers):
+                for pkt in deframer.close():
+                    self.send(channel, pkt)
+            self._executor.shutdown()
+            self._executor = None
+        return True
+
+    def bits_consumed(self, channel):
+        """Return the number of input bits used up in each decoder state"""
+        return dict(self._deframers[channel].bits_consumed)
+
+    def stats(self, channel):
+        """Return a channel's decoder counters and timing"""
+        stats = self._deframers[channel].stats.to_dict()
+        stats['bits_consumed'] = self.bits_consumed(channel)
+        return stats
+
+    def send(self, channel: int, pkt: bytes):
+        pkt_pmt = pmt.init_u8vector(len(pkt), list(pkt))
+        self.message_port_pub(
+            pmt.intern('message'),
+            pmt.cons(self._channel_meta[channel], pkt_pmt))
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import time
+
+
+class TokenBucket:
+    """Token bucket on the monotonic clock
+
+    Tokens accrue at rate per second, up to depth. Spending more tokens
+    than are available is allowed and leaves the bucket in debt, which
+    has to be paid back before more tokens are available. The bucket
+    starts full.
+
+    For openlst_mod a token is one output byte, rate is the bitrate / 8
+    and depth is how far ahead of real time the output may run (the
+    target latency).
+    """
+    def __init__(self, rate: float, depth: float, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.depth = depth
+        self._clock = clock
+        self._tokens = depth
+        self._last = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.depth, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def available(self) -> int:
+        """Return the number of whole tokens that can be spent now"""
+        self._refill()
+        return max(int(self._tokens), 0)
+
+    def spend(self, tokens: int):
+        self._refill()
+        self._tokens -= tokens
+
+    def delay(self, tokens: int) -> float:
+        """Return the time in seconds until tokens are available"""
+        self._refill()
+        return max(tokens - self._tokens, 0) / self.rate
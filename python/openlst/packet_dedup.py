@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import pmt
+from gnuradio import gr
+
+from .dedup import DuplicateCache, EVICT_LRU, packet_key
+
+class packet_dedup(gr.basic_block):
+    """
+    Packet Deduplicator
+
+    This block drops packets that were already seen recently, for example
+    when several receivers or channels hear the same downlink, or the
+    satellite retransmits. Put it between the decoder(s) and the Raw ZMQ
+    Sink. Incoming messages can be a u8vector or a PDU (the metadata is
+    ignored, so the same packet from different channels is a duplicate)
+    and are passed on unchanged.
+
+    Packets are identified by HWID, seqnum and a hash of the data. Up to
+    capacity packets are remembered, each for window seconds (0 to only
+    limit the count). With eviction 'lru', every duplicate restarts the
+    window; with 'fifo', a packet is passed again window seconds after it
+    was first seen. When the cache is full, the least recently seen packet
+    is forgotten.
+
+    stats() returns the cache size and the number of lookups, hits
+    (duplicates dropped), evictions and expirations.
+    """
+    def __init__(self, capacity=1024, window=10.0, eviction=EVICT_LRU):
+        gr.basic_block.__init__(
+            self,
+            name='Packet Deduplicator',
+            in_sig=None,
+            out_sig=None,
+        )
+        self.message_port_register_in(pmt.intern('message'))
+        self.set_msg_handler(pmt.intern('message'), self.handle_msg)
+        self.message_port_register_out(pmt.intern('message'))
+        self._cache = DuplicateCache(capacity, window, eviction)
+
+    def stats(self):
+        """Return the cache size and hit, eviction and expiration counts"""
+        return self._cache.stats()
+
+    def handle_msg(self, msg):
+        data = pmt.cdr(msg) if pmt.is_pair(msg) else msg
+        raw = bytes(pmt.u8vector_elements(data))
+        if not self._cache.seen(packet_key(raw)):
+            self.message_port_pub(pmt.intern('message'), msg)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import numpy as np
+from gnuradio import gr_unittest
+from gnuradio.openlst.bitbuffer import BitBuffer
+
+
+class qa_bitbuffer(gr_unittest.TestCase):
+    """BitBuffer against a growing array, as the demod used before it"""
+
+    def _check_random_ops(self, dtype, make_items):
+        rng = np.random.default_rng(0)
+        buff = BitBuffer(capacity=64, dtype=dtype)
+        reference = np.zeros(0, dtype=dtype)
+        for _ in range(500):
+            if rng.random() < 0.6:
+                items = make_items(rng, int(rng.integers(0, 100)))
+                buff.extend(items)
+                reference = np.concatenate((reference, items))
+            else:
+                count = int(rng.integers(0, 120))
+                buff.consume(count)
+                reference = reference[count:]
+            self.assertEqual(len(buff), len(reference))
+            np.testing.assert_array_equal(buff.view(), reference)
+            start = int(rng.integers(0, len(reference) + 1))
+            stop = int(rng.integers(start, len(reference) + 1))
+            np.testing.assert_array_equal(buff.view(start, stop), reference[start:stop])
+            count = (len(reference) - start) // 8 * 8
+            self.assertEqual(buff.pack(start, count), np.packbits(reference[start:start + count] > 0).tobytes())
+
+    def test_001_bits(self):
+        self._check_random_ops(np.uint8, lambda rng, n: rng.integers(0, 2, n, dtype=np.uint8))
+
+    def test_002_soft_values(self):
+        self._check_random_ops(np.float32, lambda rng, n: rng.normal(size=n).astype(np.float32))
+
+    def test_003_wraparound_view_is_contiguous(self):
+        buff = BitBuffer(capacity=16)
+        buff.extend(np.zeros(12, dtype=np.uint8))
+        buff.consume(12)
+        buff.extend(np.arange(10, dtype=np.uint8))
+        self.assertEqual(buff.capacity, 16)
+        view = buff.view()
+        self.assertTrue(view.flags['C_CONTIGUOUS'])
+        self.assertEqual(view.tolist(), list(range(10)))
+        buff.clear()
+        self.assertEqual(len(buff), 0)
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_bitbuffer)
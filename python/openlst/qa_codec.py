@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import doctest
+
+import numpy as np
+from gnuradio import gr_unittest
+from gnuradio.openlst import codec
+from gnuradio.openlst.deframer import Deframer
+
+
+def _messages(lengths, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        b"\x01\x00" + seqnum.to_bytes(2, byteorder='little') + rng.integers(0, 256, length, dtype=np.uint8).tobytes()
+        for seqnum, length in enumerate(lengths)
+    ]
+
+
+def _packets(packets):
+    return [row['packet'][:row['packet_len']].tobytes() for row in packets]
+
+
+class qa_codec(gr_unittest.TestCase):
+
+    def test_001_docstring_example(self):
+        failed, attempted = doctest.testmod(codec)
+        self.assertGreater(attempted, 0)
+        self.assertEqual(failed, 0)
+
+    def test_002_round_trip(self):
+        # Odd and even data sections, with the stream ending right after
+        # the last frame (gap=0) or not
+        for fec in (True, False):
+            for length in range(1, 12):
+                msgs = _messages([length, length + 1, 200 + length], seed=length)
+                frames = codec.encode_frames(msgs, flags=0x40, fec=fec)
+                for gap in (0, 64):
+                    bits = codec.frames_to_bits(frames, gap=gap)
+                    for kwargs, stream in (
+                        ({}, bits),
+                        ({'packed': True}, np.packbits(bits)),
+                        ({'soft': True}, bits.astype(np.float32) * 2 - 1),
+                    ):
+                        packets = codec.decode_frames(stream, fec=fec, **kwargs)
+                        self.assertEqual(_packets(packets), msgs, (fec, length, gap, kwargs))
+                        self.assertEqual(list(packets['seqnum']), [0, 1, 2])
+                        self.assertTrue(all(packets['crc_ok']))
+                        self.assertEqual(list(packets['corrected']), [0, 0, 0])
+
+    def test_003_offsets(self):
+        msgs = _messages([10, 20, 30], seed=1)
+        frames = codec.encode_frames(msgs, flags=0x40)
+        packets = codec.decode_frames(codec.frames_to_bits(frames, gap=100))
+        # The end of a frame is counted from its preamble
+        ends = 100 + np.cumsum(8 * frames['length'] + 100) - 100
+        self.assertEqual(list(packets['end']), list(ends))
+        self.assertEqual(list(packets['offset']), list(ends - 8 * frames['length']))
+
+    def test_004_filtered_and_bad_frames(self):
+        msgs = _messages([10, 20, 30], seed=2)
+        frames = codec.encode_frames(msgs)
+        bits = codec.frames_to_bits(frames, gap=32)
+        # The default flags have the ground bit set, which decode_frames
+        # filters out by default
+        self.assertEqual(len(codec.decode_frames(bits)), 0)
+        packets = codec.decode_frames(bits, include_bad=True)
+        self.assertEqual(_packets(packets), msgs)
+        self.assertTrue(all(packets['filtered']))
+        self.assertEqual(_packets(codec.decode_frames(bits, flags_mask=0)), msgs)
+
+    def test_005_matches_deframer(self):
+        rng = np.random.default_rng(3)
+        msgs = _messages(rng.integers(5, 200, 40), seed=3)
+        bits = codec.frames_to_bits(codec.encode_frames(msgs, flags=0x40), gap=150)
+        bits[rng.random(len(bits)) < 0.002] ^= 1
+        packets = codec.decode_frames(bits)
+        self.assertGreater(len(packets), 30)
+        self.assertEqual(_packets(packets), Deframer(max_hypotheses=4).push(bits))
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_codec)
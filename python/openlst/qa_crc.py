@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import random
+
+import numpy as np
+from gnuradio import gr_unittest
+from gnuradio.openlst.crc import (
+    CRC16, CRC16_INIT, crc16, crc16_batch, crc16_check_batch, crc16_table, crc16_update)
+
+
+def _random_frames(count, max_length, seed=0):
+    rng = random.Random(seed)
+    return [bytes(rng.randrange(256) for _ in range(rng.randrange(max_length + 1)))
+            for _ in range(count)]
+
+
+class qa_crc(gr_unittest.TestCase):
+    """The table-driven CRC engines against the bit-by-bit crc16"""
+
+    def test_001_table_matches_reference(self):
+        # Cover every slice-by-8 tail length
+        for data in _random_frames(200, 40):
+            self.assertEqual(crc16_table(data), crc16(data), data.hex())
+        self.assertEqual(crc16_table(b""), crc16(b""))
+
+    def test_002_incremental_matches_reference(self):
+        for data in _random_frames(50, 64, seed=1):
+            for split in range(0, len(data) + 1, 3):
+                running = CRC16(data[:split]).update(data[split:])
+                self.assertEqual(running.value, crc16(data))
+                self.assertEqual(crc16_update(crc16_update(CRC16_INIT, data[:split]), data[split:]), crc16(data))
+
+    def test_003_copy_is_independent(self):
+        running = CRC16(b"\x01\x02")
+        copy = running.copy()
+        running.update(b"\x03")
+        self.assertEqual(copy.value, crc16(b"\x01\x02"))
+        self.assertEqual(running.value, crc16(b"\x01\x02\x03"))
+
+    def test_004_batch_matches_reference(self):
+        frames = _random_frames(100, 60, seed=2)
+        self.assertEqual(crc16_batch(frames).tolist(), [crc16(f) for f in frames])
+
+        # A 2D array, with and without per-row lengths
+        array = np.frombuffer(bytes(range(256)) * 4, dtype=np.uint8).reshape(32, 32)
+        self.assertEqual(crc16_batch(array).tolist(), [crc16(row.tobytes()) for row in array])
+        lengths = np.arange(32)
+        self.assertEqual(
+            crc16_batch(array, lengths).tolist(),
+            [crc16(row[:n].tobytes()) for row, n in zip(array, lengths)])
+        self.assertEqual(len(crc16_batch([])), 0)
+
+    def test_005_check_batch(self):
+        frames = [f + crc16(f).to_bytes(2, byteorder='little') for f in _random_frames(50, 30, seed=3)]
+        self.assertTrue(crc16_check_batch(frames).all())
+        corrupted = [bytes([f[0] ^ 1]) + f[1:] for f in frames]
+        self.assertFalse(crc16_check_batch(corrupted).any())
+        # Too short to hold a CRC
+        self.assertEqual(crc16_check_batch([b"", b"\x00"]).tolist(), [False, False])
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_crc)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import pmt
+from gnuradio import gr_unittest
+from gnuradio.openlst.dedup import EVICT_FIFO, EVICT_LRU, DuplicateCache, packet_key
+from gnuradio.openlst.packet_dedup import packet_dedup
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _message(raw):
+    return pmt.init_u8vector(len(raw), list(raw))
+
+
+class qa_dedup(gr_unittest.TestCase):
+
+    def test_001_packet_key(self):
+        pkt = b"\x01\x00\x05\x00data"
+        self.assertEqual(packet_key(pkt), packet_key(bytearray(pkt)))
+        # Same HWID and seqnum, different data
+        self.assertNotEqual(packet_key(pkt), packet_key(b"\x01\x00\x05\x00other"))
+        self.assertNotEqual(packet_key(pkt), packet_key(b"\x02\x00\x05\x00data"))
+
+    def test_002_capacity(self):
+        cache = DuplicateCache(capacity=2)
+        self.assertEqual([cache.seen(k) for k in 'aab'], [False, True, False])
+        # c evicts a, the least recently seen
+        self.assertFalse(cache.seen('c'))
+        self.assertEqual(len(cache), 2)
+        self.assertFalse(cache.seen('a'))
+        self.assertEqual(cache.stats(), {
+            'size': 2, 'capacity': 2, 'lookups': 5, 'hits': 1, 'evicted': 2, 'expired': 0})
+
+    def test_003_lru_window(self):
+        clock = FakeClock()
+        cache = DuplicateCache(window=10, policy=EVICT_LRU, clock=clock)
+        cache.seen('a')
+        # Every duplicate restarts the window
+        for t in (5, 12, 19, 26):
+            clock.now = t
+            self.assertTrue(cache.seen('a'))
+        clock.now = 36
+        self.assertFalse(cache.seen('a'))
+        self.assertEqual(cache.stats()['expired'], 1)
+
+    def test_004_fifo_window(self):
+        clock = FakeClock()
+        cache = DuplicateCache(window=10, policy=EVICT_FIFO, clock=clock)
+        cache.seen('a')
+        clock.now = 5
+        cache.seen('b')
+        clock.now = 9
+        self.assertTrue(cache.seen('a'))
+        # Only the first sighting counts
+        clock.now = 10
+        self.assertFalse(cache.seen('a'))
+        self.assertTrue(cache.seen('b'))
+        clock.now = 15
+        self.assertFalse(cache.seen('b'))
+
+    def test_005_invalid(self):
+        with self.assertRaises(ValueError):
+            DuplicateCache(policy='random')
+        with self.assertRaises(ValueError):
+            DuplicateCache(capacity=0)
+
+    def test_006_block(self):
+        block = packet_dedup(capacity=16, window=0)
+        published = []
+        block.message_port_pub = lambda port, msg: published.append(msg)
+        a = b"\x01\x00\x01\x00aaaa"
+        b = b"\x01\x00\x02\x00bbbb"
+        msgs = [
+            _message(a),
+            _message(b),
+            # The same packet from another channel
+            pmt.cons(pmt.make_dict(), _message(a)),
+            _message(b),
+            pmt.cons(pmt.make_dict(), _message(b"\x01\x00\x03\x00cccc")),
+        ]
+        for msg in msgs:
+            block.handle_msg(msg)
+        # Passed on unchanged
+        self.assertEqual(published, [msgs[0], msgs[1], msgs[4]])
+        self.assertEqual(block.stats()['hits'], 2)
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_dedup)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import numpy as np
+from gnuradio import gr_unittest
+from gnuradio.openlst.deframer import Deframer
+from gnuradio.openlst.framer import Framer, frame_header
+
+
+def _make_stream(count, fec=True, whitening=True, error_rate=0.0, seed=0):
+    """Return some raw messages and a bitstream with them framed in noise"""
+    rng = np.random.default_rng(seed)
+    framer = Framer(flags=0x40, fec=fec, whitening=whitening)
+    msgs = []
+    parts = []
+    for seqnum in range(count):
+        data = rng.integers(0, 256, rng.integers(5, 120), dtype=np.uint8).tobytes()
+        msg = b"\x01\x00" + seqnum.to_bytes(2, byteorder='little') + data
+        msgs.append(msg)
+        parts.append(rng.integers(0, 2, rng.integers(0, 300), dtype=np.uint8))
+        parts.append(np.unpackbits(framer.encode(msg)))
+    parts.append(rng.integers(0, 2, 300, dtype=np.uint8))
+    bits = np.concatenate(parts)
+    errors = rng.random(len(bits)) < error_rate
+    bits[errors] ^= 1
+    return msgs, bits
+
+
+def _push_chunks(deframer, samples, sizes):
+    packets = []
+    start = 0
+    for size in sizes:
+        packets += deframer.push(samples[start:start + size])
+        start += size
+    packets += deframer.push(samples[start:])
+    return packets + deframer.close()
+
+
+class qa_deframer(gr_unittest.TestCase):
+
+    def test_001_decodes_every_setting(self):
+        for fec in (True, False):
+            for whitening in (True, False):
+                msgs, bits = _make_stream(20, fec, whitening)
+                self.assertEqual(Deframer(fec=fec, whitening=whitening).push(bits), msgs)
+
+    def test_002_chunking_does_not_matter(self):
+        msgs, bits = _make_stream(30, error_rate=0.002, seed=1)
+        expected = Deframer().push(bits)
+        self.assertGreater(len(expected), 20)
+        rng = np.random.default_rng(2)
+        for max_chunk in (1, 7, 100, 5000):
+            sizes = rng.integers(0, max_chunk + 1, len(bits) // max(max_chunk // 2, 1) + 1)
+            self.assertEqual(_push_chunks(Deframer(), bits, sizes), expected, max_chunk)
+
+    def test_003_flags_filter(self):
+        msgs, bits = _make_stream(5)
+        self.assertEqual(Deframer(flags_mask=0x40, flags=0).push(bits), [])
+        deframer = Deframer(flags_mask=0x40, flags=0x40)
+        self.assertEqual(deframer.push(bits), msgs)
+        self.assertEqual(deframer.stats.counters['packets'], len(msgs))
+
+    def test_004_hypotheses_recover_false_matches(self):
+        # A lone header (a false sync word match) right before a real frame
+        # claims the start of it as its own data section
+        rng = np.random.default_rng(3)
+        framer = Framer(flags=0x40)
+        header = np.unpackbits(np.frombuffer(frame_header(), dtype=np.uint8))
+        single = []
+        multi = []
+        msgs = []
+        for gap in range(0, 60, 3):
+            msg = b"\x01\x00" + bytes([gap, 0]) + rng.integers(0, 256, 30, dtype=np.uint8).tobytes()
+            msgs.append(msg)
+            bits = np.concatenate((
+                rng.integers(0, 2, 100, dtype=np.uint8), header,
+                rng.integers(0, 2, gap, dtype=np.uint8), np.unpackbits(framer.encode(msg)),
+                # Enough for the longest false frame to finish
+                np.zeros(16 * 260, dtype=np.uint8)))
+            single += Deframer().push(bits)
+            multi += Deframer(max_hypotheses=4).push(bits)
+        self.assertEqual(multi, msgs)
+        self.assertLess(len(single), len(msgs))
+
+    def test_005_hypotheses_find_a_superset(self):
+        msgs, bits = _make_stream(30, error_rate=0.002, seed=4)
+        expected = Deframer().push(bits)
+        rng = np.random.default_rng(5)
+        sizes = rng.integers(0, 400, len(bits) // 200)
+        actual = _push_chunks(Deframer(max_hypotheses=4), bits, sizes)
+        # Extra candidates can only find more packets, in the same order
+        self.assertTrue(set(expected) <= set(actual))
+        self.assertEqual(actual, sorted(actual, key=msgs.index))
+
+    def test_006_corrected_bits(self):
+        # Frames with a few bit errors far apart in their data sections,
+        # between random bits (which the peeked chunk reads)
+        rng = np.random.default_rng(6)
+        framer = Framer(flags=0x40)
+        header_bits = 8 * len(framer.header)
+        msgs = []
+        parts = []
+        for seqnum in range(10):
+            msg = b"\x01\x00" + bytes([seqnum, 0]) + rng.integers(0, 256, rng.integers(40, 100), dtype=np.uint8).tobytes()
+            msgs.append(msg)
+            frame = np.unpackbits(framer.encode(msg))
+            frame[header_bits + 20:header_bits + 20 + 120 * (seqnum % 4):120] ^= 1
+            parts.append(rng.integers(0, 2, 100, dtype=np.uint8))
+            parts.append(frame)
+        parts.append(rng.integers(0, 2, 100, dtype=np.uint8))
+        bits = np.concatenate(parts)
+        expected = sum(seqnum % 4 for seqnum in range(10))
+        for kwargs, samples in (
+            ({}, bits),
+            ({'max_hypotheses': 4}, bits),
+            ({'packed': True}, np.packbits(bits)),
+            ({'soft': True}, bits.astype(np.float32) * 2 - 1),
+        ):
+            deframer = Deframer(**kwargs)
+            self.assertEqual(deframer.push(samples), msgs, kwargs)
+            self.assertEqual(deframer.stats.counters['fec_corrected_bits'], expected, kwargs)
+
+    def test_007_noise_corrects_nothing(self):
+        # A loose sync setting opens many false frames on noise, which all
+        # fail the CRC and mustn't count as corrected bits
+        bits = np.random.default_rng(7).integers(0, 2, 1 << 22, dtype=np.uint8)
+        deframer = Deframer(preamble_bytes=1, preamble_quality=6, sync_words=1)
+        self.assertEqual(deframer.push(bits), [])
+        counters = deframer.stats.counters
+        self.assertGreater(counters['crc_failures'], 0)
+        self.assertEqual(counters['fec_corrected_bits'], 0)
+
+    def test_008_preamble_hits_overlapping_the_sync_word(self):
+        # A long preamble before the frame, with a preamble quality loose
+        # enough that offsets running into the sync word pass too
+        msg = b"\x01\x00\x01\x00" + bytes(range(20))
+        frame = np.unpackbits(np.frombuffer(Framer(flags=0x40, preamble_bytes=8).encode(msg), dtype=np.uint8))
+        bits = np.concatenate((np.zeros(100, dtype=np.uint8), frame, np.zeros(200, dtype=np.uint8)))
+        deframer = Deframer(preamble_quality=28)
+        self.assertEqual(deframer.push(bits), [msg])
+        offsets, preambles = deframer._detector.find_all(bits)
+        data = offsets[0] + deframer._detector.window
+        self.assertTrue(any(offsets[0] < p < data for p in preambles))
+        counters = deframer.stats.counters
+        self.assertEqual(counters['preamble_hits'], sum(p < data for p in preambles))
+        self.assertEqual(counters['sync_matches'], 1)
+        self.assertEqual(counters['sync_misses'], counters['preamble_hits'] - 1)
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_deframer)
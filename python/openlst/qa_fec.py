@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import random
+
+import numpy as np
+from gnuradio import gr_unittest
+from gnuradio.openlst.fec import (
+    SoftViterbiDecoder, ViterbiDecoder, _encode_fec_reference, _interleave_grid, decode_fec,
+    decode_fec_chunk, decode_fec_soft, decode_fec_stream, encode_fec, encode_fec_into,
+    fec_encoded_length, interleave, interleave_chunks)
+
+
+def _random_bytes(rng, length):
+    return bytes(rng.randrange(256) for _ in range(length))
+
+
+def _flip_bits(data, rng, count):
+    data = bytearray(data)
+    for bit in rng.sample(range(len(data) * 8), count):
+        data[bit // 8] ^= 0x80 >> (bit % 8)
+    return bytes(data)
+
+
+def _to_soft(data):
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8)).astype(np.float32) * 2 - 1
+
+
+def _reference_decode(data):
+    decoder = decode_fec_chunk()
+    next(decoder)
+    return b"".join(decoder.send(data[i:i + 4]) for i in range(0, len(data), 4))
+
+
+class qa_fec(gr_unittest.TestCase):
+    """The table-driven FEC code against the DN504 reference implementations"""
+
+    def test_001_viterbi_matches_reference(self):
+        rng = random.Random(0)
+        for length in (1, 2, 9, 30, 120, 255):
+            raw = _random_bytes(rng, length)
+            encoded = _encode_fec_reference(raw)
+            for errors in (0, 1, 3, len(encoded) // 4):
+                received = _flip_bits(encoded, rng, errors)
+                expected = _reference_decode(received)
+                self.assertEqual(decode_fec(received), expected)
+                if errors == 0:
+                    # The decoder is 2 chunks behind, so flush it with a
+                    # chunk of padding to get the last byte
+                    self.assertEqual(decode_fec(received + bytes(4))[:length], raw)
+
+    def test_002_viterbi_streams(self):
+        rng = random.Random(1)
+        received = _flip_bits(_encode_fec_reference(_random_bytes(rng, 100)), rng, 10)
+        expected = _reference_decode(received)
+        decoder = ViterbiDecoder()
+        out = b""
+        for start in range(0, len(received), 12):
+            out += decoder.decode(received[start:start + 12])
+        self.assertEqual(out, expected)
+
+        stream = decode_fec_stream()
+        next(stream)
+        self.assertEqual(
+            b"".join(stream.send(received[i:i + 4]) for i in range(0, len(received), 4)), expected)
+
+    def test_003_metric_counts_errors(self):
+        rng = random.Random(2)
+        encoded = _encode_fec_reference(_random_bytes(rng, 50))
+        decoder = ViterbiDecoder()
+        decoder.decode(encoded)
+        self.assertEqual(decoder.metric, 0)
+        # Two errors far apart are each corrected
+        received = bytearray(encoded)
+        received[4] ^= 0x10
+        received[60] ^= 0x01
+        decoder = ViterbiDecoder()
+        decoder.decode(bytes(received))
+        self.assertEqual(decoder.metric, 2)
+        decoder.reset()
+        self.assertEqual(decoder.metric, 0)
+        with self.assertRaises(ValueError):
+            decoder.decode(b"\x00" * 3)
+
+    def test_004_soft_matches_hard(self):
+        # With +/-1 inputs the soft decoder is the hard decoder
+        rng = random.Random(5)
+        for length in (9, 64, 255):
+            received = _flip_bits(_encode_fec_reference(_random_bytes(rng, length)), rng, length // 8)
+            soft = _to_soft(received)
+            self.assertEqual(decode_fec_soft(soft), decode_fec(received))
+            decoder = SoftViterbiDecoder()
+            out = b"".join(decoder.decode(soft[i:i + 64]) for i in range(0, len(soft), 64))
+            self.assertEqual(out, decode_fec(received))
+            hard = ViterbiDecoder()
+            hard.decode(received)
+            self.assertEqual(decoder.metric, hard.metric)
+
+    def test_005_soft_uses_confidence(self):
+        rng = random.Random(6)
+        raw = _random_bytes(rng, 40)
+        encoded = _encode_fec_reference(raw) + bytes(4)
+        soft = _to_soft(encoded)
+        # Too many errors in one place for hard decisions, but they are all
+        # low confidence
+        soft[64:72] *= -0.1
+        hard = bytes(np.packbits(soft > 0))
+        self.assertNotEqual(decode_fec(hard)[:len(raw)], raw)
+        self.assertEqual(decode_fec_soft(soft)[:len(raw)], raw)
+        with self.assertRaises(ValueError):
+            SoftViterbiDecoder().decode(soft[:31])
+
+    def test_006_encoder_matches_reference(self):
+        rng = random.Random(7)
+        for length in list(range(0, 12)) + [100, 255]:
+            raw = _random_bytes(rng, length)
+            expected = _encode_fec_reference(raw)
+            self.assertEqual(fec_encoded_length(length), len(expected))
+            self.assertEqual(encode_fec(raw), expected)
+            # Into the middle of a larger buffer
+            out = bytearray(b"\xff" * (len(expected) + 6))
+            self.assertEqual(encode_fec_into(raw, out, 3), len(expected))
+            self.assertEqual(bytes(out[3:-3]), expected)
+            self.assertEqual(bytes(out[:3] + out[-3:]), b"\xff" * 6)
+        with self.assertRaises(ValueError):
+            encode_fec_into(b"\x00" * 10, bytearray(4))
+
+    def test_007_interleave_matches_reference(self):
+        rng = random.Random(8)
+        chunks = [_random_bytes(rng, 4) for _ in range(500)]
+        chunks += [bytes([1 << bit, 0, 0, 0]) for bit in range(8)]
+        for chunk in chunks:
+            self.assertEqual(interleave(chunk), _interleave_grid(chunk))
+            # Interleaving is its own inverse
+            self.assertEqual(interleave(interleave(chunk)), chunk)
+        joined = b"".join(chunks)
+        self.assertEqual(interleave_chunks(joined).tobytes(), b"".join(map(_interleave_grid, chunks)))
+        with self.assertRaises(ValueError):
+            interleave(b"\x00" * 3)
+        with self.assertRaises(ValueError):
+            interleave_chunks(b"\x00" * 6)
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_fec)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import random
+
+from gnuradio import gr_unittest
+from gnuradio.openlst.crc import crc16
+from gnuradio.openlst.fec import _encode_fec_reference
+from gnuradio.openlst.framer import Framer, frame_header
+from gnuradio.openlst.whitening import pn9
+
+
+def _reference_encode(raw, preamble_bytes=4, sync_byte1=0xd3, sync_byte0=0x91, sync_words=2,
+                      flags=0xC0, fec=True, whitening=True):
+    """Encode a frame the way openlst_mod originally did"""
+    preamble = bytes([0xaa] * preamble_bytes + [sync_byte1, sync_byte0] * sync_words)
+    content = bytes([len(raw) + 3, flags]) + raw[2:] + raw[0:2]
+    content += crc16(content).to_bytes(2, byteorder='little')
+    if whitening:
+        content = bytes(r ^ p for r, p in zip(content, pn9()))
+    if fec:
+        content = _encode_fec_reference(content)
+    return preamble + content
+
+
+class qa_framer(gr_unittest.TestCase):
+    """Framer against the original per-message encoding"""
+
+    def test_001_matches_reference(self):
+        rng = random.Random(0)
+        settings = [
+            {},
+            {'fec': False},
+            {'whitening': False},
+            {'fec': False, 'whitening': False},
+            {'preamble_bytes': 8, 'sync_words': 1, 'sync_byte1': 0x12, 'sync_byte0': 0x34, 'flags': 0x40},
+        ]
+        for kwargs in settings:
+            framer = Framer(**kwargs)
+            for length in (2, 3, 4, 5, 10, 11, 100, 252):
+                raw = bytes(rng.randrange(256) for _ in range(length))
+                frame = framer.encode(raw)
+                self.assertEqual(frame.tobytes(), _reference_encode(raw, **kwargs), (kwargs, length))
+                self.assertEqual(len(frame), framer.frame_length(length))
+                # Arrays are accepted too
+                self.assertEqual(framer.encode(list(raw)).tobytes(), frame.tobytes())
+
+    def test_002_header_is_cached(self):
+        self.assertIs(frame_header(4, 0xd3, 0x91, 2), frame_header(4, 0xd3, 0x91, 2))
+        self.assertEqual(Framer().header, b"\xaa" * 4 + b"\xd3\x91" * 2)
+        with self.assertRaises(ValueError):
+            Framer().encode(b"\x01")
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_framer)
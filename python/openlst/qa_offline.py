@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import os
+import tempfile
+
+import numpy as np
+from gnuradio import gr_unittest
+from gnuradio.openlst.framer import Framer
+from gnuradio.openlst.offline import decode_file
+
+
+def _make_stream(lengths, seed=0):
+    """Return raw messages with the given data lengths, framed in noise
+
+    The stream ends right after the last frame.
+    """
+    rng = np.random.default_rng(seed)
+    framer = Framer(flags=0x40)
+    msgs = []
+    parts = []
+    for seqnum, length in enumerate(lengths):
+        msg = b"\x01\x00" + seqnum.to_bytes(2, byteorder='little') + rng.integers(0, 256, length, dtype=np.uint8).tobytes()
+        msgs.append(msg)
+        parts.append(rng.integers(0, 2, rng.integers(0, 300), dtype=np.uint8))
+        parts.append(np.unpackbits(framer.encode(msg)))
+    return msgs, np.concatenate(parts)
+
+
+class qa_offline(gr_unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def _write(self, name, data):
+        path = os.path.join(self._dir.name, name)
+        data.tofile(path)
+        return path
+
+    def _decode(self, path, kind, **kwargs):
+        return [r['packet'] for r in decode_file(path, kind, **kwargs) if r['crc_ok']]
+
+    def test_001_recording_formats(self):
+        msgs, bits = _make_stream(range(5, 200, 13))
+        recordings = {
+            'bits': bits,
+            'packed': np.packbits(bits),
+            'soft': bits.astype(np.float32) * 2 - 1,
+        }
+        for kind, data in recordings.items():
+            path = self._write(kind, data)
+            self.assertEqual(self._decode(path, kind, workers=0), msgs, kind)
+
+    def test_002_segments(self):
+        msgs, bits = _make_stream(range(5, 200, 7), seed=1)
+        path = self._write('bits', bits)
+        # Segments smaller than a frame, so frames span several
+        for segment_bits in (1000, 4096, len(bits)):
+            self.assertEqual(self._decode(path, 'bits', workers=0, segment_bits=segment_bits), msgs)
+        self.assertEqual(self._decode(path, 'bits', workers=2, segment_bits=4096), msgs)
+
+    def test_003_recording_ends_after_a_frame(self):
+        # The last byte of an odd length data section needs the FEC chunk
+        # after the frame, which isn't in the recording
+        for length in (5, 6, 7, 8, 100, 101):
+            msgs, bits = _make_stream([20, length], seed=length)
+            for kind, data in (('bits', bits), ('soft', bits.astype(np.float32) * 2 - 1)):
+                path = self._write(kind, data)
+                self.assertEqual(self._decode(path, kind, workers=0), msgs, (kind, length))
+
+    def test_004_empty_recording(self):
+        path = self._write('empty', np.zeros(0, dtype=np.uint8))
+        self.assertEqual(self._decode(path, 'bits', workers=0), [])
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_offline)
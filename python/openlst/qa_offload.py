@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pmt
+from gnuradio import gr_unittest
+from gnuradio.openlst import offload
+from gnuradio.openlst.deframer import Deframer
+from gnuradio.openlst.framer import Framer
+from gnuradio.openlst.openlst_demod import openlst_demod
+
+
+def _make_stream(count, seed=0, starts=None):
+    """Return raw messages and a bitstream with them framed in noise
+
+    If starts is a list, the bit offset of each frame is added to it.
+    """
+    rng = np.random.default_rng(seed)
+    framer = Framer(flags=0x40)
+    msgs = []
+    parts = []
+    length = 0
+    for seqnum in range(count):
+        data = rng.integers(0, 256, rng.integers(5, 120), dtype=np.uint8).tobytes()
+        msg = b"\x01\x00" + seqnum.to_bytes(2, byteorder='little') + data
+        msgs.append(msg)
+        parts.append(rng.integers(0, 2, rng.integers(0, 300), dtype=np.uint8))
+        parts.append(np.unpackbits(framer.encode(msg)))
+        if starts is not None:
+            starts.append(length + len(parts[-2]))
+        length += len(parts[-2]) + len(parts[-1])
+    parts.append(rng.integers(0, 2, 300, dtype=np.uint8))
+    return msgs, np.concatenate(parts)
+
+
+def _attached_names():
+    return sorted(offload._attached)
+
+
+class qa_offload(gr_unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ProcessPoolExecutor(1)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_001_matches_inline_decoding(self):
+        msgs, bits = _make_stream(20)
+        deframer = Deframer(executor=self.executor)
+        packets = deframer.push(bits)
+        packets += deframer.close()
+        self.assertEqual(packets, msgs)
+        self.assertEqual(packets, Deframer().push(bits))
+
+    def test_002_counts_corrected_bits(self):
+        msgs, bits = _make_stream(20, seed=1)
+        rng = np.random.default_rng(2)
+        bits[rng.choice(len(bits), 40, replace=False)] ^= 1
+        for soft in (False, True):
+            samples = bits.astype(np.float32) * 2 - 1 if soft else bits
+            inline = Deframer(soft=soft)
+            expected = inline.push(samples)
+            deframer = Deframer(soft=soft, executor=self.executor)
+            self.assertEqual(deframer.push(samples) + deframer.close(), expected)
+            self.assertEqual(deframer.stats.counters, inline.stats.counters)
+            self.assertGreater(deframer.stats.counters['fec_corrected_bits'], 0)
+
+    def test_003_released_arenas_are_detached(self):
+        msgs, bits = _make_stream(3)
+        names = []
+        for _ in range(4):
+            deframer = Deframer(executor=self.executor)
+            names.append(deframer._offload._shm.name)
+            self.assertEqual(deframer.push(bits) + deframer.close(), msgs)
+        # Only the arena in use when the last one was attached is kept
+        # (by then the others have all been unlinked)
+        self.assertEqual(self.executor.submit(_attached_names).result(), names[-1:])
+
+    def test_004_live_arenas_stay_attached(self):
+        msgs, bits = _make_stream(3)
+        deframers = [Deframer(executor=self.executor) for _ in range(3)]
+        packets = [deframer.push(bits) for deframer in deframers]
+        names = sorted(deframer._offload._shm.name for deframer in deframers)
+        self.assertEqual(self.executor.submit(_attached_names).result(), names)
+        for deframer, pkts in zip(deframers, packets):
+            self.assertEqual(pkts + deframer.close(), msgs)
+
+    def test_005_close_in_the_middle_of_a_frame(self):
+        starts = []
+        msgs, bits = _make_stream(6, seed=3, starts=starts)
+        # Stop half way through the fourth frame's data section
+        split = (starts[3] + starts[4]) // 2
+        for restart in (True, False):
+            deframer = Deframer(executor=self.executor)
+            packets = deframer.push(bits[:split]) + deframer.close()
+            self.assertEqual(packets, msgs[:3])
+            if restart:
+                executor = ProcessPoolExecutor(1)
+                deframer.set_executor(executor)
+            # Otherwise the rest is decoded in push
+            packets += deframer.push(bits[split:]) + deframer.close()
+            if restart:
+                executor.shutdown()
+            self.assertEqual(packets, msgs, restart)
+
+    def test_006_block_restart(self):
+        starts = []
+        msgs, bits = _make_stream(6, seed=4, starts=starts)
+        split = (starts[3] + starts[4]) // 2
+        demod = openlst_demod(workers=1)
+        published = []
+        demod.message_port_pub = lambda port, msg: published.append(bytes(pmt.u8vector_elements(msg)))
+        for part in (bits[:split], bits[split:]):
+            demod.start()
+            self.assertIsNotNone(demod._deframer._offload)
+            demod.work([part], [])
+            demod.stop()
+        self.assertEqual(published, msgs)
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_offload)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import numpy as np
+import pmt
+from gnuradio import gr, gr_unittest, blocks, openlst
+from gnuradio.openlst.framer import Framer
+from gnuradio.openlst.openlst_demod import openlst_demod
+
+try:
+    from gnuradio.openlst.openlst_python import openlst_demod as native_demod
+except ImportError:
+    native_demod = None
+
+
+def _make_stream(count, fec=True, whitening=True, error_rate=0.0, seed=0):
+    """Return some raw messages and a bitstream with them framed in noise"""
+    rng = np.random.default_rng(seed)
+    framer = Framer(flags=0x40, fec=fec, whitening=whitening)
+    msgs = []
+    parts = []
+    for seqnum in range(count):
+        data = rng.integers(0, 256, rng.integers(5, 120), dtype=np.uint8).tobytes()
+        msg = b"\x01\x00" + seqnum.to_bytes(2, byteorder='little') + data
+        msgs.append(msg)
+        parts.append(rng.integers(0, 2, rng.integers(0, 300), dtype=np.uint8))
+        parts.append(np.unpackbits(framer.encode(msg)))
+    parts.append(rng.integers(0, 2, 300, dtype=np.uint8))
+    bits = np.concatenate(parts)
+    errors = rng.random(len(bits)) < error_rate
+    bits[errors] ^= 1
+    return msgs, bits
+
+
+class qa_openlst_demod(gr_unittest.TestCase):
+
+    def setUp(self):
+        self.tb = gr.top_block()
+
+    def tearDown(self):
+        self.tb = None
+
+    def _run(self, demod, samples):
+        if samples.dtype == np.float32:
+            src = blocks.vector_source_f(samples.tolist())
+        else:
+            src = blocks.vector_source_b(samples.tolist())
+        sink = blocks.message_debug()
+        self.tb.connect(src, demod)
+        self.tb.msg_connect(demod, 'message', sink, 'store')
+        self.tb.run()
+        if hasattr(demod, 'stop'):
+            demod.stop()
+        return [bytes(pmt.u8vector_elements(sink.get_message(i))) for i in range(sink.num_messages())]
+
+    def test_001_decodes_frames(self):
+        for fec in (True, False):
+            for whitening in (True, False):
+                msgs, bits = _make_stream(20, fec, whitening)
+                self.tb = gr.top_block()
+                out = self._run(openlst_demod(fec=fec, whitening=whitening), bits)
+                self.assertEqual(out, msgs)
+
+    def test_002_packed_and_soft_input(self):
+        msgs, bits = _make_stream(20, error_rate=0.002, seed=1)
+        hard = self._run(openlst_demod(), bits)
+        self.tb = gr.top_block()
+        packed = self._run(openlst_demod(packed=True), np.packbits(bits))
+        self.tb = gr.top_block()
+        soft = self._run(openlst_demod(soft=True), bits.astype(np.float32) * 2 - 1)
+        self.assertEqual(packed, hard)
+        self.assertEqual(soft, hard)
+        self.assertTrue(set(hard) <= set(msgs))
+        self.assertGreater(len(hard), len(msgs) // 2)
+
+    def test_003_native_matches_python(self):
+        if native_demod is None:
+            self.skipTest("the C++ library was not built")
+        cases = [
+            {},
+            {'fec': False},
+            {'whitening': False},
+            {'max_hypotheses': 4},
+            {'soft': True},
+            {'packed': True},
+        ]
+        for seed, kwargs in enumerate(cases):
+            msgs, bits = _make_stream(30, kwargs.get('fec', True), kwargs.get('whitening', True),
+                                      error_rate=0.003, seed=seed)
+            if kwargs.get('soft'):
+                samples = bits.astype(np.float32) * 2 - 1
+            elif kwargs.get('packed'):
+                samples = np.packbits(bits)
+            else:
+                samples = bits
+            self.tb = gr.top_block()
+            expected = self._run(openlst_demod(**kwargs), samples)
+            self.tb = gr.top_block()
+            actual = self._run(native_demod(**kwargs), samples)
+            self.assertEqual(actual, expected, kwargs)
+
+    def test_004_package_names(self):
+        # The C++ block if it was built, and the Python block by name
+        self.assertIs(openlst.openlst_demod, native_demod or openlst_demod)
+        self.assertIs(openlst.openlst_demod_py, openlst_demod)
+        self.assertIn('openlst_demod_py', dir(openlst))
+        block = openlst.openlst_demod_py(workers=1, stats_interval=1.0)
+        self.assertIsInstance(block, openlst_demod)
+        self.assertIn('counters', block.stats())
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_openlst_demod)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import threading
+import time
+
+import numpy as np
+import pmt
+from gnuradio import gr_unittest
+from gnuradio.openlst.framer import Framer
+from gnuradio.openlst.openlst_mod import openlst_mod
+
+
+def _message(raw):
+    return pmt.init_u8vector(len(raw), list(raw))
+
+
+def _run_work(mod, size, count):
+    """Call work count times with an output buffer of size bytes"""
+    out = []
+    for _ in range(count):
+        buf = np.zeros(size, dtype=np.uint8)
+        produced = mod.work([], [buf])
+        out.append(buf[:produced].tobytes())
+    return b"".join(out)
+
+
+class qa_openlst_mod(gr_unittest.TestCase):
+
+    def test_001_frames_survive_small_buffers(self):
+        mod = openlst_mod(bitrate=0)
+        msgs = [b"\x01\x00\x01\x00" + bytes(range(n)) for n in (5, 60, 200)]
+        for msg in msgs:
+            mod.handle_msg(_message(msg))
+        expected = b"".join(Framer().encode(msg).tobytes() for msg in msgs)
+        out = b""
+        while len(out) < len(expected):
+            out += _run_work(mod, 7, 1)
+        self.assertEqual(out, expected)
+        # Then fill
+        self.assertEqual(_run_work(mod, 7, 3), b"\x00" * 3)
+
+    def test_002_work_returns_quickly_after_a_packet(self):
+        # At this bitrate a 250 byte packet puts the bucket about 0.2 s in
+        # debt, which work() mustn't sit out on the scheduler thread
+        mod = openlst_mod(bitrate=7415.77, max_latency=0.1)
+        mod.handle_msg(_message(b"\x01\x00\x01\x00" + bytes(200)))
+        self.assertEqual(len(_run_work(mod, 4096, 1)), Framer().frame_length(204))
+        # At most the time one fill chunk takes to go out
+        chunk_time = mod._fill_chunk * 8 / mod.bitrate
+        for _ in range(5):
+            start = time.monotonic()
+            _run_work(mod, 4096, 1)
+            self.assertLess(time.monotonic() - start, chunk_time + 0.01)
+
+    def test_003_fill_rate(self):
+        mod = openlst_mod(bitrate=80000, max_latency=0.1)
+        start = time.monotonic()
+        out = b""
+        while time.monotonic() - start < 0.5:
+            out += _run_work(mod, 4096, 1)
+        elapsed = time.monotonic() - start
+        self.assertEqual(out, bytes(len(out)))
+        # The bucket starts full, then fill keeps pace with the bitrate
+        self.assertAlmostEqual(len(out), 10000 * elapsed + 1000, delta=600)
+
+    def _backpressure(self, mod):
+        return [bool(m) for port, m in mod.published if str(port) == 'backpressure']
+
+    def test_004_backpressure(self):
+        mod = openlst_mod(bitrate=0, queue_depth=4)
+        mod.published = []
+        mod.message_port_pub = lambda port, msg: mod.published.append((port, msg))
+        for seqnum in range(5):
+            mod.handle_msg(_message(b"\x01\x00" + bytes([seqnum, 0, 1, 2])))
+        self.assertEqual(self._backpressure(mod), [True])
+        self.assertEqual(mod.queue_stats()['dropped'], 1)
+        # Released once the queue has drained to half full
+        _run_work(mod, 4096, 2)
+        self.assertEqual(self._backpressure(mod), [True, False])
+
+    def test_005_backpressure_across_threads(self):
+        mod = openlst_mod(bitrate=0, queue_depth=2)
+        mod.published = []
+        mod.message_port_pub = lambda port, msg: mod.published.append((port, msg))
+        done = threading.Event()
+
+        def handler():
+            for seqnum in range(2000):
+                mod.handle_msg(_message(b"\x01\x00" + seqnum.to_bytes(2, byteorder='little')))
+            done.set()
+
+        thread = threading.Thread(target=handler)
+        thread.start()
+        while not done.is_set():
+            _run_work(mod, 64, 1)
+        thread.join()
+        states = self._backpressure(mod)
+        self.assertGreater(len(states), 0)
+        # Never the same state twice in a row
+        self.assertEqual(states, [i % 2 == 0 for i in range(len(states))])
+
+    def _tag(self, mod):
+        """Record tags instead of adding them, with work() output counted"""
+        mod.tags = []
+        mod.written = 0
+        mod.add_item_tag = lambda port, offset, key, value: mod.tags.append((offset, str(key), value))
+        mod.nitems_written = lambda port: mod.written
+
+    def test_006_burst_tags(self):
+        mod = openlst_mod(burst=True)
+        self._tag(mod)
+        msgs = [b"\x01\x00\x01\x00" + bytes(range(n)) for n in (5, 100)]
+        for msg in msgs:
+            mod.handle_msg(_message(msg))
+        frames = [Framer().encode(msg).tobytes() for msg in msgs]
+        out = b""
+        while len(out) < sum(len(frame) for frame in frames):
+            chunk = _run_work(mod, 64, 1)
+            mod.written += len(chunk)
+            out += chunk
+        self.assertEqual(out, b"".join(frames))
+        # No fill once the queue is empty, and no waiting for a packet
+        start = time.monotonic()
+        self.assertEqual(_run_work(mod, 64, 10), b"")
+        self.assertLess(time.monotonic() - start, 0.01)
+        second = len(frames[0])
+        self.assertEqual([(offset, key) for offset, key, _ in mod.tags], [
+            (0, 'tx_sob'), (0, 'packet_len'), (second - 1, 'tx_eob'),
+            (second, 'tx_sob'), (second, 'packet_len'), (len(out) - 1, 'tx_eob'),
+        ])
+        self.assertEqual(pmt.to_long(mod.tags[1][2]), len(frames[0]))
+        self.assertEqual(pmt.to_long(mod.tags[4][2]), len(frames[1]))
+
+    def test_007_burst_tx_time(self):
+        mod = openlst_mod(burst=True, bitrate=8000, tx_time_delay=0.5)
+        self._tag(mod)
+        for _ in range(2):
+            mod.handle_msg(_message(b"\x01\x00\x01\x00" + bytes(96)))
+        length = Framer().frame_length(100)
+        start = time.time()
+        for _ in range(2):
+            mod.written += len(_run_work(mod, 4096, 1))
+        times = [
+            pmt.to_uint64(pmt.tuple_ref(value, 0)) + pmt.to_double(pmt.tuple_ref(value, 1))
+            for offset, key, value in mod.tags if key == 'tx_time'
+        ]
+        self.assertEqual(len(times), 2)
+        self.assertAlmostEqual(times[0], start + 0.5, delta=0.05)
+        # The second burst waits for the first to finish
+        self.assertAlmostEqual(times[1], times[0] + length * 8 / 8000, delta=1e-6)
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_openlst_mod)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import numpy as np
+import pmt
+from gnuradio import gr_unittest
+from gnuradio.openlst.deframer import Deframer
+from gnuradio.openlst.framer import Framer
+from gnuradio.openlst.openlst_multi_demod import openlst_multi_demod
+
+
+def _make_stream(count, length, fec=True, seed=0):
+    """Return some raw messages and length bits with them framed in noise"""
+    rng = np.random.default_rng(seed)
+    framer = Framer(flags=0x40, fec=fec)
+    msgs = []
+    parts = []
+    for seqnum in range(count):
+        data = rng.integers(0, 256, rng.integers(5, 120), dtype=np.uint8).tobytes()
+        msg = b"\x01\x00" + seqnum.to_bytes(2, byteorder='little') + data
+        msgs.append(msg)
+        parts.append(rng.integers(0, 2, rng.integers(0, 300), dtype=np.uint8))
+        parts.append(np.unpackbits(framer.encode(msg)))
+    bits = np.concatenate(parts)
+    return msgs, np.concatenate((bits, rng.integers(0, 2, length - len(bits), dtype=np.uint8)))
+
+
+class qa_openlst_multi_demod(gr_unittest.TestCase):
+
+    def _run(self, demod, inputs, chunk=997):
+        """Call work on the inputs in chunks, returning the published PDUs"""
+        published = []
+        demod.message_port_pub = lambda port, msg: published.append((str(port), msg))
+        demod.start()
+        for start in range(0, len(inputs[0]), chunk):
+            demod.work([samples[start:start + chunk] for samples in inputs], [])
+        demod.stop()
+        return [
+            (pmt.to_python(pmt.dict_ref(pmt.car(msg), pmt.intern('channel'), pmt.PMT_NIL)),
+             bytes(pmt.u8vector_elements(pmt.cdr(msg))))
+            for port, msg in published if port == 'message'
+        ]
+
+    def test_001_channels_are_independent(self):
+        length = 40000
+        msgs0, bits0 = _make_stream(15, length, seed=1)
+        msgs1, bits1 = _make_stream(20, length, fec=False, seed=2)
+        demod = openlst_multi_demod(channels=2, fec=[True, False])
+        out = self._run(demod, [bits0, bits1])
+        self.assertEqual([pkt for channel, pkt in out if channel == 0], msgs0)
+        self.assertEqual([pkt for channel, pkt in out if channel == 1], msgs1)
+        self.assertEqual(demod.stats(0)['counters']['packets'], len(msgs0))
+        self.assertEqual(demod.stats(1)['counters']['packets'], len(msgs1))
+
+    def test_002_matches_single_channel(self):
+        length = 40000
+        streams = [_make_stream(15, length, seed=seed)[1] for seed in range(3)]
+        for channel, bits in enumerate(streams):
+            bits[np.random.default_rng(channel).random(length) < 0.002] ^= 1
+        for kwargs in ({}, {'max_hypotheses': 4}, {'workers': 1}):
+            out = self._run(openlst_multi_demod(channels=3, **kwargs), streams)
+            for channel, bits in enumerate(streams):
+                expected = Deframer(max_hypotheses=kwargs.get('max_hypotheses', 1)).push(bits)
+                self.assertEqual([pkt for c, pkt in out if c == channel], expected, kwargs)
+
+    def test_003_per_channel_values(self):
+        with self.assertRaises(ValueError):
+            openlst_multi_demod(channels=3, fec=[True, False])
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_openlst_multi_demod)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+from gnuradio import gr_unittest
+from gnuradio.openlst.pacing import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class qa_pacing(gr_unittest.TestCase):
+
+    def test_001_refills_up_to_depth(self):
+        clock = FakeClock()
+        bucket = TokenBucket(1000, 100, clock=clock)
+        self.assertEqual(bucket.available(), 100)
+        bucket.spend(100)
+        self.assertEqual(bucket.available(), 0)
+        clock.now = 0.05
+        self.assertEqual(bucket.available(), 50)
+        clock.now = 10
+        self.assertEqual(bucket.available(), 100)
+
+    def test_002_debt(self):
+        clock = FakeClock()
+        bucket = TokenBucket(1024, 128, clock=clock)
+        # A packet can overspend, and has to be paid back first
+        bucket.spend(384)
+        self.assertEqual(bucket.available(), 0)
+        self.assertEqual(bucket.delay(32), 0.28125)
+        clock.now = 0.25
+        self.assertEqual(bucket.available(), 0)
+        self.assertEqual(bucket.delay(32), 0.03125)
+        clock.now = 0.28125
+        self.assertEqual(bucket.available(), 32)
+        self.assertEqual(bucket.delay(32), 0)
+
+    def test_003_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(0, 1)
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_pacing)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import os
+import tempfile
+
+import pmt
+import zmq
+from gnuradio import gr_unittest
+from gnuradio.openlst.raw_zmq_sink import raw_zmq_sink
+
+
+def _message(raw):
+    return pmt.init_u8vector(len(raw), list(raw))
+
+
+class qa_raw_zmq_sink(gr_unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = 'ipc://' + os.path.join(self._dir.name, 'sink')
+        self.context = zmq.Context()
+
+    def tearDown(self):
+        self.context.destroy(linger=0)
+        self._dir.cleanup()
+
+    def test_001_sends_messages_and_pdus(self):
+        sink = raw_zmq_sink(self.path, 'PUSH')
+        sink.start()
+        pull = self.context.socket(zmq.PULL)
+        pull.connect(self.path)
+        sink.handle_msg(_message(b"\x01\x02"))
+        sink.handle_msg(pmt.cons(pmt.make_dict(), _message(b"\x03\x04")))
+        self.assertEqual([pull.recv(), pull.recv()], [b"\x01\x02", b"\x03\x04"])
+        sink.stop()
+        self.assertEqual(sink.stats(), {'queued': 0, 'sent': 2, 'dropped': 0})
+
+    def test_002_no_rebind_after_stop(self):
+        sink = raw_zmq_sink(self.path, 'PUSH')
+        sink.start()
+        pull = self.context.socket(zmq.PULL)
+        pull.connect(self.path)
+        for i in range(100):
+            sink.handle_msg(_message(bytes([i])))
+        sink.stop()
+        # Everything queued went out before the socket closed
+        self.assertEqual([pull.recv() for _ in range(100)], [bytes([i]) for i in range(100)])
+        # A message after stop is dropped and counted, and the socket stays closed
+        sink.handle_msg(_message(b"late"))
+        self.assertEqual(sink.stats(), {'queued': 0, 'sent': 100, 'dropped': 1})
+        self.assertEqual(pull.poll(100), 0)
+        # A restart binds again
+        sink.start()
+        sink.handle_msg(_message(b"again"))
+        self.assertEqual(pull.recv(), b"again")
+        sink.stop()
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_raw_zmq_sink)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import numpy as np
+from gnuradio import gr_unittest
+from gnuradio.openlst.sync import SyncDetector
+
+SYNC_WORD = b"\xd3\x91\xd3\x91"
+
+
+def _reference_find(bits, preamble_bytes, preamble_quality, sync_word):
+    """Check every offset bit by bit, like the original demod"""
+    preamble = [1, 0] * (preamble_bytes * 4)
+    sync = list(np.unpackbits(np.frombuffer(sync_word, dtype=np.uint8)))
+    window = len(preamble) + len(sync)
+    offsets = []
+    for i in range(len(bits) - window + 1):
+        if bits[i] != 1:
+            continue
+        score = sum(int(b == p) for b, p in zip(bits[i:i + len(preamble)], preamble))
+        if score >= preamble_quality and list(bits[i + len(preamble):i + window]) == sync:
+            offsets.append(i)
+    return offsets
+
+
+class qa_sync(gr_unittest.TestCase):
+    """The sliding correlator against a bit by bit search"""
+
+    def _stream(self, seed, error_rate):
+        rng = np.random.default_rng(seed)
+        header = np.unpackbits(np.frombuffer(b"\xaa" * 4 + SYNC_WORD, dtype=np.uint8))
+        parts = []
+        for _ in range(20):
+            parts.append(rng.integers(0, 2, rng.integers(0, 200), dtype=np.uint8))
+            parts.append(header)
+        bits = np.concatenate(parts)
+        errors = rng.random(len(bits)) < error_rate
+        bits[errors] ^= 1
+        return bits
+
+    def test_001_matches_reference(self):
+        for seed, (quality, error_rate) in enumerate([(32, 0), (30, 0.01), (24, 0.03), (16, 0.05)]):
+            bits = self._stream(seed, error_rate)
+            detector = SyncDetector(4, quality, SYNC_WORD)
+            self.assertEqual(detector.find(bits).tolist(), _reference_find(bits, 4, quality, SYNC_WORD))
+
+    def test_002_find_all(self):
+        bits = self._stream(10, 0.01)
+        detector = SyncDetector(4, 30, SYNC_WORD)
+        offsets, preambles = detector.find_all(bits)
+        self.assertEqual(offsets.tolist(), detector.find(bits).tolist())
+        self.assertTrue(set(offsets.tolist()) <= set(preambles.tolist()))
+        # Every preamble hit really passes the preamble check
+        scores = detector.preamble_scores(bits)
+        self.assertTrue((scores[preambles] >= 30).all())
+        self.assertTrue((bits[preambles] == 1).all())
+
+    def test_003_short_input(self):
+        detector = SyncDetector(4, 30, SYNC_WORD)
+        self.assertEqual(len(detector.find(np.ones(detector.window - 1, dtype=np.uint8))), 0)
+        header = np.unpackbits(np.frombuffer(b"\xaa" * 4 + SYNC_WORD, dtype=np.uint8))
+        self.assertEqual(detector.find(header).tolist(), [0])
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_sync)
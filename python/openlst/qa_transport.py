@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import os
+import tempfile
+import threading
+import time
+
+import zmq
+from gnuradio import gr_unittest
+from gnuradio.openlst.transport import Transport
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+class qa_transport(gr_unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.context = zmq.Context()
+        self.transport = Transport.instance()
+
+    def tearDown(self):
+        self.context.destroy(linger=0)
+        self._dir.cleanup()
+
+    def _path(self, name):
+        return 'ipc://' + os.path.join(self._dir.name, name)
+
+    def test_001_one_shared_thread(self):
+        self.assertIs(Transport.instance(), self.transport)
+        threads = [t for t in threading.enumerate() if t.name == 'openlst-zmq']
+        self.assertEqual(len(threads), 1)
+
+    def test_002_receiver(self):
+        received = []
+        path = self._path('rx')
+        receiver = self.transport.receiver(zmq.PULL, path, lambda buf: received.append(bytes(buf)))
+        push = self.context.socket(zmq.PUSH)
+        push.connect(path)
+        msgs = [i.to_bytes(2, byteorder='little') for i in range(1000)]
+        for msg in msgs:
+            push.send(msg)
+        self.assertTrue(_wait_for(lambda: len(received) == len(msgs)))
+        self.assertEqual(received, msgs)
+
+        # Nothing is read while paused
+        receiver.pause()
+        time.sleep(0.05)
+        push.send(b"late")
+        time.sleep(0.1)
+        self.assertEqual(len(received), len(msgs))
+        receiver.resume()
+        self.assertTrue(_wait_for(lambda: received[-1:] == [b"late"]))
+        receiver.close()
+        push.close(linger=0)
+
+    def test_003_sender(self):
+        path = self._path('tx')
+        sender = self.transport.sender(zmq.PUSH, path)
+        pull = self.context.socket(zmq.PULL)
+        pull.connect(path)
+        msgs = [i.to_bytes(2, byteorder='little') for i in range(1000)]
+        for msg in msgs:
+            self.assertTrue(sender.send(msg))
+        self.assertEqual([pull.recv() for _ in msgs], msgs)
+        self.assertTrue(_wait_for(lambda: sender.stats()['sent'] == len(msgs)))
+        sender.close()
+        pull.close(linger=0)
+
+    def test_004_sender_batches(self):
+        path = self._path('batch')
+        sender = self.transport.sender(zmq.PUSH, path, batch=8)
+        pull = self.context.socket(zmq.PULL)
+        pull.connect(path)
+        msgs = [i.to_bytes(2, byteorder='little') for i in range(100)]
+        for msg in msgs:
+            sender.send(msg)
+        parts = []
+        while len(parts) < len(msgs):
+            batch = pull.recv_multipart()
+            self.assertLessEqual(len(batch), 8)
+            parts += batch
+        self.assertEqual(parts, msgs)
+        sender.close()
+        pull.close(linger=0)
+
+    def test_005_sender_overflow(self):
+        # Nobody connected, so a PUSH socket can't send anything
+        for policy, kept in (('drop_newest', [b"0", b"1"]), ('drop_oldest', [b"3", b"4"])):
+            path = self._path(policy)
+            sender = self.transport.sender(zmq.PUSH, path, {zmq.SNDHWM: 1}, maxsize=2, policy=policy)
+            # The first message is taken off the queue by the sending task
+            # and waits for the socket to become writable
+            sender.send(b"first")
+            self.assertTrue(_wait_for(lambda: len(sender) == 0))
+            results = [sender.send(str(i).encode()) for i in range(5)]
+            self.assertEqual(sender.stats()['dropped'], 3)
+            self.assertEqual(list(sender._pending), kept)
+            if policy == 'drop_newest':
+                self.assertEqual(results, [True, True, False, False, False])
+            else:
+                self.assertEqual(results, [True] * 5)
+            pull = self.context.socket(zmq.PULL)
+            pull.connect(path)
+            self.assertEqual([pull.recv() for _ in range(3)], [b"first"] + kept)
+            sender.close()
+            pull.close(linger=0)
+
+    def test_006_close_flushes(self):
+        path = self._path('flush')
+        pull = self.context.socket(zmq.PULL)
+        sender = self.transport.sender(zmq.PUSH, path)
+        pull.connect(path)
+        msgs = [i.to_bytes(2, byteorder='little') for i in range(500)]
+        for msg in msgs:
+            sender.send(msg)
+        sender.close()
+        self.assertEqual(sender.stats(), {'queued': 0, 'sent': len(msgs), 'dropped': 0})
+        self.assertEqual([pull.recv() for _ in msgs], msgs)
+        # Nothing is sent once closed
+        self.assertFalse(sender.send(b"late"))
+        self.assertEqual(sender.stats()['dropped'], 1)
+        pull.close(linger=0)
+
+    def test_007_close_counts_unsent(self):
+        # Nobody connected, so nothing can be sent before the flush times out
+        sender = self.transport.sender(zmq.PUSH, self._path('unsent'), {zmq.SNDHWM: 1})
+        sender.FLUSH_TIMEOUT = 0.1
+        for i in range(10):
+            sender.send(bytes([i]))
+        start = time.monotonic()
+        sender.close()
+        self.assertLess(time.monotonic() - start, 1.0)
+        stats = sender.stats()
+        self.assertEqual(stats['queued'], 0)
+        self.assertEqual(stats['sent'] + stats['dropped'], 10)
+        self.assertGreater(stats['dropped'], 0)
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_transport)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+from gnuradio import gr_unittest
+from gnuradio.openlst.txqueue import DROP_NEWEST, DROP_OLDEST, TransmitQueue
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class qa_txqueue(gr_unittest.TestCase):
+
+    def _drain(self, queue):
+        items = []
+        while True:
+            item = queue.get()
+            if item is None:
+                return items
+            items.append(item)
+
+    def test_001_priority_order(self):
+        queue = TransmitQueue()
+        for item, priority in (('a', 1), ('b', 0), ('c', 1), ('d', 0)):
+            queue.put(item, priority)
+        self.assertEqual(len(queue), 4)
+        self.assertEqual(self._drain(queue), ['b', 'd', 'a', 'c'])
+        self.assertFalse(queue.full)
+
+    def test_002_drop_newest(self):
+        queue = TransmitQueue(2, policy=DROP_NEWEST)
+        self.assertTrue(queue.put('a'))
+        self.assertTrue(queue.put('b'))
+        self.assertTrue(queue.full)
+        self.assertFalse(queue.put('c'))
+        self.assertEqual(self._drain(queue), ['a', 'b'])
+        self.assertEqual(queue.stats()['dropped'], 1)
+
+    def test_003_drop_oldest(self):
+        queue = TransmitQueue(2, policy=DROP_OLDEST)
+        for item in 'abc':
+            self.assertTrue(queue.put(item))
+        self.assertEqual(self._drain(queue), ['b', 'c'])
+        self.assertEqual(queue.stats()['dropped'], 1)
+
+    def test_004_urgent_items_evict_others(self):
+        queue = TransmitQueue(2, policy=DROP_NEWEST)
+        queue.put('a', 1)
+        queue.put('b', 1)
+        self.assertTrue(queue.put('urgent', 0))
+        self.assertEqual(self._drain(queue), ['urgent', 'b'])
+        # But not the other way around
+        queue.put('x', 0)
+        queue.put('y', 0)
+        self.assertFalse(queue.put('z', 1))
+
+    def test_005_stats(self):
+        clock = FakeClock()
+        queue = TransmitQueue(clock=clock)
+        queue.put('a')
+        queue.put('b')
+        clock.now = 1.0
+        queue.get()
+        clock.now = 3.0
+        queue.get()
+        stats = queue.stats()
+        self.assertEqual(stats['enqueued'], 2)
+        self.assertEqual(stats['dequeued'], 2)
+        self.assertEqual(stats['max_depth'], 2)
+        self.assertEqual(stats['depth'], 0)
+        self.assertEqual(stats['dwell_mean'], 2.0)
+        self.assertEqual(stats['dwell_max'], 3.0)
+
+    def test_006_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            TransmitQueue(policy='drop_random')
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_txqueue)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import random
+from itertools import islice
+
+import numpy as np
+from gnuradio import gr_unittest
+from gnuradio.openlst.whitening import PN9, PN9_PERIOD, PN9_TABLE, pn9, pn9_bytes, whiten
+
+
+def _reference_whiten(raw):
+    return bytes(r ^ p for r, p in zip(raw, pn9()))
+
+
+class qa_whitening(gr_unittest.TestCase):
+    """The precomputed PN9 whitening against the pn9 generator"""
+
+    def test_001_table_is_one_period(self):
+        sequence = bytes(islice(pn9(), 3 * PN9_PERIOD))
+        self.assertEqual(PN9_TABLE, sequence[:PN9_PERIOD])
+        self.assertEqual(sequence[PN9_PERIOD:2 * PN9_PERIOD], PN9_TABLE)
+        # Longer than a period, from an offset
+        self.assertEqual(pn9_bytes(1000, 300).tobytes(), sequence[300:1300])
+
+    def test_002_whiten_matches_reference(self):
+        rng = random.Random(0)
+        for length in (0, 1, 7, 255, PN9_PERIOD, 1200):
+            raw = bytes(rng.randrange(256) for _ in range(length))
+            expected = _reference_whiten(raw)
+            self.assertEqual(whiten(raw), expected)
+            self.assertEqual(whiten(bytearray(raw)), expected)
+            self.assertEqual(whiten(np.frombuffer(raw, dtype=np.uint8)), expected)
+            # Legacy generators are still accepted
+            self.assertEqual(whiten(raw, pn9()), expected)
+            # Whitening is its own inverse
+            self.assertEqual(whiten(expected), raw)
+
+    def test_003_cursor_streams(self):
+        raw = bytes(range(256)) * 3
+        cursor = PN9()
+        pieces = []
+        for start in range(0, len(raw), 37):
+            pieces.append(whiten(raw[start:start + 37], cursor))
+        self.assertEqual(b"".join(pieces), _reference_whiten(raw))
+
+        cursor = PN9()
+        self.assertEqual(bytes(next(cursor) for _ in range(600)), bytes(islice(pn9(), 600)))
+        cursor.reset(5)
+        self.assertEqual(cursor.take(4).tobytes(), PN9_TABLE[5:9])
+        self.assertEqual(whiten(raw, offset=5), bytes(r ^ p for r, p in zip(raw, islice(pn9(), 5, None))))
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_whitening)
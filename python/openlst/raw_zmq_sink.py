@@ -10,20 +10,45 @@ import zmq
 import pmt
 from gnuradio import gr
 
+from .transport import Transport
+from .txqueue import DROP_NEWEST
+
 class raw_zmq_sink(gr.basic_block):
     """
     Raw ZMQ Sink
 
     This block writes ZMQ messages to a socket from bytes of the incoming message.
     This is slightly different from the built-in ZMQ sink which writes messages as
-    PMT-encoded.
+    PMT-encoded. Incoming messages can be a u8vector or a PDU, in which case the
+    metadata is dropped.
 
     Supported modes are PUB and PUSH.
+
+    The socket is serviced by the shared ZMQ transport thread, so the
+    message handler never waits for the socket. Messages wait in a queue
+    of up to queue_depth messages (0 for no limit) and are sent in order
+    without blocking. If the consumer falls behind and the queue fills up,
+    overflow ('drop_newest' or 'drop_oldest') decides which message is
+    dropped. sndhwm sets the ZMQ send high water mark.
+
+    With batch > 1, queued messages are sent up to batch at a time as a
+    multipart message, with one part per message. The receiving end has
+    to read multipart messages to use this.
+
+    When the flowgraph stops, queued messages get up to a second to go
+    out (see transport.Sender) and the socket is closed. Messages still
+    queued then, or arriving after the stop, are counted as dropped.
+
+    stats() returns the number of messages queued, sent and dropped.
     """
     def __init__(
             self,
             socket_path="ipc:///tmp/socket",
             socket_type="PUB",
+            sndhwm=1000,
+            queue_depth=1000,
+            overflow=DROP_NEWEST,
+            batch=1,
         ):
         gr.basic_block.__init__(
             self,
@@ -42,17 +67,52 @@ class raw_zmq_sink(gr.basic_block):
             raise ValueError(
                 "unknown socket type '%s' - expected 'PUB' or 'PUSH'" %
                 socket_type)
-        self._socket = None
+        self.sndhwm = sndhwm
+        self.queue_depth = queue_depth
+        self.overflow = overflow
+        self.batch = batch
+        self._sender = None
 
     @property
-    def socket(self):
+    def sender(self):
         # Opportunistic bind to the socket (on first use)
-        if self._socket is None:
-            self._context = zmq.Context()
-            self._socket = self._context.socket(self.socket_type)
-            self._socket.bind(self.socket_path)
-        return self._socket
+        if self._sender is None:
+            self._sender = Transport.instance().sender(
+                self.socket_type,
+                self.socket_path,
+                {zmq.SNDHWM: self.sndhwm},
+                maxsize=self.queue_depth,
+                policy=self.overflow,
+                batch=self.batch,
+            )
+        return self._sender
+
+    def start(self):
+        if self._sender is not None and self._sender.closed:
+            # Restarted - bind the socket again
+            self._sender = None
+        # Bind right away so subscribers can connect before the first message
+        self.sender
+        return True
+
+    def stop(self):
+        if self._sender is not None:
+            # The closed sender is kept, so its counts stay available and
+            # late messages are counted as dropped instead of binding the
+            # socket again
+            self._sender.close()
+        return True
+
+    def stats(self):
+        """Return the number of messages queued, sent and dropped"""
+        if self._sender is not None:
+            return self._sender.stats()
+        return {'queued': 0, 'sent': 0, 'dropped': 0}
 
     def handle_msg(self, msg):
+        if pmt.is_pair(msg):
+            # PDU (for example from the multi-channel decoder) - send the
+            # data and drop the metadata
+            msg = pmt.cdr(msg)
         raw = bytes(pmt.u8vector_elements(msg))
-        self.socket.send(raw)
+        self.sender.send(raw)
@@ -8,9 +8,11 @@
 
 import zmq
 import pmt
-import threading
+import numpy as np
 from gnuradio import gr
 
+from .transport import Transport
+
 class raw_zmq_source(gr.basic_block):
     """
     Raw ZMQ Source
@@ -21,11 +23,24 @@ class raw_zmq_source(gr.basic_block):
     arriving on the socket to already be PMT-encoded.
 
     Supported modes are PULL and SUB
+
+    The socket is serviced by the shared ZMQ transport thread, which reads
+    every message that is ready each time it wakes up. rcvhwm sets the ZMQ
+    receive high water mark (the number of messages ZMQ queues for this
+    socket) and linger the ZMQ linger period in milliseconds (-1 to wait
+    forever) when the socket is closed.
+
+    A PMT bool on the backpressure port pauses (True) or resumes (False)
+    reading from the socket, for example from the backpressure port of
+    the OpenLST Frame+Encode block. While paused, messages wait in the
+    ZMQ queues, so a PUSH sender on the other end eventually blocks.
     """
     def __init__(
             self,
             socket_path="ipc:///tmp/socket",
             socket_type="PULL",
+            rcvhwm=1000,
+            linger=0,
         ):
         gr.basic_block.__init__(
             self,
@@ -34,6 +49,8 @@ class raw_zmq_source(gr.basic_block):
             out_sig=None,
         )
         self.message_port_register_out(pmt.intern("message"))
+        self.message_port_register_in(pmt.intern("backpressure"))
+        self.set_msg_handler(pmt.intern("backpressure"), self.handle_backpressure)
         self.socket_path = socket_path
         if socket_type.upper() == "PULL":
             self.socket_type = zmq.PULL
@@ -43,35 +60,39 @@ class raw_zmq_source(gr.basic_block):
             raise ValueError(
                 "unknown socket type '%s' - expected 'PULL' or 'SUB'" %
                 socket_type)
-        self.socket = None
-
-    @property
-    def socket_poll(self):
-        # Opportunistic connect to the socket (on first use)
-        if self.socket is None:
-            self._context = zmq.Context()
-            self.socket = self._context.socket(self.socket_type)
-            if self.socket_type == zmq.SUB:
-                # SUB sockets need a topic - we set this to a blank filter
-                self.socket.setsockopt(zmq.SUBSCRIBE, b"")
-            self.socket.bind(self.socket_path)
-            self._poller = zmq.Poller()
-            self._poller.register(self.socket, zmq.POLLIN)
-        return self._poller
+        self.rcvhwm = rcvhwm
+        self.linger = linger
+        self._paused = False
+        self._receiver = None
 
     def start(self):
-        self._thread = threading.Thread(target=self.run, daemon=True)
-        self._thread.start()
-    
+        self._receiver = Transport.instance().receiver(
+            self.socket_type,
+            self.socket_path,
+            self._publish,
+            {zmq.RCVHWM: self.rcvhwm, zmq.LINGER: self.linger},
+        )
+        if self._paused:
+            self._receiver.pause()
+        return True
+
     def stop(self):
-        pass
+        if self._receiver is not None:
+            self._receiver.close()
+            self._receiver = None
+        return True
 
-    def run(self):
-        while True:
-            for sock, msg in self.socket_poll.poll(200):
-                if sock == self.socket and msg == zmq.POLLIN:
-                    raw = bytearray(sock.recv())
-                    self.message_port_pub(
-                        pmt.intern("message"),
-                        pmt.init_u8vector(len(raw), raw)
-                    )
+    def handle_backpressure(self, msg):
+        self._paused = pmt.to_bool(msg)
+        if self._receiver is not None:
+            if self._paused:
+                self._receiver.pause()
+            else:
+                self._receiver.resume()
+
+    def _publish(self, buf):
+        raw = np.frombuffer(buf, dtype=np.uint8)
+        self.message_port_pub(
+            pmt.intern("message"),
+            pmt.init_u8vector(len(raw), raw)
+        )
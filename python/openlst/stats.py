@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+# Decoder event counters, see DecoderStats
+COUNTERS = (
+    'preamble_hits',
+    'sync_matches',
+    'sync_misses',
+    'short_frames',
+    'crc_failures',
+    'filtered',
+    'packets',
+    'fec_corrected_bits',
+)
+
+
+class Histogram:
+    """Histogram of durations with power of 2 nanosecond buckets
+
+    Bucket i counts durations from 2**(i-1) up to 2**i ns, so adding a
+    sample is a bit_length and a list update.
+    """
+    BUCKETS = 40
+
+    def __init__(self):
+        self.buckets = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, ns: int):
+        self.buckets[min(ns.bit_length(), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def to_dict(self) -> dict:
+        """Return the histogram in microseconds
+
+        buckets maps the upper bound of each non-empty bucket to its count.
+        """
+        return {
+            'count': self.count,
+            'total_us': self.total / 1000,
+            'mean_us': self.total / self.count / 1000 if self.count else 0.0,
+            'max_us': self.max / 1000,
+            'buckets': {
+                (1 << i) / 1000: n for i, n in enumerate(self.buckets) if n
+            },
+        }
+
+
+class DecoderStats:
+    """Counters and per-stage timing for a deframer
+
+    counters holds:
+
+    - preamble_hits: input offsets that passed the preamble check
+    - sync_matches: preamble hits followed by the sync word(s), which
+      start a frame (or a candidate frame)
+    - sync_misses: preamble hits without the sync word(s)
+    - short_frames: frames with a length too short to be a packet
+    - crc_failures: frames that failed the CRC
+    - filtered: valid frames dropped by the flags check
+    - packets: packets output
+    - fec_corrected_bits: bit errors corrected by FEC in frames that passed
+      the CRC, counted by encoding each frame again and comparing it with
+      the hard decisions of the bits received
+
+    timing has a Histogram of the time spent in each stage, in ns from
+    time.perf_counter_ns.
+    """
+    def __init__(self, stages):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.timing = {stage: Histogram() for stage in stages}
+
+    def to_dict(self) -> dict:
+        return {
+            'counters': dict(self.counters),
+            'timing': {stage: h.to_dict() for stage, h in self.timing.items()},
+        }
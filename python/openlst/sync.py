@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class SyncDetector:
+    """Find CC1110 preamble + sync word candidates in a block of bits
+
+    A candidate is an offset where:
+
+    - the bit is a 1 (the preamble starts with 1010...)
+    - at least preamble_quality of the preamble_bytes * 8 bits match the
+      alternating preamble pattern
+    - the sync word(s) immediately after the preamble match exactly
+
+    The preamble match count is a sliding correlation computed for every
+    offset at once with a cumulative sum, and only offsets that pass the
+    preamble check are compared against the sync word.
+    """
+    def __init__(
+        self,
+        preamble_bytes=4,
+        preamble_quality=30,
+        sync_word=b"\xd3\x91\xd3\x91",
+    ):
+        self.preamble_bits = preamble_bytes * 8
+        self.preamble_quality = preamble_quality
+        self.sync_word = bytes(sync_word)
+        self._sync_bits = np.unpackbits(np.frombuffer(self.sync_word, dtype=np.uint8))
+        # Number of bits needed to check a candidate offset
+        self.window = self.preamble_bits + len(self._sync_bits)
+
+    def preamble_scores(self, bits) -> np.ndarray:
+        """Return the number of matching preamble bits at each offset
+
+        Entry i is the match count for a preamble starting at bits[i],
+        for every offset with a full preamble after it.
+        """
+        bits = np.asarray(bits, dtype=np.uint8)
+        count = len(bits) - self.preamble_bits + 1
+        if count <= 0:
+            return np.zeros(0, dtype=np.intp)
+        # With the pattern anchored at an even offset, a bit matches when it
+        # differs from the parity of its position. At odd offsets the
+        # pattern is inverted, so the score is the number of mismatches.
+        matches = bits ^ (np.arange(len(bits)) & 1).astype(np.uint8)
+        total = np.concatenate(([0], np.cumsum(matches, dtype=np.intp)))
+        scores = total[self.preamble_bits:] - total[:count]
+        scores[1::2] = self.preamble_bits - scores[1::2]
+        return scores
+
+    def preamble_offsets(self, bits) -> np.ndarray:
+        """Return every offset that passes the preamble check"""
+        bits = np.asarray(bits, dtype=np.uint8)
+        scores = self.preamble_scores(bits)
+        return np.flatnonzero(
+            (bits[:len(scores)] == 1) & (scores >= self.preamble_quality))
+
+    def find(self, bits) -> np.ndarray:
+        """Return every candidate frame offset in bits, in order
+
+        Offsets are the start of the preamble. Only offsets with the whole
+        preamble and sync word in bits are reported, so the caller should
+        keep the last window - 1 bits around for the next search.
+        """
+        return self.find_all(bits)[0]
+
+    def find_all(self, bits):
+        """Return the candidate offsets and the preamble offsets they came from
+
+        Like find, but also returns every offset that passed the preamble
+        check (with or without the sync word), for statistics.
+        """
+        bits = np.asarray(bits, dtype=np.uint8)
+        if len(bits) < self.window:
+            empty = np.zeros(0, dtype=np.intp)
+            return empty, empty
+        offsets = self.preamble_offsets(bits[:len(bits) - len(self._sync_bits)])
+        if len(offsets) == 0:
+            return offsets, offsets
+        windows = sliding_window_view(bits[self.preamble_bits:], len(self._sync_bits))
+        matched = (windows[offsets] == self._sync_bits).all(axis=1)
+        return offsets[matched], offsets
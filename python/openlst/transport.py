@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import asyncio
+import threading
+from collections import deque
+
+import zmq
+import zmq.asyncio
+
+from .txqueue import DROP_NEWEST, DROP_OLDEST, POLICIES
+
+
+class Transport:
+    """Process-wide ZMQ context and event loop shared by the ZMQ blocks
+
+    Every socket opened through the transport uses the same zmq.asyncio
+    context and is serviced by coroutines on one asyncio event loop, which
+    runs in a daemon thread started on first use. However many blocks (or
+    radio channels) a process has, it needs one context and one thread.
+
+    Blocks use the shared instance from Transport.instance() and open
+    sockets with receiver and sender, which can be called from any thread.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls) -> 'Transport':
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __init__(self):
+        self.context = zmq.asyncio.Context()
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name='openlst-zmq', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def call(self, coro, timeout=None):
+        """Run a coroutine on the event loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def _socket(self, socket_type, path, options):
+        socket = self.context.socket(socket_type)
+        for option, value in options.items():
+            socket.setsockopt(option, value)
+        if socket_type == zmq.SUB:
+            # SUB sockets need a topic - we set this to a blank filter
+            socket.setsockopt(zmq.SUBSCRIBE, b"")
+        socket.bind(path)
+        return socket
+
+    def receiver(self, socket_type, path, callback, options=None) -> 'Receiver':
+        """Bind a socket that passes every message it receives to callback
+
+        options maps ZMQ socket options (like zmq.RCVHWM) to values and is
+        applied before binding.
+        """
+        async def open_receiver():
+            return Receiver(self, self._socket(socket_type, path, options or {}), callback)
+        return self.call(open_receiver())
+
+    def sender(self, socket_type, path, options=None, **kwargs) -> 'Sender':
+        """Bind a socket that sends the messages queued with Sender.send
+
+        Any other keyword arguments are passed to Sender.
+        """
+        async def open_sender():
+            return Sender(self, self._socket(socket_type, path, options or {}), **kwargs)
+        return self.call(open_sender())
+
+
+class _Endpoint:
+    """A socket serviced by a task on the transport event loop"""
+    def __init__(self, transport, socket):
+        self._transport = transport
+        self.socket = socket
+        self._task = transport.loop.create_task(self._run())
+
+    async def _run(self):
+        raise NotImplementedError
+
+    async def _close(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self.socket.close()
+
+    def close(self):
+        """Stop servicing the socket and close it (thread-safe)"""
+        self._transport.call(self._close())
+
+
+class Receiver(_Endpoint):
+    """Receiving socket on the shared transport
+
+    callback is called on the transport thread with a memoryview of each
+    message, which is only valid during the call. Once woken up, every
+    message that is ready (up to MAX_BATCH) is read before other sockets
+    get a turn.
+    """
+    MAX_BATCH = 1024
+
+    def __init__(self, transport, socket, callback):
+        self._callback = callback
+        # Set while reading is allowed
+        self._resume = asyncio.Event()
+        self._resume.set()
+        super().__init__(transport, socket)
+
+    async def _run(self):
+        while True:
+            await self._resume.wait()
+            await self.socket.poll(flags=zmq.POLLIN)
+            # Read everything that is ready, unless paused while waiting
+            for _ in range(self.MAX_BATCH):
+                if not self._resume.is_set():
+                    break
+                try:
+                    frame = await self.socket.recv(flags=zmq.NOBLOCK, copy=False)
+                except zmq.Again:
+                    break
+                self._callback(frame.buffer)
+            await asyncio.sleep(0)
+
+    def pause(self):
+        """Stop reading from the socket (thread-safe)"""
+        self._transport.loop.call_soon_threadsafe(self._resume.clear)
+
+    def resume(self):
+        """Start reading from the socket again (thread-safe)"""
+        self._transport.loop.call_soon_threadsafe(self._resume.set)
+
+
+class Sender(_Endpoint):
+    """Sending socket on the shared transport
+
+    send can be called from any thread and never blocks. Messages wait in
+    a queue of up to maxsize messages (0 for no limit) and are sent in
+    order by the transport thread without blocking. If ZMQ can't take any
+    more (a PUSH socket at its high water mark), sending waits until the
+    socket is writable while the queue fills up. When the queue is full,
+    policy decides whether the new message (drop_newest) or the oldest
+    queued message (drop_oldest) is dropped.
+
+    With batch > 1, up to batch queued messages are sent together as one
+    multipart message, with a part per message.
+
+    close waits up to FLUSH_TIMEOUT seconds for the queued messages to go
+    out. Whatever is left then, and anything sent after close, is counted
+    as dropped.
+
+    sent and dropped count messages. Note that PUB sockets drop messages
+    at the high water mark themselves, which isn't counted here.
+    """
+    FLUSH_TIMEOUT = 1.0
+
+    def __init__(self, transport, socket, maxsize=0, policy=DROP_NEWEST, batch=1):
+        if policy not in POLICIES:
+            raise ValueError(
+                "unknown overflow policy '%s' - expected one of %s" %
+                (policy, ", ".join(POLICIES)))
+        self.maxsize = maxsize
+        self.policy = policy
+        self.batch = max(batch, 1)
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+        self._pending = deque()
+        # Messages taken off the queue that are still being sent
+        self._sending = 0
+        self._lock = threading.Lock()
+        self._ready = asyncio.Event()
+        super().__init__(transport, socket)
+
+    def __len__(self):
+        return len(self._pending)
+
+    async def _run(self):
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while True:
+                with self._lock:
+                    count = min(self.batch, len(self._pending))
+                    messages = [self._pending.popleft() for _ in range(count)]
+                    self._sending = count
+                if not messages:
+                    break
+                await self._send(messages)
+                with self._lock:
+                    self.sent += count
+                    self._sending = 0
+
+    async def _send(self, messages):
+        while True:
+            try:
+                if len(messages) == 1:
+                    await self.socket.send(messages[0], flags=zmq.NOBLOCK, copy=False)
+                else:
+                    await self.socket.send_multipart(messages, flags=zmq.NOBLOCK, copy=False)
+                return
+            except zmq.Again:
+                await self.socket.poll(flags=zmq.POLLOUT)
+
+    async def _close(self):
+        with self._lock:
+            self.closed = True
+        # Let the queue drain before the task is cancelled
+        deadline = self._transport.loop.time() + self.FLUSH_TIMEOUT
+        while self._pending or self._sending:
+            if self._transport.loop.time() >= deadline:
+                break
+            await asyncio.sleep(0.005)
+        await super()._close()
+        with self._lock:
+            self.dropped += len(self._pending) + self._sending
+            self._pending.clear()
+            self._sending = 0
+
+    def close(self):
+        """Send what is queued, then close the socket (thread-safe)"""
+        if not self.closed:
+            super().close()
+
+    def send(self, data: bytes) -> bool:
+        """Queue a message to be sent, returning False if it was dropped"""
+        with self._lock:
+            if self.closed:
+                self.dropped += 1
+                return False
+            if self.maxsize and len(self._pending) >= self.maxsize:
+                self.dropped += 1
+                if self.policy == DROP_NEWEST:
+                    return False
+                self._pending.popleft()
+            self._pending.append(data)
+            # The transport thread only needs waking up when the queue was
+            # empty, otherwise it is still working through it
+            wake = len(self._pending) == 1
+        if wake:
+            self._transport.loop.call_soon_threadsafe(self._ready.set)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            'queued': len(self._pending),
+            'sent': self.sent,
+            'dropped': self.dropped,
+        }
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Robert Zimmerman.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import time
+from collections import deque
+
+DROP_NEWEST = 'drop_newest'
+DROP_OLDEST = 'drop_oldest'
+POLICIES = (DROP_NEWEST, DROP_OLDEST)
+
+
+class TransmitQueue:
+    """Bounded transmit queue with priority classes
+
+    Items are queued in one of levels priority classes (0 is the most
+    urgent) and come out in priority order, FIFO within a class. A
+    capacity of 0 means the queue is unbounded.
+
+    When the queue is full, an item in a less urgent class than the new
+    one is evicted first (the oldest of the least urgent class). Otherwise
+    the policy decides:
+
+    - drop_newest: the new item is rejected
+    - drop_oldest: the oldest item in the new item's class is evicted
+
+    The queue also tracks its depth, drops and how long items waited
+    (dwell time) for stats.
+    """
+    def __init__(self, capacity=0, levels=2, policy=DROP_NEWEST, clock=time.monotonic):
+        if policy not in POLICIES:
+            raise ValueError(
+                "unknown overflow policy '%s' - expected one of %s" %
+                (policy, ", ".join(POLICIES)))
+        self.capacity = capacity
+        self.policy = policy
+        self._clock = clock
+        self._classes = [deque() for _ in range(levels)]
+        self._length = 0
+
+        self.enqueued = 0
+        self.dequeued = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.dwell_total = 0.0
+        self.dwell_max = 0.0
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def full(self) -> bool:
+        return self.capacity > 0 and self._length >= self.capacity
+
+    def put(self, item, priority=0) -> bool:
+        """Queue an item, returning False if it was dropped"""
+        priority = min(max(priority, 0), len(self._classes) - 1)
+        if self.full:
+            victim = None
+            for level in range(len(self._classes) - 1, priority, -1):
+                if self._classes[level]:
+                    victim = level
+                    break
+            if victim is None and self.policy == DROP_OLDEST and self._classes[priority]:
+                victim = priority
+            if victim is None:
+                self.dropped += 1
+                return False
+            self._classes[victim].popleft()
+            self._length -= 1
+            self.dropped += 1
+        self._classes[priority].append((self._clock(), item))
+        self._length += 1
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, self._length)
+        return True
+
+    def get(self):
+        """Remove and return the most urgent item, or None if empty"""
+        for queue in self._classes:
+            if queue:
+                queued_at, item = queue.popleft()
+                self._length -= 1
+                self.dequeued += 1
+                dwell = self._clock() - queued_at
+                self.dwell_total += dwell
+                self.dwell_max = max(self.dwell_max, dwell)
+                return item
+        return None
+
+    def stats(self) -> dict:
+        return {
+            'depth': self._length,
+            'max_depth': self.max_depth,
+            'enqueued': self.enqueued,
+            'dequeued': self.dequeued,
+            'dropped': self.dropped,
+            'dwell_mean': self.dwell_total / self.dequeued if self.dequeued else 0.0,
+            'dwell_max': self.dwell_max,
+        }
@@ -6,11 +6,23 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 #
 
+from itertools import islice
+
+import numpy as np
+
+# The PN9 sequence repeats every 511 bits. Since 511 and 8 are coprime,
+# the byte sequence also repeats every 511 bytes.
+PN9_PERIOD = 511
+
+
 def pn9():
     """pn9 returns a generator that yields a PN9 sequence
-    
+
     This can be XORed with a data stream to perform CC1110 whitening
     or dewhitening.
+
+    This is the reference implementation. PN9_TABLE holds one full period
+    of its output and is what whiten and the PN9 cursor use.
     """
     state = 0b111111111
     while True:
@@ -20,12 +32,72 @@ def pn9():
             state = (state >> 1) | (new_bit << 8)
 
 
-def whiten(raw: bytes, gen=None):
+PN9_TABLE = bytes(islice(pn9(), PN9_PERIOD))
+
+# Two periods back to back so any run of up to one period can be sliced
+# out without wrapping
+_PN9_EXT = np.frombuffer(PN9_TABLE * 2, dtype=np.uint8)
+
+
+def pn9_bytes(length: int, offset: int = 0) -> np.ndarray:
+    """Return length bytes of the PN9 sequence starting at offset"""
+    offset %= PN9_PERIOD
+    if length <= PN9_PERIOD:
+        return _PN9_EXT[offset:offset + length]
+    return _PN9_EXT[(offset + np.arange(length)) % PN9_PERIOD]
+
+
+def _as_u8(raw) -> np.ndarray:
+    if isinstance(raw, np.ndarray):
+        return raw.astype(np.uint8, copy=False).reshape(-1)
+    return np.frombuffer(raw, dtype=np.uint8)
+
+
+def whiten(raw: bytes, gen=None, offset: int = 0):
     """Whiten/dewhiten data
-    
-    If the gen argument is supplied, an existing pn9 generator can
-    be used.
+
+    raw may be bytes, a bytearray, a memoryview or a uint8 array. The data
+    is XORed with the PN9 sequence starting offset bytes into the sequence.
+
+    If the gen argument is supplied, an existing PN9 cursor (or a legacy
+    pn9 generator) is used and advanced instead.
+    """
+    if isinstance(gen, PN9):
+        return gen.whiten(raw)
+    if gen is not None:
+        return bytes([r ^ p for r, p in zip(raw, gen)])
+    data = _as_u8(raw)
+    return np.bitwise_xor(data, pn9_bytes(len(data), offset)).tobytes()
+
+
+class PN9:
+    """PN9 cursor for streaming whitening/dewhitening
+
+    This tracks a position in the precomputed PN9 sequence and replaces
+    the pn9 generator where data arrives a piece at a time. It can still
+    be used as an iterator (next(cursor) returns the next byte).
     """
-    if gen is None:
-        gen = pn9()
-    return bytes([r ^ p for r, p in zip(raw, gen)])
+    def __init__(self, offset: int = 0):
+        self.offset = offset % PN9_PERIOD
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> int:
+        value = PN9_TABLE[self.offset]
+        self.offset = (self.offset + 1) % PN9_PERIOD
+        return value
+
+    def reset(self, offset: int = 0):
+        self.offset = offset % PN9_PERIOD
+
+    def take(self, length: int) -> np.ndarray:
+        """Return the next length bytes of the sequence and advance"""
+        seq = pn9_bytes(length, self.offset)
+        self.offset = (self.offset + length) % PN9_PERIOD
+        return seq
+
+    def whiten(self, raw: bytes) -> bytes:
+        """Whiten/dewhiten raw with the next bytes of the sequence"""
+        data = _as_u8(raw)
+        return np.bitwise_xor(data, self.take(len(data))).tobytes()